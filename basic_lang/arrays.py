@@ -0,0 +1,93 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Numeric arrays created by the DIM statement."""
+
+import array
+
+from basic_lang import error
+from basic_lang import parser
+
+TYPECODE = 'd'
+
+
+class ArrayBoundsError(error.Error):
+    """An array index was out of the dimensioned range."""
+
+
+class ArrayValueError(error.Error):
+    """A value that is not a number was stored in a numeric array."""
+
+
+class NumericArray():
+    """A numeric array of one or more dimensions.
+
+    The elements are stored as C doubles in one contiguous array.array,
+    8 bytes each, with the last index varying fastest.  Like Dartmouth
+    BASIC each index runs from 0 to the dimensioned bound.
+    """
+
+    __slots__ = ('name', 'bounds', 'strides', 'data', 'check_bounds')
+
+    def __init__(self, name, bounds, check_bounds=True):
+        """Allocate the zeroed elements.
+
+        Args:
+          name: str. The array name.
+          bounds: tuple of int. The upper bound of each index.
+          check_bounds: bool. If false the indices are trusted.  An out
+              of range index then reads or writes the wrong element.
+        """
+
+        self.name = name
+        self.bounds = tuple(bounds)
+        self.check_bounds = check_bounds
+
+        strides = []
+        size = 1
+        for bound in reversed(self.bounds):
+            strides.append(size)
+            size *= bound + 1
+        self.strides = tuple(reversed(strides))
+
+        self.data = array.array(TYPECODE, [0.0]) * size
+
+    def __len__(self):
+        """Return the number of elements."""
+
+        return len(self.data)
+
+    def offset(self, indices):
+        """Return the position in the data of a tuple of indices."""
+
+        if self.check_bounds:
+            if len(indices) != len(self.bounds):
+                raise ArrayBoundsError(
+                    'Array {0} has {1} dimensions not {2}'.format(
+                        self.name, len(self.bounds), len(indices)))
+            for index, bound in zip(indices, self.bounds):
+                if not 0 <= index <= bound:
+                    raise ArrayBoundsError(
+                        'Index {0} out of range 0 to {1} for array {2}'.format(
+                            index, bound, self.name))
+
+        position = 0
+        for index, stride in zip(indices, self.strides):
+            position += int(index) * stride
+
+        return position
+
+    def get(self, *indices):
+        """Return the value at the indices."""
+
+        return parser.make_number_value(self.data[self.offset(indices)])
+
+    def set(self, value, *indices):
+        """Store a value at the indices."""
+
+        if not isinstance(value, (int, float)):
+            raise ArrayValueError(
+                'Can not store {0!r} in numeric array {1}'.format(
+                    value, self.name))
+
+        self.data[self.offset(indices)] = value
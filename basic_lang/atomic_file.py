@@ -0,0 +1,31 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Write files so that a reader never sees one partly written."""
+
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def replacing(file_name):
+    """Write a binary file in a with statement, replacing it at the end.
+
+    The data goes to a temporary file next to the file, which then
+    replaces the file.  If the with block raises, the temporary file is
+    removed and the file is left as it was, so a crash while writing
+    never leaves a partial file.
+
+    Args:
+      file_name: str. The file to write.
+    """
+
+    temp_file = '{0}.{1}.tmp'.format(file_name, os.getpid())
+    try:
+        with open(temp_file, 'wb') as out_file:
+            yield out_file
+        os.replace(temp_file, file_name)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
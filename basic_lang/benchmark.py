@@ -0,0 +1,186 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Measure how the compile and run phases grow with program size.
+
+Each case generates a program of one shape and size and then, in a new
+process, times parsing the source, linking, writing and loading the
+object file and running the loaded program, and reads the peak RSS of
+the process.  The growth exponent of a phase between two sizes is
+log(t2 / t1) / log(n2 / n1), which is about 1 for a phase that grows
+linearly.  Phases with a larger exponent are reported as super-linear.
+"""
+
+import concurrent.futures
+import math
+import os
+import resource
+import tempfile
+import time
+
+from basic_lang import generate
+from basic_lang import loader
+from basic_lang import objfile
+from basic_lang import program
+
+PHASES = ('parse', 'link', 'write', 'load', 'run')
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+SUPER_LINEAR_EXPONENT = 1.2
+# Phases faster than this at the smaller size are too noisy to compare.
+MIN_TIME = 0.01
+
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process in bytes."""
+
+    # Linux reports kilobytes.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(source_file, obj_file):
+    """Time the phases of one program in this process.
+
+    Args:
+      source_file: str. The source file name.
+      obj_file: str. The object file to write and load.
+
+    Returns:
+      A dict with the time of each phase in seconds, the line count,
+      the object file size and the peak RSS.
+    """
+
+    times = {}
+
+    start = time.perf_counter()
+    basic = program.Basic()
+    basic.compile_program(loader.iter_source_lines(source_file))
+    times['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    basic.program.link()
+    times['link'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    objfile.write_obj_file(basic.program, obj_file)
+    times['write'] = time.perf_counter() - start
+    line_count = len(basic.program.lines)
+    basic.program = None
+
+    start = time.perf_counter()
+    program_obj = objfile.load_obj_file(obj_file)
+    times['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    program.ExecutionEngine(program_obj, test_mode=True).run()
+    times['run'] = time.perf_counter() - start
+
+    return {'lines': line_count, 'times': times,
+            'obj_bytes': os.path.getsize(obj_file),
+            'peak_rss_bytes': peak_rss_bytes()}
+
+
+def run_case(shape, size, work_dir, seed=0):
+    """Generate a program and measure it in a new process.
+
+    Args:
+      shape: str. A generate.SHAPES shape.
+      size: int. The number of lines.
+      work_dir: str. A directory for the source and object files.
+      seed: int. The generator seed.
+
+    Returns:
+      The measure dict with the shape and size added.
+    """
+
+    source_file = os.path.join(work_dir, '{0}_{1}.BAS'.format(shape, size))
+    obj_file = os.path.join(work_dir, '{0}_{1}.obj'.format(shape, size))
+    generate.write_program(source_file, size, shape, seed)
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            result = executor.submit(measure, source_file, obj_file).result()
+    finally:
+        for file_name in (source_file, obj_file):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    result['shape'] = shape
+    result['size'] = size
+
+    return result
+
+
+def run_benchmark(shapes=generate.SHAPES, sizes=DEFAULT_SIZES, seed=0,
+                  work_dir=None):
+    """Measure every shape at every size.
+
+    Returns:
+      A list of the run_case results by shape and then size.
+    """
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        return [run_case(shape, size, temp_dir, seed)
+                for shape in shapes for size in sorted(sizes)]
+
+
+def growth(results):
+    """Return the growth exponents between consecutive sizes.
+
+    Args:
+      results: list of dict. run_case results.
+
+    Returns:
+      A list of (shape, phase, small lines, large lines, exponent)
+      tuples.  Phases too fast to compare are left out.
+    """
+
+    by_shape = {}
+    for result in results:
+        by_shape.setdefault(result['shape'], []).append(result)
+
+    exponents = []
+    for shape, shape_results in by_shape.items():
+        shape_results.sort(key=lambda result: result['lines'])
+        for small, large in zip(shape_results, shape_results[1:]):
+            if large['lines'] <= small['lines']:
+                continue
+            size_ratio = math.log(large['lines'] / small['lines'])
+            for phase in PHASES:
+                small_time = small['times'][phase]
+                large_time = large['times'][phase]
+                if small_time < MIN_TIME or large_time <= 0:
+                    continue
+                exponent = math.log(large_time / small_time) / size_ratio
+                exponents.append((shape, phase, small['lines'],
+                                  large['lines'], exponent))
+
+    return exponents
+
+
+def super_linear(results, threshold=SUPER_LINEAR_EXPONENT):
+    """Return the growth exponents above a threshold."""
+
+    return [item for item in growth(results) if item[4] > threshold]
+
+
+def format_results(results):
+    """Return the results as lines of a table."""
+
+    lines = ['{0:<9} {1:>9} '.format('shape', 'lines') +
+             ' '.join('{0:>8}'.format(phase) for phase in PHASES) +
+             ' {0:>9} {1:>9}'.format('obj MB', 'peak MB')]
+    for result in results:
+        lines.append(
+            '{0:<9} {1:>9} '.format(result['shape'], result['lines']) +
+            ' '.join('{0:>8.3f}'.format(result['times'][phase])
+                     for phase in PHASES) +
+            ' {0:>9.1f} {1:>9.1f}'.format(result['obj_bytes'] / 1e6,
+                                          result['peak_rss_bytes'] / 1e6))
+
+    for shape, phase, small_lines, large_lines, exponent in super_linear(
+            results):
+        lines.append('super-linear: {0} {1} from {2} to {3} lines, '
+                     'exponent {4:.2f}'.format(shape, phase, small_lines,
+                                               large_lines, exponent))
+
+    return lines
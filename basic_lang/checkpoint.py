@@ -0,0 +1,242 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Snapshots of a running engine, to stop a long run and carry it on.
+
+A snapshot holds the current line, the FOR loops, the GOSUB return
+stack, the variables and arrays, the DATA and INPUT positions, the
+number of values printed, the state of the random stream and the
+coverage.  It is the magic bytes, a version number and the state
+pickled and compressed with zlib.  It is checked against the source
+hash of the program it is restored into.
+
+engine.request_stop() can be called from a timer or signal handler.
+Once run() returns with engine.stopped set, checkpoint(engine) is the
+snapshot.  Later, restore() puts it into a new engine for the same
+program, perhaps on another host, and engine.resume() carries on the
+run.  CheckpointRunner does this with a snapshot file.
+"""
+
+import pickle
+import struct
+import threading
+import zlib
+
+from basic_lang import atomic_file
+from basic_lang import error
+from basic_lang import input_reader
+from basic_lang import parser
+
+MAGIC = b'BASSNAP\n'
+VERSION = 1
+VERSION_FORMAT = '<H'
+HEADER_SIZE = len(MAGIC) + struct.calcsize(VERSION_FORMAT)
+
+
+class SnapshotError(error.Error):
+    """A snapshot is damaged, of another version or for another program."""
+
+
+def engine_state(engine):
+    """Return a dict of the run state of an engine."""
+
+    program_obj = engine.program
+    output = engine.output
+
+    return {
+        'source_hash': program_obj.source_hash,
+        'current_line': program_obj.current_line,
+        'for_loops': dict(engine.for_loops),
+        'return_stack': engine.return_stack[:engine.return_depth],
+        'variables': {name: value
+                      for name, value in engine.symbol_table.items()
+                      if name != parser.RND_KEY},
+        'data_index': engine.data_index,
+        'input_position': engine.input_reader.position,
+        'output_position': len(output) if output is not None else None,
+        'random_seed': engine.random_stream.seed,
+        'random_stream': engine.random_stream.stream,
+        'random_state': engine.random_stream.generator.getstate(),
+        'run_count': engine.run_count,
+        'coverage': engine.coverage,
+    }
+
+
+def checkpoint(engine):
+    """Return a snapshot of an engine as bytes.
+
+    Raises:
+      SnapshotError: if the engine isn't stopped, since a run could be
+          part way through a statement.
+    """
+
+    if not engine.stopped:
+        raise SnapshotError('Only a stopped run can be saved')
+
+    state = pickle.dumps(engine_state(engine), pickle.HIGHEST_PROTOCOL)
+
+    return (MAGIC + struct.pack(VERSION_FORMAT, VERSION) +
+            zlib.compress(state))
+
+
+def load_state(snapshot):
+    """Return the state dict of a snapshot.
+
+    Raises:
+      SnapshotError: if the snapshot is damaged or of another version.
+    """
+
+    if snapshot[:len(MAGIC)] != MAGIC or len(snapshot) < HEADER_SIZE:
+        raise SnapshotError('Not an engine snapshot')
+
+    version, = struct.unpack_from(VERSION_FORMAT, snapshot, len(MAGIC))
+    if version != VERSION:
+        raise SnapshotError('Snapshot version {0} is not {1}'.format(
+            version, VERSION))
+
+    try:
+        return pickle.loads(zlib.decompress(snapshot[HEADER_SIZE:]))
+    except (zlib.error, pickle.UnpicklingError, EOFError) as exc:
+        raise SnapshotError('Damaged snapshot: {0}'.format(exc))
+
+
+def restore(engine, snapshot, input_stream=None):
+    """Restore the run state of a snapshot into an engine.
+
+    The engine must be for a program from the same source.  The INPUT
+    values read before the snapshot are read again from input_stream
+    and dropped.  If the engine has an output list, values printed
+    after the snapshot was taken are dropped from it.
+
+    Args:
+      engine: program.ExecutionEngine. The engine, which can be new.
+      snapshot: bytes. A snapshot from checkpoint().
+      input_stream: The source for INPUT, as given to the first run.
+
+    Raises:
+      SnapshotError: if the snapshot can't be restored into the engine.
+    """
+
+    state = load_state(snapshot)
+    program_obj = engine.program
+    if state['source_hash'] is None or (
+            state['source_hash'] != program_obj.source_hash):
+        raise SnapshotError('Snapshot is not for this program')
+
+    program_obj.first_line()
+    engine.reset()
+
+    return_stack = state['return_stack']
+    if len(return_stack) > engine.max_gosub_depth:
+        raise SnapshotError('Snapshot GOSUB depth {0} is over {1}'.format(
+            len(return_stack), engine.max_gosub_depth))
+    engine.return_stack[:len(return_stack)] = return_stack
+    engine.return_depth = len(return_stack)
+
+    engine.random_stream.seed = state['random_seed']
+    engine.random_stream.stream = state['random_stream']
+    engine.random_stream.generator.setstate(state['random_state'])
+    engine.symbol_table.update(state['variables'])
+    engine.for_loops.update(state['for_loops'])
+    engine.data_index = state['data_index']
+    engine.run_count = state['run_count']
+
+    engine.input_reader = input_reader.InputReader(input_stream)
+    engine.input_reader.skip(state['input_position'])
+
+    if engine.output is not None and state['output_position'] is not None:
+        del engine.output[state['output_position']:]
+
+    if state['coverage'] is not None:
+        engine.coverage = bytearray(state['coverage'])
+
+    program_obj.current_line = state['current_line']
+    engine.stopped = True
+
+
+def write_snapshot(engine, file_name):
+    """Write a snapshot of an engine to a file.
+
+    A crash while writing leaves the last snapshot whole.
+    """
+
+    with atomic_file.replacing(file_name) as out_file:
+        out_file.write(checkpoint(engine))
+
+
+def read_snapshot(file_name):
+    """Return the snapshot bytes in a file."""
+
+    with open(file_name, 'rb') as in_file:
+        return in_file.read()
+
+
+class CheckpointRunner():
+    """Run an engine, writing a snapshot file when it is stopped.
+
+    With an interval, the run is stopped every interval seconds to
+    write a snapshot and carried on.  Calling terminate(), as from a
+    signal handler, stops the run for good after a last snapshot.
+    """
+
+    def __init__(self, engine, file_name, interval=None):
+        """Initialize the runner.
+
+        Args:
+          engine: program.ExecutionEngine. The engine to run.
+          file_name: str. The snapshot file.
+          interval: float. Seconds between snapshots, or None.
+        """
+
+        self.engine = engine
+        self.file_name = file_name
+        self.interval = interval
+        self.terminated = False
+        self.snapshot_count = 0
+        self._timer = None
+
+    def terminate(self):
+        """Stop the run for good after a last snapshot."""
+
+        self.terminated = True
+        self.engine.request_stop()
+
+    def start_timer(self):
+        """Start the timer for the next periodic snapshot."""
+
+        if self.interval:
+            self._timer = threading.Timer(self.interval,
+                                          self.engine.request_stop)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def run(self, resume=False):
+        """Run the engine to its end or until it is terminated.
+
+        Args:
+          resume: bool. Carry on a restored run instead of starting one.
+
+        Returns:
+          True if the program ran to its end, False if it was
+          terminated and its snapshot written.
+        """
+
+        self.start_timer()
+        try:
+            if resume:
+                self.engine.resume()
+            else:
+                self.engine.run()
+
+            while self.engine.stopped:
+                write_snapshot(self.engine, self.file_name)
+                self.snapshot_count += 1
+                if self.terminated:
+                    return False
+                self.start_timer()
+                self.engine.resume()
+        finally:
+            if self._timer is not None:
+                self._timer.cancel()
+
+        return True
@@ -0,0 +1,246 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Line coverage of BASIC programs.
+
+An engine made with coverage=True sets a byte per line index when the
+line runs.  A byte is set with one store, where setting a bit would
+cost a shift, a mask and an or in the run loop.  The bytes of many
+runs, in one process or many, are merged with a bitwise or.
+
+A coverage file is the magic bytes, the line count, the source hash of
+the program and the lines packed one bit per line, line n in bit n % 8
+of byte n // 8.  Files written with a byte per line are still read.
+Only coverage of the same program is merged into a file.  It is locked
+while it is updated so processes can merge into the same file.
+"""
+
+import fcntl
+import os
+import struct
+
+from basic_lang import error
+
+MAGIC = b'BASCOV3\n'
+# The magic bytes of a file with a byte per line.
+BYTE_MAGIC = b'BASCOV2\n'
+COUNT_FORMAT = '<Q'
+HASH_SIZE = 32
+# The hash stored for a program with no source hash, which matches any.
+NO_HASH = bytes(HASH_SIZE)
+HASH_OFFSET = len(MAGIC) + struct.calcsize(COUNT_FORMAT)
+HEADER_SIZE = HASH_OFFSET + HASH_SIZE
+
+RUN_MARK = '>'
+MISSED_MARK = '!'
+
+# Translate coverage bytes to binary digits and back.
+TO_DIGITS = b'0' + b'1' * 255
+FROM_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+class CoverageFileError(error.Error):
+    """A coverage file is damaged or is for another program."""
+
+
+def merge(bits1, bits2):
+    """Return the merged coverage of two byte strings.
+
+    The bytes are ored as one big int each, so a merge costs about the
+    same as copying them.  The shorter one is padded with zeros.
+    """
+
+    length = max(len(bits1), len(bits2))
+    merged = (int.from_bytes(bits1, 'little') |
+              int.from_bytes(bits2, 'little'))
+
+    return bytearray(merged.to_bytes(length, 'little'))
+
+
+def pack(bits):
+    """Return coverage bytes packed one bit per line."""
+
+    # Line 0 is the last digit, so it is the lowest bit.
+    number = int(bytes(bits[::-1]).translate(TO_DIGITS) or b'0', 2)
+
+    return number.to_bytes((len(bits) + 7) // 8, 'little')
+
+
+def unpack(packed, count):
+    """Return the coverage bytes of count lines packed one bit per line.
+
+    Raises:
+      CoverageFileError: if the packed size isn't right for the count
+          or a bit is set past the last line.
+    """
+
+    number = int.from_bytes(packed, 'little')
+    if len(packed) != (count + 7) // 8 or number >> count:
+        raise CoverageFileError('Coverage file has {0} bytes for {1} '
+                                'lines'.format(len(packed), count))
+    if not count:
+        return bytearray()
+
+    digits = '{0:0{1}b}'.format(number, count).encode('ascii')
+
+    return bytearray(digits[::-1].translate(FROM_DIGITS))
+
+
+def hash_bytes(source_hash):
+    """Return the header bytes of a program source hash or None."""
+
+    return bytes.fromhex(source_hash) if source_hash else NO_HASH
+
+
+def parse_coverage(data, source_hash=None):
+    """Return the coverage bytes of the contents of a coverage file.
+
+    Args:
+      data: bytes. The file contents.
+      source_hash: str. The source hash of the program, or None to
+          accept coverage of any program.
+
+    Raises:
+      CoverageFileError: if the file is damaged or is for a program
+          with another source hash.
+    """
+
+    magic = data[:len(MAGIC)]
+    if magic not in (MAGIC, BYTE_MAGIC) or len(data) < HEADER_SIZE:
+        raise CoverageFileError('Not a coverage file')
+
+    file_hash = data[HASH_OFFSET:HEADER_SIZE]
+    expected_hash = hash_bytes(source_hash)
+    if NO_HASH not in (file_hash, expected_hash) and (
+            file_hash != expected_hash):
+        raise CoverageFileError('Coverage file is for another program')
+
+    count, = struct.unpack_from(COUNT_FORMAT, data, len(MAGIC))
+    if magic == MAGIC:
+        return unpack(data[HEADER_SIZE:], count)
+
+    bits = bytearray(data[HEADER_SIZE:])
+    if len(bits) != count:
+        raise CoverageFileError('Coverage file has {0} of {1} lines'.format(
+            len(bits), count))
+
+    return bits
+
+
+def file_source_hash(data):
+    """Return the source hash in the contents of a coverage file, or None."""
+
+    file_hash = data[HASH_OFFSET:HEADER_SIZE]
+    if len(file_hash) != HASH_SIZE or file_hash == NO_HASH:
+        return None
+
+    return file_hash.hex()
+
+
+def format_coverage(bits, source_hash=None):
+    """Return the contents of a coverage file for coverage bytes."""
+
+    return (MAGIC + struct.pack(COUNT_FORMAT, len(bits)) +
+            hash_bytes(source_hash) + pack(bits))
+
+
+def read_coverage(file_name, source_hash=None):
+    """Read the coverage bytes from a file."""
+
+    with open(file_name, 'rb') as in_file:
+        return parse_coverage(in_file.read(), source_hash)
+
+
+def merge_files(file_names, source_hash=None):
+    """Return the merged coverage of a list of coverage files.
+
+    Without a source hash, the files must be for the program of the
+    first file.
+
+    Raises:
+      CoverageFileError: if the files are for other programs or have
+          different line counts.
+    """
+
+    bits = None
+    for file_name in file_names:
+        with open(file_name, 'rb') as in_file:
+            data = in_file.read()
+        if source_hash is None:
+            source_hash = file_source_hash(data)
+        file_bits = parse_coverage(data, source_hash)
+        if bits is not None and len(bits) != len(file_bits):
+            raise CoverageFileError(
+                '{0} has {1} lines, not {2}'.format(file_name,
+                                                    len(file_bits), len(bits)))
+        bits = file_bits if bits is None else merge(bits, file_bits)
+
+    return bits if bits is not None else bytearray()
+
+
+def update_coverage_file(file_name, bits, source_hash=None):
+    """Merge coverage bytes into a file, creating it if needed.
+
+    Args:
+      file_name: str. The coverage file.
+      bits: bytes. The coverage bytes of a run.
+      source_hash: str. The source hash of the program that was run.
+
+    Returns:
+      The merged coverage bytes.
+
+    Raises:
+      CoverageFileError: if the file is for another program.
+    """
+
+    fd = os.open(file_name, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, 'r+b') as cov_file:
+        fcntl.flock(cov_file, fcntl.LOCK_EX)
+        data = cov_file.read()
+        if data:
+            old_bits = parse_coverage(data, source_hash)
+            if len(old_bits) != len(bits):
+                raise CoverageFileError(
+                    '{0} has {1} lines, not {2}'.format(
+                        file_name, len(old_bits), len(bits)))
+            bits = merge(old_bits, bits)
+            if source_hash is None:
+                source_hash = file_source_hash(data)
+
+        cov_file.seek(0)
+        cov_file.truncate()
+        cov_file.write(format_coverage(bits, source_hash))
+
+    return bits
+
+
+def annotate(program_obj, bits, source_lines):
+    """Return a listing of the source marked with the lines run.
+
+    Each line is marked with RUN_MARK if it ran or MISSED_MARK if not
+    and the listing ends with a summary.
+
+    Args:
+      program_obj: program.Program. The compiled program.
+      bits: bytes. The coverage bytes of the program.
+      source_lines: iterable of str. The stripped source lines.
+    """
+
+    index_by_number = {number: index for index, number in
+                       enumerate(program_obj.line_numbers)}
+    listing = []
+    run_count = 0
+    for line in source_lines:
+        number = line.split(None, 1)[0]
+        index = index_by_number.get(int(number)) if number.isdigit() else None
+        ran = index is not None and index < len(bits) and bits[index]
+        run_count += bool(ran)
+        listing.append('{0} {1}'.format(RUN_MARK if ran else MISSED_MARK,
+                                        line))
+
+    line_count = len(listing)
+    percent = 100.0 * run_count / line_count if line_count else 100.0
+    listing.append('{0} of {1} lines run ({2:.1f}%)'.format(
+        run_count, line_count, percent))
+
+    return listing
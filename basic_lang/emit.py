@@ -0,0 +1,618 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Write a compiled program as a standalone Python module.
+
+The module needs only the standard library.  Its run() function runs
+the program with the variables as Python locals.  The lines are split
+into basic blocks, straight runs of lines that are only entered at the
+top, and a loop dispatches on the block number with a binary tree of
+if statements.  The module raises errors with the names of the ones
+the engine raises, all subclasses of its BasicError.
+"""
+
+from basic_lang import error
+from basic_lang import parser
+from basic_lang import program
+from basic_lang import statement_parser
+
+INDENT = '    '
+
+# The Python source of each built-in function in the module.
+FUNCTION_SOURCES = {
+    'ABS': 'abs',
+    'ATN': 'math.atan',
+    'COS': 'math.cos',
+    'EXP': 'math.exp',
+    'INT': 'math.floor',
+    'LOG': 'math.log',
+    'RND': '_rnd',
+    'SGN': '_sgn',
+    'SIN': 'math.sin',
+    'SQR': 'math.sqrt',
+    'TAN': 'math.tan',
+}
+
+COMPARISON_SOURCES = {
+    parser.BoolEqual: '==',
+    parser.BoolNotEqual: '!=',
+    parser.BoolLessThan: '<',
+    parser.BoolLessOrEqual: '<=',
+    parser.BoolGreaterThan: '>',
+    parser.BoolGreaterOrEqual: '>=',
+}
+
+# Statements after which the next line starts a block.
+BLOCK_END_STATEMENTS = (
+    statement_parser.Goto, statement_parser.OnGoto, statement_parser.IfThen,
+    statement_parser.For, statement_parser.Next, statement_parser.Gosub,
+    statement_parser.Return, statement_parser.End)
+
+# Statements that never go on to the next line.
+JUMP_STATEMENTS = (statement_parser.Goto, statement_parser.Gosub,
+                   statement_parser.Return, statement_parser.End)
+
+HEADER = '''\
+# coding: utf-8
+"""A BASIC program compiled to Python.
+
+Generated by basic_lang.  Do not edit.
+"""
+
+import array
+import hashlib
+import math
+import random
+import re
+import sys
+
+MAX_GOSUB_DEPTH = {max_gosub_depth}
+MAX_EXACT_FLOAT = 2 ** 53
+FIELD_REGEX = re.compile(r'"[^"]*"|[^\\s,"]+')
+NUMBER_REGEX = re.compile(
+    r'[-+]?(?:[0-9]+\\.?[0-9]*|\\.[0-9]+)(?:[Ee][-+]?[0-9]+)?$')
+
+
+class BasicError(Exception):
+    """An error running the program."""
+
+
+class UndefinedVariableError(BasicError):
+    """A variable or array was read before it was set."""
+
+
+class ArithmeticOpError(BasicError):
+    """An arithmetic operation was given values it can't work on."""
+
+
+class UndefinedLineError(BasicError):
+    """A computed GOTO went to a line number that is not in the program."""
+
+
+class GosubDepthError(BasicError):
+    """GOSUB calls were nested deeper than MAX_GOSUB_DEPTH."""
+
+
+class ReturnWithoutGosubError(BasicError):
+    """A RETURN was executed with no GOSUB to return to."""
+
+
+class NextWithoutForError(BasicError):
+    """A NEXT was executed with no FOR loop of its variable running."""
+
+
+class OutOfDataError(BasicError):
+    """A READ was executed after all the DATA values were read."""
+
+
+class InputEndError(BasicError):
+    """An INPUT was executed after all the input values were read."""
+
+
+class ArrayBoundsError(BasicError):
+    """An array index was out of the dimensioned range."""
+
+
+class ArrayValueError(BasicError):
+    """A value that is not a number was stored in a numeric array."""
+
+
+def _num(value):
+    """Return an arithmetic result with whole floats made into ints."""
+
+    if type(value) is float:
+        if value.is_integer() and abs(value) < MAX_EXACT_FLOAT:
+            value = int(value)
+    elif type(value) is not int:
+        raise ArithmeticOpError('Object {{0}} is not a Number.'.format(value))
+
+    return value
+
+
+def _binding(value):
+    """Return a bound input value the way the engine stores it."""
+
+    value = getattr(value, 'value', value)
+    if isinstance(value, str):
+        return value
+
+    return _num(value)
+
+
+def _stream_seed(seed, stream):
+    """Return the generator seed the engine uses for a seed and stream."""
+
+    if seed is None:
+        return None
+
+    digest = hashlib.sha256('{{0}}:{{1}}'.format(seed, stream).encode('utf-8'))
+
+    return int.from_bytes(digest.digest(), 'big')
+
+
+def _undefined(exc):
+    """Return the engine's error for a NameError, or exc itself.
+
+    The local is an unset variable or array, or the loop of a NEXT
+    with no FOR running.
+    """
+
+    match = re.search(r"'(\\w+)'", str(exc))
+    local = match.group(1) if match else ''
+    if local.startswith('_for_'):
+        return NextWithoutForError('NEXT without FOR {{0}}'.format(
+            LOCAL_NAMES.get(local[5:], local[5:])))
+    if local.startswith('a_'):
+        name = local[2:] + '()'
+    else:
+        name = LOCAL_NAMES.get(local)
+    if name is None:
+        return exc
+
+    return UndefinedVariableError('The variable {{0}} is undefined'.format(
+        name))
+
+
+def _sgn(value):
+    """Return -1, 0 or 1 for the sign of a value."""
+
+    return (value > 0) - (value < 0)
+
+
+class _Array():
+    """A numeric array of C doubles with each index from 0 to its bound."""
+
+    __slots__ = ('name', 'bounds', 'strides', 'data')
+
+    def __init__(self, name, bounds):
+        self.name = name
+        self.bounds = bounds
+        strides = []
+        size = 1
+        for bound in reversed(bounds):
+            strides.append(size)
+            size *= bound + 1
+        self.strides = tuple(reversed(strides))
+        self.data = array.array('d', [0.0]) * size
+
+    def offset(self, indices):
+        if len(indices) != len(self.bounds):
+            raise ArrayBoundsError(
+                'Array {{0}} has {{1}} dimensions not {{2}}'.format(
+                    self.name, len(self.bounds), len(indices)))
+        position = 0
+        for index, bound, stride in zip(indices, self.bounds, self.strides):
+            if not 0 <= index <= bound:
+                raise ArrayBoundsError(
+                    'Index {{0}} out of range 0 to {{1}} for array '
+                    '{{2}}'.format(index, bound, self.name))
+            position += int(index) * stride
+        return position
+
+    def get(self, *indices):
+        return _num(self.data[self.offset(indices)])
+
+    def set(self, value, *indices):
+        if not isinstance(value, (int, float)):
+            raise ArrayValueError(
+                'Can not store {{0!r}} in numeric array {{1}}'.format(
+                    value, self.name))
+        self.data[self.offset(indices)] = value
+
+
+def _input_value(field):
+    """Return the value of an input field."""
+
+    if not isinstance(field, str):
+        return _num(field)
+    if field.startswith('"'):
+        return field[1:-1]
+    if NUMBER_REGEX.match(field):
+        try:
+            return _num(int(field))
+        except ValueError:
+            return _num(float(field))
+    return field
+
+
+def _iter_input(source):
+    """Yield the INPUT values of a text stream or an iterable."""
+
+    for item in source:
+        if isinstance(item, str):
+            for field in FIELD_REGEX.findall(item):
+                yield _input_value(field)
+        else:
+            yield _input_value(item)
+
+
+def _line_block(number):
+    """Return the block of a computed line number."""
+
+    try:
+        return LINE_BLOCKS[number]
+    except (KeyError, TypeError):
+        raise UndefinedLineError('GOTO to undefined line {{0}}'.format(
+            number))
+'''
+
+RUN_HEADER = '''
+
+def run(output=None, inputs=None, input_stream=None, seed=None, stream=0):
+    """Run the program and return the values of its variables.
+
+    Args:
+      output: list. The PRINT values are appended to it, or printed if
+          it is None.
+      inputs: dict. Values of variables to set before the run.
+      input_stream: A text stream or iterable of lines or values for
+          INPUT, or None for standard input.
+      seed: The seed for RND, or None.  A seed and stream draw the
+          same numbers as an engine with that seed and stream.
+      stream: int. The random stream number.
+    """
+
+    inputs = inputs or {{}}
+    _out = output.append if output is not None else print
+    _rnd_draw = random.Random(_stream_seed(seed, stream)).random
+    _rnd = lambda value: _rnd_draw()
+    _input = None
+    _stack = []
+    _data_index = 0
+'''
+
+
+class EmitError(error.Error):
+    """A program could not be written as Python."""
+
+
+def local_name(name):
+    """Return the Python local for a BASIC variable name."""
+
+    return 'v_' + name.replace('$', '_S')
+
+
+def array_local_name(name):
+    """Return the Python local for a BASIC array name."""
+
+    return 'a_' + name
+
+
+class EmitCompiler(parser.ExpressionCompiler):
+    """Write expression source for the locals of the module's run().
+
+    The names of the variables used are collected in names.
+    """
+
+    def __init__(self):
+        """Initialize the variable names."""
+
+        super().__init__()
+        self.names = set()
+
+    def constant(self, value):
+        """Return the source for a constant, with no namespace."""
+
+        source = super().constant(value)
+        if source in self.namespace:
+            source = 'float({0!r})'.format(repr(value))
+
+        return source
+
+    def variable(self, name):
+        """Return the local for a variable."""
+
+        self.names.add(name)
+
+        return local_name(name)
+
+    def array_element(self, name, index_sources):
+        """Return the source for an array element value."""
+
+        return '{0}.get({1})'.format(array_local_name(name),
+                                     ', '.join(index_sources))
+
+    def function_call(self, name, arg_sources):
+        """Return the source for a call of a built-in function."""
+
+        return '{0}({1})'.format(FUNCTION_SOURCES[name],
+                                 ', '.join(arg_sources))
+
+
+class PythonEmitter():
+    """Write a program as the source of a Python module."""
+
+    def __init__(self, program_obj,
+                 max_gosub_depth=program.DEFAULT_GOSUB_DEPTH):
+        """Initialize with a program, which is linked here.
+
+        Args:
+          program_obj: program.Program. The program to write.
+          max_gosub_depth: int. The most nested GOSUB calls.
+        """
+
+        self.program = program_obj
+        self.max_gosub_depth = max_gosub_depth
+        self.compiler = EmitCompiler()
+        self.program.first_line()
+        self.block_ids = self.find_blocks()
+        self.block_starts = sorted(self.block_ids)
+        self.block_count = len(self.block_starts)
+
+    def find_blocks(self):
+        """Return a dict of block numbers by the line index of each block."""
+
+        lines = self.program.lines
+        computed = any(
+            isinstance(statement_obj, statement_parser.Goto) and
+            not isinstance(statement_obj.label, parser.Number)
+            for _, statement_obj in lines)
+
+        if computed:
+            leaders = set(range(len(lines)))
+        else:
+            leaders = {0}
+            for index, (_, statement_obj) in enumerate(lines):
+                if isinstance(statement_obj, BLOCK_END_STATEMENTS):
+                    leaders.add(index + 1)
+                for target in self.jump_targets(statement_obj):
+                    leaders.add(target)
+
+        leaders.add(len(lines))
+
+        return {index: number for number, index in enumerate(sorted(leaders))}
+
+    def jump_targets(self, statement_obj):
+        """Return the line indices a statement jumps to."""
+
+        if isinstance(statement_obj, (statement_parser.Goto,
+                                      statement_parser.IfThen,
+                                      statement_parser.Gosub)):
+            labels = (statement_obj.label,)
+        elif isinstance(statement_obj, statement_parser.OnGoto):
+            labels = statement_obj.labels
+        else:
+            labels = ()
+
+        targets = []
+        for label_obj in labels:
+            index = self.program.number_index_or_none(label_obj.value)
+            if index is not None:
+                targets.append(index)
+
+        return targets
+
+    def target_block(self, label_obj):
+        """Return the source for the block of a label."""
+
+        index = self.program.number_index_or_none(label_obj.value)
+        if index is None:
+            return '_line_block({0!r})'.format(label_obj.value)
+
+        return str(self.block_ids[index])
+
+    def value(self, obj):
+        """Return the source for the value of an expression."""
+
+        source = obj.source(self.compiler)
+        if isinstance(obj, parser.Expression):
+            source = '_num({0})'.format(source)
+
+        return source
+
+    def assign(self, target, value_source):
+        """Return the source assigning a value to a variable or element."""
+
+        if isinstance(target, parser.ArrayElement):
+            index_sources = [index.source(self.compiler)
+                             for index in target.indices]
+            return '{0}.set({1})'.format(
+                array_local_name(target.name),
+                ', '.join([value_source] + index_sources))
+
+        return '{0} = {1}'.format(self.compiler.variable(target.name),
+                                  value_source)
+
+    def statement_lines(self, index, statement_obj):
+        """Return the source lines of a statement.
+
+        Jumps set pc to a block number and continue the dispatch loop.
+        """
+
+        next_block = self.block_ids.get(index + 1)
+
+        if isinstance(statement_obj, statement_parser.Print):
+            lines = ['_out({0})'.format(self.value(statement_obj.arg))]
+        elif isinstance(statement_obj, statement_parser.Let):
+            lines = [self.assign(statement_obj.var,
+                                 self.value(statement_obj.value))]
+        elif isinstance(statement_obj, statement_parser.Goto):
+            if isinstance(statement_obj.label, parser.Number):
+                block = self.target_block(statement_obj.label)
+            else:
+                block = '_line_block({0})'.format(
+                    self.value(statement_obj.label))
+            lines = ['pc = {0}'.format(block), 'continue']
+        elif isinstance(statement_obj, statement_parser.OnGoto):
+            blocks = ', '.join(self.target_block(label_obj)
+                               for label_obj in statement_obj.labels)
+            lines = ['_choice = int({0})'.format(
+                         self.value(statement_obj.arg)),
+                     'if 0 < _choice <= {0}:'.format(
+                         len(statement_obj.labels)),
+                     INDENT + 'pc = ({0},)[_choice - 1]'.format(blocks),
+                     INDENT + 'continue']
+        elif isinstance(statement_obj, statement_parser.IfThen):
+            comparison = COMPARISON_SOURCES[type(statement_obj.bool_op)]
+            lines = ['if {0} {1} {2}:'.format(
+                         self.value(statement_obj.arg1), comparison,
+                         self.value(statement_obj.arg2)),
+                     INDENT + 'pc = {0}'.format(
+                         self.target_block(statement_obj.label)),
+                     INDENT + 'continue']
+        elif isinstance(statement_obj, statement_parser.For):
+            var_local = self.compiler.variable(statement_obj.var.name)
+            lines = ['{0} = {1!r}'.format(var_local,
+                                          statement_obj.start.value),
+                     '_for_{0} = ({1}, {2!r})'.format(
+                         var_local, next_block, statement_obj.end.value)]
+        elif isinstance(statement_obj, statement_parser.Next):
+            var_local = self.compiler.variable(statement_obj.var.name)
+            lines = ['{0} = {0} + 1'.format(var_local),
+                     'if {0} <= _for_{0}[1]:'.format(var_local),
+                     INDENT + 'pc = _for_{0}[0]'.format(var_local),
+                     INDENT + 'continue',
+                     'del _for_{0}'.format(var_local)]
+        elif isinstance(statement_obj, statement_parser.Gosub):
+            lines = ['if len(_stack) == MAX_GOSUB_DEPTH:',
+                     INDENT + "raise GosubDepthError("
+                     "'GOSUB nested more than {0} deep')".format(
+                         self.max_gosub_depth),
+                     '_stack.append({0})'.format(next_block),
+                     'pc = {0}'.format(self.block_ids[statement_obj.target]),
+                     'continue']
+        elif isinstance(statement_obj, statement_parser.Return):
+            lines = ['if not _stack:',
+                     INDENT + "raise ReturnWithoutGosubError("
+                     "'RETURN without GOSUB')",
+                     'pc = _stack.pop()',
+                     'continue']
+        elif isinstance(statement_obj, statement_parser.Dim):
+            lines = ['{0} = _Array({1!r}, {2!r})'.format(
+                array_local_name(name), name, bounds)
+                     for name, bounds in statement_obj.arrays]
+        elif isinstance(statement_obj, statement_parser.Read):
+            lines = []
+            for target in statement_obj.targets:
+                lines += ['if _data_index == len(DATA):',
+                          INDENT + "raise OutOfDataError("
+                          "'READ after the end of the DATA')",
+                          self.assign(target, 'DATA[_data_index]'),
+                          '_data_index += 1']
+        elif isinstance(statement_obj, statement_parser.Restore):
+            lines = ['_data_index = 0']
+        elif isinstance(statement_obj, statement_parser.Input):
+            lines = ['if _input is None:',
+                     INDENT + '_input = _iter_input(input_stream if '
+                     'input_stream is not None else sys.stdin)']
+            for target in statement_obj.targets:
+                lines += ['_value = next(_input, None)',
+                          'if _value is None:',
+                          INDENT + "raise InputEndError("
+                          "'No more input for INPUT')",
+                          self.assign(target, '_value')]
+        elif isinstance(statement_obj, statement_parser.End):
+            lines = ['break']
+        elif isinstance(statement_obj, (statement_parser.Rem,
+                                        statement_parser.Data)):
+            lines = []
+        else:
+            raise EmitError('Can not write {0} as Python'.format(
+                type(statement_obj).__name__))
+
+        return lines
+
+    def block_lines(self, number):
+        """Return the source lines of a block."""
+
+        lines = []
+        start = self.block_starts[number]
+
+        if start == len(self.program.lines):
+            return ['break']
+
+        index = start
+        while True:
+            label, statement_obj = self.program.lines[index]
+            lines.append('# {0}'.format(label))
+            lines += self.statement_lines(index, statement_obj)
+            index += 1
+            if index in self.block_ids:
+                break
+
+        if not isinstance(statement_obj, JUMP_STATEMENTS):
+            lines += ['pc = {0}'.format(self.block_ids[index]), 'continue']
+
+        return lines
+
+    def dispatch_lines(self, low, high):
+        """Return the binary tree of ifs that runs blocks low to high - 1."""
+
+        if high - low == 1:
+            return self.block_lines(low)
+
+        middle = (low + high) // 2
+        lines = ['if pc < {0}:'.format(middle)]
+        lines += [INDENT + line for line in self.dispatch_lines(low, middle)]
+        lines.append('else:')
+        lines += [INDENT + line for line in self.dispatch_lines(middle, high)]
+
+        return lines
+
+    def source(self):
+        """Return the source of the module."""
+
+        dispatch = self.dispatch_lines(0, self.block_count)
+        names = sorted(self.compiler.names)
+        data = tuple(obj.value for obj in self.program.data)
+        line_blocks = {number: self.block_ids[index] for index, number in
+                       enumerate(self.program.line_numbers)
+                       if index in self.block_ids}
+
+        parts = [HEADER.format(max_gosub_depth=self.max_gosub_depth),
+                 '\nDATA = {0!r}\n'.format(data),
+                 'LINE_BLOCKS = {0!r}\n'.format(line_blocks),
+                 'LOCAL_NAMES = {0!r}\n'.format(
+                     {local_name(name): name for name in names}),
+                 RUN_HEADER.format()]
+
+        # Variables that aren't bound stay unset locals, and reading one
+        # raises a NameError, which is reported as the engine does.  So
+        # are arithmetic errors.
+        body = []
+        for name in names:
+            body += ['if {0!r} in inputs:'.format(name),
+                     INDENT + '{0} = _binding(inputs[{1!r}])'.format(
+                         local_name(name), name)]
+        body += ['pc = 0', 'try:', INDENT + 'while True:']
+        body += [INDENT * 2 + line for line in dispatch]
+        body += ['except NameError as exc:',
+                 INDENT + 'raise _undefined(exc) from None',
+                 'except (TypeError, ValueError, OverflowError) as exc:',
+                 INDENT + "raise ArithmeticOpError("
+                 "'Invalid arithmetic: {0}'.format(exc)) from None",
+                 '_locals = locals()',
+                 'return {name: _locals[local]',
+                 '        for local, name in LOCAL_NAMES.items()',
+                 '        if local in _locals}']
+
+        parts.append('\n'.join(INDENT + line for line in body) + '\n')
+
+        return ''.join(parts)
+
+
+def write_module(program_obj, file_name):
+    """Write a program as a Python module file."""
+
+    with open(file_name, 'w') as out_file:
+        out_file.write(PythonEmitter(program_obj).source())
@@ -0,0 +1,178 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Generate BASIC programs of any size for benchmarks.
+
+A program is built from small blocks of lines of one shape, numbered
+10, 20, 30 and so on, and ends with an END.  Every block runs once and
+falls or jumps forward into the next, so the run time of a program
+grows with its size.
+
+Shapes:
+  straight: LET and PRINT lines with no jumps.
+  loop: short FOR loops over arrays and scalars.
+  jump: IF THEN, GOTO, ON GOTO and GOSUB jumps between blocks.
+"""
+
+import random
+
+from basic_lang import error
+
+STRAIGHT = 'straight'
+LOOP = 'loop'
+JUMP = 'jump'
+SHAPES = (STRAIGHT, LOOP, JUMP)
+
+LABEL_STEP = 10
+# The number of different scalar variables a program uses.
+VARIABLE_COUNT = 200
+ARRAY_SIZE = 10
+# Only + and - so values grow no faster than the program runs.
+OPERATORS = ('+', '-')
+
+
+class ShapeError(error.Error):
+    """A program shape is unknown."""
+
+
+class ProgramGenerator():
+    """Write the lines of a generated program."""
+
+    def __init__(self, shape, seed=0):
+        """Initialize the generator.
+
+        Args:
+          shape: str. One of SHAPES.
+          seed: int. The seed of the constants and variables chosen.
+        """
+
+        if shape not in SHAPES:
+            raise ShapeError('Unknown program shape: {0}'.format(shape))
+
+        self.shape = shape
+        self.random = random.Random(seed)
+        self.label = 0
+        # A subroutine for the GOSUB lines of the jump shape is put after
+        # the END at this label.
+        self.subroutine_label = None
+
+    def next_label(self):
+        """Return the label for the next line."""
+
+        self.label += LABEL_STEP
+
+        return self.label
+
+    def variable(self):
+        """Return a random scalar variable name."""
+
+        return 'V{0}'.format(self.random.randrange(VARIABLE_COUNT))
+
+    def expression(self):
+        """Return a random arithmetic expression."""
+
+        return '{0} {1} {2} {3} {4}'.format(
+            self.variable(), self.random.choice(OPERATORS),
+            self.random.randint(1, 99), self.random.choice(OPERATORS),
+            self.variable())
+
+    def header_lines(self):
+        """Return the lines that set up every variable and array."""
+
+        names = ', '.join('A{0}({1})'.format(number, ARRAY_SIZE)
+                          for number in range(4))
+        lines = ['{0} DIM {1}'.format(self.next_label(), names)]
+        for number in range(VARIABLE_COUNT):
+            lines.append('{0} LET V{1} = {2}'.format(
+                self.next_label(), number, number % 7))
+
+        return lines
+
+    def straight_block(self):
+        """Return a block of LET and PRINT lines."""
+
+        lines = []
+        for _ in range(4):
+            lines.append('{0} LET {1} = {2}'.format(
+                self.next_label(), self.variable(), self.expression()))
+        lines.append('{0} PRINT {1}'.format(self.next_label(),
+                                            self.variable()))
+
+        return lines
+
+    def loop_block(self):
+        """Return a block with one short FOR loop."""
+
+        array_name = 'A{0}'.format(self.random.randrange(4))
+        return [
+            '{0} FOR I = 0 TO {1}'.format(self.next_label(), ARRAY_SIZE),
+            '{0} LET {1}(I) = I * {2}'.format(
+                self.next_label(), array_name, self.random.randint(1, 9)),
+            '{0} LET {1} = {2}'.format(
+                self.next_label(), self.variable(), self.expression()),
+            '{0} NEXT I'.format(self.next_label()),
+            '{0} LET {1} = {2}(5)'.format(
+                self.next_label(), self.variable(), array_name),
+        ]
+
+    def jump_block(self):
+        """Return a block of forward jumps."""
+
+        start = self.label + LABEL_STEP
+        end = start + 5 * LABEL_STEP
+        return [
+            '{0} IF {1} > {2} THEN {3}'.format(
+                self.next_label(), self.variable(),
+                self.random.randint(0, 9), start + 3 * LABEL_STEP),
+            '{0} GOSUB {1}'.format(self.next_label(),
+                                   self.subroutine_label),
+            '{0} ON V0 - V0 + 1 GOTO {1}, {2}'.format(
+                self.next_label(), start + 3 * LABEL_STEP, end),
+            '{0} LET {1} = {2}'.format(
+                self.next_label(), self.variable(), self.expression()),
+            '{0} GOTO {1}'.format(self.next_label(), end),
+        ]
+
+    def iter_lines(self, line_count):
+        """Yield the lines of a program of about line_count lines.
+
+        Args:
+          line_count: int. The number of lines.  The program has at
+              least the header lines and an END.
+        """
+
+        blocks = {STRAIGHT: self.straight_block, LOOP: self.loop_block,
+                  JUMP: self.jump_block}
+        block = blocks[self.shape]
+        # The last block may pass line_count by a few lines, so the
+        # subroutine is placed well after the END.
+        self.subroutine_label = LABEL_STEP * (line_count + 10)
+
+        header = self.header_lines()
+        yield from header
+        count = len(header)
+        while count + 1 < line_count:
+            lines = block()
+            yield from lines
+            count += len(lines)
+
+        yield '{0} END'.format(self.next_label())
+        if self.shape == JUMP:
+            yield '{0} LET V1 = V1 + 1'.format(self.subroutine_label)
+            yield '{0} RETURN'.format(self.subroutine_label + LABEL_STEP)
+
+
+def write_program(file_name, line_count, shape, seed=0):
+    """Write a generated program to a source file.
+
+    Returns:
+      The number of lines written.
+    """
+
+    count = 0
+    with open(file_name, 'w') as out_file:
+        for line in ProgramGenerator(shape, seed).iter_lines(line_count):
+            out_file.write(line + '\n')
+            count += 1
+
+    return count
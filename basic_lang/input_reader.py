@@ -0,0 +1,162 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Buffered input for the INPUT statement."""
+
+import re
+import sys
+
+from basic_lang import error
+from basic_lang import parser
+
+# The number of characters read from a stream at a time.
+CHUNK_SIZE = 1 << 16
+FIELD_REGEX = re.compile(r'"[^"]*"|[^\s,"]+')
+NUMBER_REGEX = re.compile(
+    r'[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[Ee][-+]?[0-9]+)?$')
+
+
+class InputEndError(error.Error):
+    """An INPUT statement found no more input."""
+
+
+def make_value(field):
+    """Return the Number or String object for an input field.
+
+    Args:
+      field: str, int or float. A field of input text or a value.
+    """
+
+    if isinstance(field, (int, float)):
+        return parser.Number(field)
+
+    if field.startswith('"'):
+        obj = parser.String(field)
+    elif NUMBER_REGEX.match(field):
+        obj = parser.Number(field)
+    else:
+        obj = parser.String('"{0}"'.format(field))
+
+    return obj
+
+
+def is_interactive(stream):
+    """Return True if a stream is standard input or a terminal.
+
+    These are read a line at a time, since a large read would wait for
+    more lines than a person has typed.
+    """
+
+    isatty = getattr(stream, 'isatty', None)
+
+    return stream is sys.stdin or (isatty is not None and isatty())
+
+
+def split_point(text):
+    """Return where to cut text so no field is cut in two.
+
+    The cut is after the last newline, or at the quote that opens a
+    quoted field still open there, since a quoted field can have
+    newlines in it.
+    """
+
+    end = text.rfind('\n') + 1
+    if text.count('"', 0, end) % 2:
+        end = text.rfind('"', 0, end)
+
+    return end
+
+
+def iter_stream_fields(stream, chunk_size=CHUNK_SIZE):
+    """Yield the fields of a text stream read in large chunks.
+
+    A chunk is cut at its split_point() and the rest is carried over to
+    the next chunk.  The fields of a whole chunk are found with one
+    regular expression search.  An interactive stream is read a line
+    at a time instead.
+    """
+
+    def read_chunk():
+        return stream.read(chunk_size)
+
+    read = stream.readline if is_interactive(stream) else read_chunk
+
+    rest = ''
+    while True:
+        chunk = read()
+        if not chunk:
+            break
+
+        text = rest + chunk
+        end = split_point(text)
+        rest = text[end:]
+        yield from FIELD_REGEX.findall(text, 0, end)
+
+    yield from FIELD_REGEX.findall(rest)
+
+
+def iter_fields(source, chunk_size=CHUNK_SIZE):
+    """Yield the fields of a stream or iterable.
+
+    Items of an iterable that are str are lines of text, split into
+    fields like a stream.  Other items are values.
+    """
+
+    if hasattr(source, 'read'):
+        yield from iter_stream_fields(source, chunk_size)
+    else:
+        for item in source:
+            if isinstance(item, str):
+                yield from FIELD_REGEX.findall(item)
+            else:
+                yield item
+
+
+class InputReader():
+    """The values read by INPUT statements, one per target.
+
+    Values are separated by commas, spaces or newlines and quoted
+    strings may have any of them inside.  Numbers become Number objects
+    and anything else a String.  The position is the number of values
+    read so far.
+    """
+
+    def __init__(self, source=None, chunk_size=CHUNK_SIZE):
+        """Initialize the source of the fields.
+
+        Args:
+          source: A text stream with a read method, an iterable of lines
+              or values, or None for standard input.  Standard input is
+              looked up at the first read.
+          chunk_size: int. The characters read from a stream at a time.
+        """
+
+        self.source = source
+        self.chunk_size = chunk_size
+        self.fields = None
+        self.position = 0
+
+    def next_value(self):
+        """Return the next value as a Number or String.
+
+        Raises:
+          InputEndError: if there is no more input.
+        """
+
+        if self.fields is None:
+            source = self.source if self.source is not None else sys.stdin
+            self.fields = iter_fields(source, self.chunk_size)
+
+        try:
+            field = next(self.fields)
+        except StopIteration:
+            raise InputEndError('No more input for INPUT')
+        self.position += 1
+
+        return make_value(field)
+
+    def skip(self, count):
+        """Read and drop count values, as when a run is restored."""
+
+        for _ in range(count):
+            self.next_value()
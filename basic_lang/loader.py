@@ -0,0 +1,68 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Load BASIC source files without reading them into memory."""
+
+import mmap
+
+from basic_lang import error
+
+ENCODING = 'utf-8'
+
+
+class SourceDecodeError(error.Error):
+    """A source line could not be decoded."""
+
+
+def iter_mapped_lines(mapped, encoding=ENCODING):
+    """Yield the stripped lines of a mapped file, skipping blank ones.
+
+    Line ends are found in the mapped bytes and only one line at a time
+    is copied out and decoded.
+
+    Args:
+      mapped: mmap.mmap or bytes. The source bytes.
+      encoding: str. The source encoding.
+
+    Raises:
+      SourceDecodeError: if a line isn't in the encoding.
+    """
+
+    size = len(mapped)
+    start = 0
+    while start < size:
+        end = mapped.find(b'\n', start)
+        if end == -1:
+            end = size
+
+        line = mapped[start:end].strip()
+        if line:
+            try:
+                text = line.decode(encoding)
+            except UnicodeDecodeError as exc:
+                raise SourceDecodeError('Invalid {0} line: {1}'.format(
+                    encoding, exc))
+            yield text
+        start = end + 1
+
+
+def iter_source_lines(file_name, encoding=ENCODING):
+    """Yield the stripped, non blank lines of a source file.
+
+    The file is memory mapped, so the lines can be parsed as they are
+    read and the whole source is never held as Python strs.
+
+    Args:
+      file_name: str. The source file name.
+      encoding: str. The source encoding.
+    """
+
+    with open(file_name, 'rb') as in_file:
+        try:
+            mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped.
+            return
+
+        with mapped:
+            yield from iter_mapped_lines(mapped, encoding)
@@ -0,0 +1,378 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Run one program over many sets of inputs in lockstep.
+
+Each set of inputs is a lane.  A variable holds one list with a value
+for every lane and each expression is compiled into one list
+comprehension over the lanes, so a statement is dispatched once for a
+whole group of lanes instead of once per run.
+
+Lanes at the same line run together.  An IF THEN or a computed GOTO
+splits a group and groups that reach the same line join again.  The
+group at the lowest line runs first so lanes that fall behind in a
+loop can catch up.  If there are more than max_groups groups, the
+smallest are run one lane at a time on ordinary engines, as are the
+lanes of a group that hits an error and all the lanes of a program that
+uses statements the lockstep mode doesn't handle.
+"""
+
+import operator
+
+from basic_lang import error
+from basic_lang import parser
+from basic_lang import pool
+from basic_lang import program
+from basic_lang import statement_parser
+
+DEFAULT_MAX_GROUPS = 8
+
+# The statements that run in lockstep.  LET must assign a variable.
+LOCKSTEP_STATEMENTS = (
+    statement_parser.Print, statement_parser.Let, statement_parser.Goto,
+    statement_parser.For, statement_parser.Next, statement_parser.IfThen,
+    statement_parser.End, statement_parser.Rem, statement_parser.Data)
+
+COMPARISONS = {
+    parser.BoolEqual: operator.eq,
+    parser.BoolNotEqual: operator.ne,
+    parser.BoolLessThan: operator.lt,
+    parser.BoolLessOrEqual: operator.le,
+    parser.BoolGreaterThan: operator.gt,
+    parser.BoolGreaterOrEqual: operator.ge,
+}
+
+# The errors that send the lanes of a group to ordinary engines.  The
+# engines raise them again if the program is really wrong.
+LANE_ERRORS = (error.Error, KeyError, TypeError, ValueError,
+               ArithmeticError)
+
+
+class LaneValueError(error.Error):
+    """A lane value was undefined or of the wrong type."""
+
+
+def lane_number(value):
+    """Return an arithmetic result like Expression.eval would."""
+
+    if type(value) is float:
+        value = parser.make_number_value(value)
+    elif type(value) is not int:
+        raise LaneValueError('Object {0} is not a Number.'.format(value))
+
+    return value
+
+
+def lane_value(value):
+    """Return a variable value, which must be defined."""
+
+    if value is None:
+        raise LaneValueError('Undefined variable in a lane')
+
+    return value
+
+
+class LaneCompiler(parser.ExpressionCompiler):
+    """Compile an expression into a function over a list of lanes."""
+
+    def __init__(self):
+        """Initialize the names of the variable columns."""
+
+        super().__init__()
+        self.columns = {}
+
+    def variable(self, name):
+        """Return the source for a variable value in lane _k."""
+
+        if name not in self.columns:
+            self.columns[name] = '_x{0}'.format(len(self.columns))
+
+        return '{0}[_k]'.format(self.columns[name])
+
+    def compile_lanes(self, expr):
+        """Return a function of the columns and lanes for an expression.
+
+        The function returns a list of the values for the lanes.
+        """
+
+        source = expr.source(self)
+        if isinstance(expr, parser.Expression):
+            source = '_num({0})'.format(source)
+        elif isinstance(expr, parser.Variable):
+            source = '_val({0})'.format(source)
+
+        lines = ['def _lanes(_columns, _lanes):']
+        for name, local in self.columns.items():
+            lines.append('    {0} = _columns[{1!r}]'.format(local, name))
+        lines.append('    return [{0} for _k in _lanes]'.format(source))
+
+        namespace = dict(self.namespace)
+        namespace['_num'] = lane_number
+        namespace['_val'] = lane_value
+        exec(compile('\n'.join(lines) + '\n', '<basic lanes>', 'exec'),
+             namespace)
+
+        return namespace['_lanes']
+
+
+def uses_engine_state(obj):
+    """Return True if an expression reads arrays or draws RND."""
+
+    if isinstance(obj, parser.ArrayElement):
+        result = True
+    elif isinstance(obj, parser.FunctionCall):
+        result = obj.name == 'RND' or any(
+            uses_engine_state(arg) for arg in obj.args)
+    elif isinstance(obj, parser.ArithmeticExpression):
+        result = uses_engine_state(obj.arg1) or uses_engine_state(obj.arg2)
+    elif isinstance(obj, parser.Negation):
+        result = uses_engine_state(obj.arg)
+    else:
+        result = False
+
+    return result
+
+
+def statement_expressions(statement_obj):
+    """Return the expressions a statement evaluates."""
+
+    if isinstance(statement_obj, statement_parser.Print):
+        exprs = (statement_obj.arg,)
+    elif isinstance(statement_obj, statement_parser.Let):
+        exprs = (statement_obj.value,)
+    elif isinstance(statement_obj, statement_parser.Goto):
+        exprs = (statement_obj.label,)
+    elif isinstance(statement_obj, statement_parser.IfThen):
+        exprs = (statement_obj.arg1, statement_obj.arg2)
+    else:
+        exprs = ()
+
+    return exprs
+
+
+def is_lockstep_program(program_obj):
+    """Return True if every statement of a program can run in lockstep."""
+
+    for _, statement_obj in program_obj.lines:
+        if not isinstance(statement_obj, LOCKSTEP_STATEMENTS):
+            return False
+        if (isinstance(statement_obj, statement_parser.Let) and
+                not isinstance(statement_obj.var, parser.Variable)):
+            return False
+        for expr in statement_expressions(statement_obj):
+            if uses_engine_state(expr):
+                return False
+
+    return True
+
+
+class LockstepEngine():
+    """Run one program over a list of input sets.
+
+    After the run, outputs is a list of the values printed by each lane
+    and values(lane) returns the variables of a lane.
+    """
+
+    def __init__(self, program_obj, inputs_list,
+                 max_groups=DEFAULT_MAX_GROUPS, **engine_args):
+        """Initialize the lanes.
+
+        Args:
+          program_obj: program.Program. The program to run.
+          inputs_list: list of dict. The variable values of each lane.
+          max_groups: int. The most groups of lanes run in lockstep.
+          engine_args: Args for the engines that run single lanes.
+        """
+
+        self.program = program_obj
+        self.inputs_list = list(inputs_list)
+        self.max_groups = max_groups
+        self.pool = pool.EnginePool(program_obj, test_mode=True,
+                                    **engine_args)
+        self.columns = {}
+        self.for_loops = {}
+        self.lane_functions = {}
+        self.outputs = [[] for _ in self.inputs_list]
+        self.single_lane_values = {}
+        self.steps = 0
+
+    def column(self, name):
+        """Return the list of lane values of a variable."""
+
+        values = self.columns.get(name)
+        if values is None:
+            values = [None] * len(self.inputs_list)
+            self.columns[name] = values
+
+        return values
+
+    def evaluate(self, expr, lanes):
+        """Return the values of an expression for a list of lanes."""
+
+        function = self.lane_functions.get(id(expr))
+        if function is None:
+            function = LaneCompiler().compile_lanes(expr)
+            self.lane_functions[id(expr)] = function
+
+        return function(self.columns, lanes)
+
+    def values(self, lane):
+        """Return the values of the variables of a lane by name."""
+
+        if lane in self.single_lane_values:
+            return self.single_lane_values[lane]
+
+        return {name: values[lane] for name, values in self.columns.items()
+                if values[lane] is not None}
+
+    def bind_inputs(self):
+        """Set the input variables of every lane."""
+
+        for lane, inputs in enumerate(self.inputs_list):
+            for name, value in inputs.items():
+                self.column(name)[lane] = program.make_binding(value).value
+
+    def label_index(self, value):
+        """Return the line index of a label value."""
+
+        return self.program.line_index_of(value)
+
+    def run_single_lanes(self, lanes):
+        """Run lanes from the start, one at a time, on ordinary engines."""
+
+        for lane in lanes:
+            output = self.outputs[lane]
+            del output[:]
+            with self.pool.engine() as engine:
+                engine.output = output
+                engine.run(self.inputs_list[lane])
+                self.single_lane_values[lane] = engine.values()
+
+    def run(self):
+        """Run the program over all the lanes."""
+
+        lines = self.program.lines
+        self.program.first_line()
+        all_lanes = list(range(len(self.inputs_list)))
+
+        if not is_lockstep_program(self.program):
+            self.run_single_lanes(all_lanes)
+            return
+
+        self.bind_inputs()
+        groups = {0: all_lanes} if lines and all_lanes else {}
+
+        while groups:
+            index = min(groups)
+            lanes = groups.pop(index)
+            try:
+                moves = self.step(index, lanes)
+            except LANE_ERRORS:
+                self.run_single_lanes(lanes)
+                continue
+
+            for next_index, next_lanes in moves:
+                if next_lanes and next_index < len(lines):
+                    groups.setdefault(next_index, []).extend(next_lanes)
+
+            while len(groups) > self.max_groups:
+                smallest = min(groups, key=lambda i: len(groups[i]))
+                self.run_single_lanes(groups.pop(smallest))
+
+    def step(self, index, lanes):
+        """Run the statement at a line index for a group of lanes.
+
+        Returns:
+          A list of (line index, lanes) pairs for where the lanes go next.
+          Lanes that end are left out.
+        """
+
+        statement_obj = self.program.statement(index)
+        next_index = index + 1
+        self.steps += 1
+
+        if isinstance(statement_obj, statement_parser.Let):
+            values = self.evaluate(statement_obj.value, lanes)
+            column = self.column(statement_obj.var.name)
+            for lane, value in zip(lanes, values):
+                column[lane] = value
+        elif isinstance(statement_obj, statement_parser.Print):
+            values = self.evaluate(statement_obj.arg, lanes)
+            outputs = self.outputs
+            for lane, value in zip(lanes, values):
+                outputs[lane].append(value)
+        elif isinstance(statement_obj, statement_parser.IfThen):
+            values1 = self.evaluate(statement_obj.arg1, lanes)
+            values2 = self.evaluate(statement_obj.arg2, lanes)
+            compare = COMPARISONS[type(statement_obj.bool_op)]
+            taken = []
+            not_taken = []
+            for lane, value1, value2 in zip(lanes, values1, values2):
+                if compare(value1, value2):
+                    taken.append(lane)
+                else:
+                    not_taken.append(lane)
+            target = self.label_index(statement_obj.label.value)
+            return [(target, taken), (next_index, not_taken)]
+        elif isinstance(statement_obj, statement_parser.Goto):
+            return self.step_goto(statement_obj, lanes)
+        elif isinstance(statement_obj, statement_parser.For):
+            return self.step_for(statement_obj, lanes, next_index)
+        elif isinstance(statement_obj, statement_parser.Next):
+            return self.step_next(statement_obj, lanes, next_index)
+        elif isinstance(statement_obj, statement_parser.End):
+            return []
+
+        return [(next_index, lanes)]
+
+    def step_goto(self, goto_obj, lanes):
+        """Run a GOTO, splitting the lanes if the label is computed."""
+
+        if isinstance(goto_obj.label, parser.Number):
+            return [(self.label_index(goto_obj.label.value), lanes)]
+
+        targets = {}
+        values = self.evaluate(goto_obj.label, lanes)
+        for lane, value in zip(lanes, values):
+            targets.setdefault(self.label_index(value), []).append(lane)
+
+        return list(targets.items())
+
+    def step_for(self, for_obj, lanes, next_index):
+        """Run a FOR, starting the loop in every lane."""
+
+        var_name = for_obj.var.name
+        column = self.column(var_name)
+        loops = self.for_loops.get(var_name)
+        if loops is None:
+            loops = [None] * len(self.inputs_list)
+            self.for_loops[var_name] = loops
+
+        start_value = for_obj.start.value
+        loop = (next_index, for_obj.end.value)
+        for lane in lanes:
+            column[lane] = start_value
+            loops[lane] = loop
+
+        return [(next_index, lanes)]
+
+    def step_next(self, next_obj, lanes, next_index):
+        """Run a NEXT, splitting off the lanes whose loops are done."""
+
+        var_name = next_obj.var.name
+        column = self.column(var_name)
+        loops = self.for_loops[var_name]
+
+        targets = {}
+        done = []
+        for lane in lanes:
+            value = column[lane] + 1
+            column[lane] = value
+            loop_index, end_value = loops[lane]
+            if value > end_value:
+                loops[lane] = None
+                done.append(lane)
+            else:
+                targets.setdefault(loop_index, []).append(lane)
+
+        return [(next_index, done)] + list(targets.items())
@@ -0,0 +1,273 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Cache the results of deterministic programs.
+
+A program that calls no RND and has no INPUT prints the same values and
+ends with the same variables every time it is run with the same bound
+inputs.  Its result is kept in a cache directory under a key of the
+program source hash and the inputs, and a later run replays the values
+printed instead of running the program.
+
+An entry is only written for a deterministic program, so a hit needs no
+check of the program.  Each hit touches the entry, and after an entry
+is written the least recently used ones are removed until the directory
+is under its size limit.
+"""
+
+import hashlib
+import os
+import pickle
+
+from basic_lang import atomic_file
+from basic_lang import error
+from basic_lang import parser
+from basic_lang import statement_parser
+
+MAGIC = b'BASRES1\n'
+ENTRY_SUFFIX = '.res'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheEntryError(error.Error):
+    """A cache entry is damaged."""
+
+
+# The parts that can hold an RND call.
+PART_TYPES = (parser.Expression, list, tuple)
+
+
+def is_deterministic(program_obj):
+    """Return True if a program calls no RND and has no INPUT.
+
+    The expressions of each statement are walked through their slots
+    with one stack for the whole program.
+    """
+
+    stack = []
+    for statement_obj in program_obj.iter_statements():
+        if isinstance(statement_obj, statement_parser.Input):
+            return False
+        stack.append(statement_obj)
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, (list, tuple)):
+                values = obj
+            elif isinstance(obj, parser.FunctionCall) and obj.name == 'RND':
+                return False
+            else:
+                values = [getattr(obj, name, None)
+                          for name in type(obj).__slots__]
+            for value in values:
+                if isinstance(value, PART_TYPES):
+                    stack.append(value)
+
+    return True
+
+
+def result_key(program_obj, inputs=None):
+    """Return the cache key of a program and its bound inputs.
+
+    Returns:
+      A hex str, or None for a program without a source hash.
+    """
+
+    if program_obj.source_hash is None:
+        return None
+
+    items = sorted((name, getattr(value, 'value', value))
+                   for name, value in (inputs or {}).items())
+    key_source = '{0}\n{1!r}'.format(program_obj.source_hash, items)
+
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+class CachedResult():
+    """The values printed by a run and its final variables."""
+
+    __slots__ = ('output', 'values')
+
+    def __init__(self, output, values):
+        """Initialize the result.
+
+        Args:
+          output: list. The values printed, in order.
+          values: dict. The values of the variables by name.
+        """
+
+        self.output = output
+        self.values = values
+
+
+class ResultCache():
+    """A directory of cached results with a size limit."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """Initialize the cache, creating the directory if needed.
+
+        Args:
+          directory: str. The cache directory.
+          max_bytes: int. The size the entries are evicted down to.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_file(self, key):
+        """Return the file name of an entry."""
+
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Return the CachedResult for a key, or None.
+
+        A damaged entry is removed and is a miss.
+        """
+
+        file_name = self.entry_file(key)
+        try:
+            with open(file_name, 'rb') as in_file:
+                data = in_file.read()
+            result = parse_entry(data)
+            os.utime(file_name)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except CacheEntryError:
+            remove_file(file_name)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return result
+
+    def put(self, key, result):
+        """Write the entry for a key and evict old entries."""
+
+        file_name = self.entry_file(key)
+        with atomic_file.replacing(file_name) as out_file:
+            out_file.write(format_entry(result))
+
+        self.evict(keep=file_name)
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries over the size limit.
+
+        Args:
+          keep: str. An entry file that is never removed.
+        """
+
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                remove_file(path)
+                total -= size
+
+
+def format_entry(result):
+    """Return the contents of an entry file."""
+
+    return MAGIC + pickle.dumps((result.output, result.values),
+                                pickle.HIGHEST_PROTOCOL)
+
+
+def parse_entry(data):
+    """Return the CachedResult in the contents of an entry file."""
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise CacheEntryError('Not a cache entry')
+
+    try:
+        output, values = pickle.loads(data[len(MAGIC):])
+    except (pickle.UnpicklingError, EOFError, ValueError, TypeError) as exc:
+        raise CacheEntryError('Damaged cache entry: {0}'.format(exc))
+
+    return CachedResult(output, values)
+
+
+def remove_file(file_name):
+    """Remove a file that another process may have removed first."""
+
+    try:
+        os.remove(file_name)
+    except FileNotFoundError:
+        pass
+
+
+def replay(engine, result):
+    """Put a cached result into an engine as if it had run.
+
+    The values are printed unless the engine is in test mode and are
+    appended to its output list.  Arrays are not cached, so they are
+    not set.
+    """
+
+    engine.bind(result.values)
+    for value in result.output:
+        if engine.output is not None:
+            engine.output.append(value)
+        if not engine.test_mode:
+            print(value)
+
+
+def run_cached(engine, cache, inputs=None):
+    """Run an engine's program or replay its cached result.
+
+    Runs with counters, callbacks or coverage aren't cached since a
+    replay wouldn't set them.
+
+    Args:
+      engine: program.ExecutionEngine. The engine to run.
+      cache: ResultCache. The cache.
+      inputs: dict. Values of variables to set before the run.
+
+    Returns:
+      True if the result was replayed from the cache.
+    """
+
+    key = result_key(engine.program, inputs)
+    if key is None or engine.is_instrumented() or (
+            engine.coverage is not None):
+        engine.run(inputs)
+        return False
+
+    result = cache.get(key)
+    if result is not None:
+        if engine.run_count:
+            engine.reset()
+        engine.run_count += 1
+        replay(engine, result)
+        return True
+
+    output = engine.output
+    if output is None:
+        engine.output = []
+    start = len(engine.output)
+    try:
+        engine.run(inputs)
+        printed = engine.output[start:]
+    finally:
+        engine.output = output
+
+    if not engine.stopped and is_deterministic(engine.program):
+        cache.put(key, CachedResult(printed, engine.values()))
+
+    return False
@@ -0,0 +1,332 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Object files that load statements when they are first run.
+
+An object file is the magic bytes, the offset of the index and then
+sections, each a pickle of one constant, statement or loop kernel or of
+the DATA values.  The index holds the line numbers, the statement
+kind codes, the line number index and the offsets of the sections.  A
+program is linked before it is written, so loading one only reads the
+index and the DATA values and a statement is unpickled the first time
+it is used.  A program that runs a small part of its code starts in
+about the same time whatever its size.
+
+Objects shared between sections are written once and stored in a
+section as a reference, so constants are still shared as they are in
+the constant pool.  Files written by pickling a Program are still
+loaded, all at once.
+"""
+
+import array
+import collections.abc
+import io
+import mmap
+import pickle
+import struct
+
+from basic_lang import error
+from basic_lang import program
+
+MAGIC = b'BASOBJ1\n'
+OFFSET_FORMAT = '<Q'
+
+# The kinds of references to other sections.
+CONSTANT = 'c'
+STATEMENT = 's'
+
+
+class ObjectFileError(error.Error):
+    """An object file is damaged or of an unknown format."""
+
+
+class SectionPickler(pickle.Pickler):
+    """Pickle one section, writing references to the other sections."""
+
+    def __init__(self, out_file, references, root):
+        """Initialize the pickler.
+
+        Args:
+          out_file: A binary file.
+          references: dict. References by the id of each section object.
+          root: The object of this section, which is pickled in full.
+        """
+
+        super().__init__(out_file, pickle.HIGHEST_PROTOCOL)
+        self.references = references
+        self.root = root
+
+    def persistent_id(self, obj):
+        """Return the reference to another section or None."""
+
+        if obj is self.root:
+            return None
+
+        return self.references.get(id(obj))
+
+
+class SectionUnpickler(pickle.Unpickler):
+    """Unpickle one section, loading the sections it refers to."""
+
+    def __init__(self, data, program_obj):
+        """Initialize the unpickler.
+
+        Args:
+          data: bytes. The pickled section.
+          program_obj: LazyProgram. The program that loads sections.
+        """
+
+        super().__init__(io.BytesIO(data))
+        self.program = program_obj
+
+    def persistent_load(self, pid):
+        """Return the object of another section."""
+
+        kind, index = pid
+        if kind == CONSTANT:
+            return self.program.constant(index)
+
+        return self.program.statement(index)
+
+
+def write_sections(out_file, objects, references):
+    """Write a section for each object and return the offsets.
+
+    Returns:
+      An array of the offset of each section and the end of the last.
+    """
+
+    offsets = array.array('Q')
+    for obj in objects:
+        offsets.append(out_file.tell())
+        SectionPickler(out_file, references, obj).dump(obj)
+    offsets.append(out_file.tell())
+
+    return offsets
+
+
+def write_program(program_obj, out_file):
+    """Write a program to a binary file in the object file format.
+
+    The program is linked first if it isn't already.
+    """
+
+    if not program_obj.linked:
+        program_obj.link()
+
+    constants = program_obj.constant_pool.constants
+    statements = list(program_obj.iter_statements())
+    kernel_indices = sorted(program_obj.loop_kernels)
+
+    references = {id(obj): (CONSTANT, index)
+                  for index, obj in enumerate(constants)}
+    references.update((id(obj), (STATEMENT, index))
+                      for index, obj in enumerate(statements))
+
+    start = out_file.tell()
+    out_file.write(MAGIC)
+    out_file.write(struct.pack(OFFSET_FORMAT, 0))
+
+    constant_offsets = write_sections(out_file, constants, references)
+    statement_offsets = write_sections(out_file, statements, references)
+    kernels = [program_obj.loop_kernels[index] for index in kernel_indices]
+    kernel_offsets = write_sections(out_file, kernels, references)
+    data_offsets = write_sections(out_file, [program_obj.data], references)
+
+    index = {
+        'line_numbers': program_obj.line_numbers,
+        'kinds': program_obj.kinds,
+        'constant_offsets': constant_offsets,
+        'statement_offsets': statement_offsets,
+        'kernel_indices': kernel_indices,
+        'kernel_offsets': kernel_offsets,
+        'data_offsets': data_offsets,
+        'dense_index': program_obj.dense_index,
+        'dense_base': program_obj.dense_base,
+        'number_index': program_obj.number_index,
+        'source_hash': program_obj.source_hash,
+    }
+    index_offset = out_file.tell() - start
+    pickle.dump(index, out_file, pickle.HIGHEST_PROTOCOL)
+
+    end = out_file.tell()
+    out_file.seek(start + len(MAGIC))
+    out_file.write(struct.pack(OFFSET_FORMAT, index_offset))
+    out_file.seek(end)
+
+
+def write_obj_file(program_obj, file_name):
+    """Write a program to an object file."""
+
+    with open(file_name, 'wb') as out_file:
+        write_program(program_obj, out_file)
+
+
+def load_obj_file(file_name):
+    """Load a program from an object file.
+
+    Returns:
+      A LazyProgram, or a Program for a file of a pickled Program.
+    """
+
+    with open(file_name, 'rb') as in_file:
+        if in_file.read(len(MAGIC)) != MAGIC:
+            in_file.seek(0)
+            return pickle.load(in_file)
+
+        mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return LazyProgram(mapped)
+
+
+class LazyKernels(collections.abc.Mapping):
+    """The loop kernels of a LazyProgram by FOR line index.
+
+    A kernel is loaded when it is first used.
+    """
+
+    def __init__(self, program_obj, kernel_indices, kernel_offsets):
+        """Initialize the kernel offsets.
+
+        Args:
+          program_obj: LazyProgram. The program of the kernels.
+          kernel_indices: list of int. The FOR line index of each kernel.
+          kernel_offsets: array. The section offsets of the kernels.
+        """
+
+        self.program = program_obj
+        self.sections = {index: number
+                         for number, index in enumerate(kernel_indices)}
+        self.offsets = kernel_offsets
+        self.kernels = {}
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __getitem__(self, index):
+        kernel = self.kernels.get(index)
+        if kernel is None:
+            number = self.sections[index]
+            kernel = self.program.load_section(self.offsets, number)
+            self.kernels[index] = kernel
+
+        return kernel
+
+
+class LazyProgram(program.Program):
+    """A linked program read from an object file as it runs.
+
+    Adding a line links the program again on the next run, which loads
+    every statement.  Pickling a LazyProgram pickles an ordinary Program.
+    """
+
+    def __init__(self, mapped):
+        """Read the index of an object file.
+
+        Args:
+          mapped: mmap.mmap or bytes. The object file.
+
+        Raises:
+          ObjectFileError: if the file isn't an object file.
+        """
+
+        super().__init__()
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ObjectFileError('Not a BASIC object file')
+
+        self.mapped = mapped
+        self.constant_pool = None
+
+        index_offset, = struct.unpack_from(OFFSET_FORMAT, mapped, len(MAGIC))
+        try:
+            index = pickle.loads(mapped[index_offset:])
+        except (pickle.UnpicklingError, EOFError) as exc:
+            raise ObjectFileError('Damaged object file index: {0}'.format(
+                exc))
+
+        self.constant_offsets = index['constant_offsets']
+        self.statement_offsets = index['statement_offsets']
+        self.constants = [None] * (len(self.constant_offsets) - 1)
+        self.statements = [None] * (len(self.statement_offsets) - 1)
+        if 'line_numbers' in index:
+            self.line_numbers = index['line_numbers']
+        else:
+            self.line_numbers = array.array('q', map(int, index['labels']))
+        if 'kinds' in index:
+            self.kinds = index['kinds']
+        else:
+            self.kinds = array.array('B', map(program.statement_kind,
+                                              self.iter_statements()))
+        self.dense_index = index['dense_index']
+        self.dense_base = index['dense_base']
+        self.number_index = index['number_index']
+        self.source_hash = index.get('source_hash')
+        self.data = self.load_section(index['data_offsets'], 0)
+        self.loop_kernels = LazyKernels(self, index['kernel_indices'],
+                                        index['kernel_offsets'])
+        self.linked = True
+
+    def __reduce_ex__(self, protocol):
+        """Pickle the program as an ordinary Program."""
+
+        return (program.Program, (), vars(self.materialize()))
+
+    def load_section(self, offsets, number):
+        """Unpickle section number of a list of sections."""
+
+        data = self.mapped[offsets[number]:offsets[number + 1]]
+
+        return SectionUnpickler(data, self).load()
+
+    def constant(self, index):
+        """Return a constant, loading it if needed."""
+
+        obj = self.constants[index]
+        if obj is None:
+            obj = self.load_section(self.constant_offsets, index)
+            self.constants[index] = obj
+
+        return obj
+
+    def statement(self, index):
+        """Return the statement of a line, loading it if needed."""
+
+        statement_obj = self.statements[index]
+        if statement_obj is None:
+            statement_obj = self.load_section(self.statement_offsets, index)
+            self.statements[index] = statement_obj
+
+        return statement_obj
+
+    def iter_statements(self):
+        """Return an iterator over the statements, loading them all."""
+
+        return map(self.statement, range(len(self.statements)))
+
+    def materialize(self):
+        """Return an ordinary Program with all the lines loaded."""
+
+        program_obj = program.Program()
+        for index in range(len(self.constants)):
+            program_obj.constant_pool.intern(self.constant(index))
+        for label, statement_obj in self.lines:
+            program_obj.add_line(label, statement_obj)
+        program_obj.source_hash = self.source_hash
+
+        return program_obj
+
+    def current_statement(self):
+        """Return the current statement, loading it if needed."""
+
+        index = self.current_line
+        if index == len(self.statements):
+            return None
+
+        statement_obj = self.statements[index]
+        if statement_obj is None:
+            statement_obj = self.statement(index)
+
+        return statement_obj
@@ -3,12 +3,27 @@
 
 """Parse BASIC code."""
 
+import math
 import re
 from basic_lang import error
 
-NUM_REGEX = re.compile('^[0-9]')
+NUM_REGEX = re.compile(r'^\.?[0-9]')
 VAR_REGEX = re.compile('^[A-Z]')
-STR_REGEX = re.compile('^"(.*)"$')
+# DOTALL so a quoted INPUT value can have newlines in it.
+STR_REGEX = re.compile('^"(.*)"$', re.DOTALL)
+TOKEN_REGEX = re.compile(r"""\s*(?:
+    (?P<num>[0-9]+\.?[0-9]*(?:E[-+]?[0-9]+)?|\.[0-9]+(?:E[-+]?[0-9]+)?)
+    |(?P<str>"[^"]*")
+    |(?P<name>[A-Z][A-Z0-9]*\$?)
+    |(?P<op><>|<=|>=|=>|[-+*/^()=<>,])
+    )""", re.VERBOSE)
+
+OPERATORS = {}
+# Whole floats smaller than this are exact as ints.
+MAX_EXACT_FLOAT = 2 ** 53
+
+# The symbol table key of the engine's random number draw function.
+RND_KEY = '%RND'
 
 
 class ArithmeticOpError(error.Error):
@@ -25,8 +40,29 @@ class InvalidOperatorError(error.Error):
     """Invalid operator."""
 
 
+class ExpressionSyntaxError(error.Error):
+    """An expression could not be parsed."""
+
+
 class Parser():
-    """A parser that can parse BASIC code."""
+    """A parser that can parse BASIC code.
+
+    Variables are shared, one Variable object per name for everything
+    parsed by this parser.
+    """
+
+    def __init__(self, constant_pool=None):
+        """Initialize the shared variables and the constant pool.
+
+        Args:
+          constant_pool: ConstantPool. Literals and expressions are
+              interned here.  A new pool is made if none is given.
+        """
+
+        self.variables = {}
+        if constant_pool is None:
+            constant_pool = ConstantPool()
+        self.constant_pool = constant_pool
 
     def parse_primative_obj(self, input_str):
         """Parse an input str and return a primative object."""
@@ -42,28 +78,48 @@ class Parser():
             return obj
 
     def parse_num(self, input_str):
-        """Parse a number."""
+        """Parse a number and return the pooled object for its value."""
 
-        return self.parse_primative(NUM_REGEX, Number, input_str)
+        obj = self.parse_primative(NUM_REGEX, Number, input_str)
+        if obj:
+            obj = self.constant_pool.intern(obj)
+
+        return obj
 
     def parse_str(self, input_str):
-        """Parse a string."""
+        """Parse a string and return the pooled object for its value."""
 
-        return self.parse_primative(STR_REGEX, String, input_str)
+        obj = self.parse_primative(STR_REGEX, String, input_str)
+        if obj:
+            obj = self.constant_pool.intern(obj)
+
+        return obj
 
     def parse_var(self, input_str):
-        """Parse a string."""
+        """Parse a variable and return the shared object for its name."""
+
+        obj = self.variables.get(input_str)
+        if obj is None:
+            obj = self.parse_primative(VAR_REGEX, Variable, input_str)
+            if obj:
+                self.variables[input_str] = obj
 
-        return self.parse_primative(VAR_REGEX, Variable, input_str)
+        return obj
 
     def parse_primative(self, regex, prim_class, input_str):
-        """Parse a primative object str."""
+        """Parse a primative object str.
 
-        match = regex.search(input_str)
-        if match:
-            result = prim_class(input_str)
-        else:
-            result = None
+        Returns:
+          The object, or None if the str is not a primative of the class.
+        """
+
+        result = None
+        if regex.search(input_str):
+            try:
+                result = prim_class(input_str)
+            except ValueError:
+                # Only the start matched, as with "1 +".
+                pass
 
         return result
 
@@ -84,60 +140,545 @@ class Parser():
     def parse_arith_expr(self, input_str):
         """Parse an arithmetic expression.
 
+        The grammar, from the lowest to the highest precedence, is:
+
+          sum:     product (('+' | '-') product)*
+          product: unary (('*' | '/') unary)*
+          unary:   '-' unary | '+' unary | power
+          power:   atom ('^' unary)?
+          atom:    number | string | variable | '(' sum ')'
+
+        Returns:
+          The expression object or None if the str is not an expression.
+          A single primative like "X" is returned as that primative.
+        """
+
+        try:
+            tokens = TokenStream(input_str)
+            result = self.parse_sum(tokens)
+            tokens.expect_end()
+        except ExpressionSyntaxError:
+            result = None
+
+        return result
+
+    def parse_condition(self, input_str):
+        """Parse a condition of two expressions and a boolean operator.
+
         Returns:
-          A list of three objects, arith primatives with an arith operator
-          in the middle.
+          A tuple of the first expression, the boolean operator and the
+          second expression or None if the str is not a condition.
         """
 
-        words = input_str.split()
-        if len(words) != 3:
+        try:
+            tokens = TokenStream(input_str)
+            arg1 = self.parse_sum(tokens)
+            bool_op = self.parse_bool_op(tokens.next_token())
+            if bool_op is None:
+                raise ExpressionSyntaxError(
+                    'No boolean operator in {0}'.format(input_str))
+            arg2 = self.parse_sum(tokens)
+            tokens.expect_end()
+            result = (arg1, bool_op, arg2)
+        except ExpressionSyntaxError:
             result = None
+
+        return result
+
+    def parse_sum(self, tokens):
+        """Parse terms joined by + and -."""
+
+        obj = self.parse_product(tokens)
+        while tokens.peek() in ('+', '-'):
+            arith_op = self.parse_arith_op(tokens.next_token())
+            obj = self.make_expression(obj, arith_op,
+                                       self.parse_product(tokens))
+
+        return obj
+
+    def parse_product(self, tokens):
+        """Parse factors joined by * and /."""
+
+        obj = self.parse_unary(tokens)
+        while tokens.peek() in ('*', '/'):
+            arith_op = self.parse_arith_op(tokens.next_token())
+            obj = self.make_expression(obj, arith_op,
+                                       self.parse_unary(tokens))
+
+        return obj
+
+    def parse_unary(self, tokens):
+        """Parse a unary minus or plus.
+
+        A negated number literal is folded into a negative number.
+        """
+
+        if tokens.peek() == '-':
+            tokens.next_token()
+            arg = self.parse_unary(tokens)
+            if isinstance(arg, Number):
+                obj = self.constant_pool.intern(Number(-arg.value))
+            else:
+                obj = self.constant_pool.intern(Negation(arg))
+        elif tokens.peek() == '+':
+            tokens.next_token()
+            obj = self.parse_unary(tokens)
         else:
-            arg1 = self.parse_primative_obj(words[0])
-            arith_op = self.parse_arith_op(words[1])
-            arg2 = self.parse_primative_obj(words[2])
+            obj = self.parse_power(tokens)
+
+        return obj
+
+    def parse_power(self, tokens):
+        """Parse an exponent.  The ^ operator is right associative."""
+
+        obj = self.parse_atom(tokens)
+        if tokens.peek() == '^':
+            arith_op = self.parse_arith_op(tokens.next_token())
+            obj = self.make_expression(obj, arith_op,
+                                       self.parse_unary(tokens))
+
+        return obj
 
-            if arg1 and arith_op and arg2:
-                result = ArithmeticExpression(arg1, arith_op, arg2)
+    def parse_atom(self, tokens):
+        """Parse a primative or an expression in parentheses."""
+
+        token = tokens.next_token()
+        if token == '(':
+            obj = self.parse_sum(tokens)
+            tokens.expect(')')
+        elif token in FUNCTIONS and tokens.peek() == '(':
+            obj = self.parse_function_call(token, tokens)
+        elif token is not None and token not in OPERATOR_TOKENS:
+            if tokens.peek() == '(' and VAR_REGEX.search(token):
+                obj = self.parse_array_element(token, tokens)
             else:
-                result = None
+                obj = self.parse_primative_obj(token)
+        else:
+            obj = None
+
+        if not obj:
+            raise ExpressionSyntaxError(
+                'Unexpected token {0}'.format(token))
+
+        return obj
+
+    def parse_array_element(self, name, tokens):
+        """Parse the indices in parentheses after an array name."""
+
+        tokens.expect('(')
+        indices = [self.parse_sum(tokens)]
+        while tokens.peek() == ',':
+            tokens.next_token()
+            indices.append(self.parse_sum(tokens))
+        tokens.expect(')')
+
+        return self.constant_pool.intern(ArrayElement(name, tuple(indices)))
+
+    def parse_function_call(self, name, tokens):
+        """Parse the args in parentheses after a built-in function name."""
+
+        tokens.expect('(')
+        args = [self.parse_sum(tokens)]
+        while tokens.peek() == ',':
+            tokens.next_token()
+            args.append(self.parse_sum(tokens))
+        tokens.expect(')')
+
+        arg_count = FUNCTIONS[name][1]
+        if len(args) != arg_count:
+            raise ExpressionSyntaxError(
+                'Function {0} takes {1} args not {2}'.format(
+                    name, arg_count, len(args)))
+
+        return self.constant_pool.intern(FunctionCall(name, tuple(args)))
+
+    def parse_target(self, input_str):
+        """Parse the target of an assignment.
+
+        Returns:
+          A Variable or ArrayElement or None if the str is neither.
+        """
+
+        try:
+            tokens = TokenStream(input_str)
+            result = self.parse_target_tokens(tokens)
+            tokens.expect_end()
+        except ExpressionSyntaxError:
+            result = None
 
         return result
 
-    def parse_arith_op(self, input_str):
-        """Parse an arithmetic operator and return the object."""
-
-        if input_str == '+':
-            return ArithmeticAdd()
-        elif input_str == '-':
-            return ArithmeticSub()
-        elif input_str == '*':
-            return ArithmeticMul()
-        elif input_str == '/':
-            return ArithmeticDiv()
+    def parse_target_list(self, input_str):
+        """Parse comma separated assignment targets such as X, A(I, J).
+
+        Returns:
+          A tuple of Variable and ArrayElement objects or None if the str
+          is not a list of targets.
+        """
+
+        targets = []
+        try:
+            tokens = TokenStream(input_str)
+            targets.append(self.parse_target_tokens(tokens))
+            while tokens.peek() == ',':
+                tokens.next_token()
+                targets.append(self.parse_target_tokens(tokens))
+            tokens.expect_end()
+        except ExpressionSyntaxError:
+            return None
+
+        return tuple(targets)
+
+    def parse_target_tokens(self, tokens):
+        """Parse one assignment target from the tokens."""
+
+        name = tokens.next_token()
+        if name is None or not VAR_REGEX.search(name):
+            raise ExpressionSyntaxError('Invalid target {0}'.format(name))
+        if tokens.peek() == '(':
+            result = self.parse_array_element(name, tokens)
         else:
+            result = self.parse_var(name)
+
+        return result
+
+    def parse_data_values(self, input_str):
+        """Parse comma separated literals such as 1, -2.5, "AB".
+
+        Returns:
+          A tuple of the pooled Number and String objects or None if the
+          str is not a list of literals.
+        """
+
+        values = []
+        try:
+            tokens = TokenStream(input_str)
+            while True:
+                values.append(self.parse_data_value(tokens))
+                if tokens.peek() is None:
+                    break
+                tokens.expect(',')
+        except ExpressionSyntaxError:
             return None
 
+        return tuple(values)
+
+    def parse_data_value(self, tokens):
+        """Parse one literal, a number with an optional sign or a string."""
+
+        token = tokens.next_token()
+        sign = ''
+        if token in ('-', '+'):
+            sign = token
+            token = tokens.next_token()
+
+        if token is not None and NUM_REGEX.search(token):
+            obj = self.constant_pool.intern(Number(sign + token))
+        elif token is not None and not sign and STR_REGEX.search(token):
+            obj = self.parse_str(token)
+        else:
+            raise ExpressionSyntaxError('Invalid DATA value {0}'.format(token))
+
+        return obj
+
+    def parse_array_decls(self, input_str):
+        """Parse comma separated array declarations such as A(10), B(3, 4).
+
+        Returns:
+          A list of (name, bounds) tuples, with bounds a tuple of ints, or
+          None if the str is not a list of declarations.
+        """
+
+        decls = []
+        try:
+            tokens = TokenStream(input_str)
+            while True:
+                name = tokens.next_token()
+                if name is None or not VAR_REGEX.search(name):
+                    raise ExpressionSyntaxError(
+                        'Invalid array name {0}'.format(name))
+                tokens.expect('(')
+                bounds = [self.parse_bound(tokens.next_token())]
+                while tokens.peek() == ',':
+                    tokens.next_token()
+                    bounds.append(self.parse_bound(tokens.next_token()))
+                tokens.expect(')')
+                decls.append((name, tuple(bounds)))
+
+                if tokens.peek() is None:
+                    break
+                tokens.expect(',')
+        except ExpressionSyntaxError:
+            decls = None
+
+        return decls
+
+    def parse_bound(self, token):
+        """Parse an array bound, which must be a whole number literal."""
+
+        obj = self.parse_num(token) if token else None
+        if not obj or not isinstance(obj.value, int):
+            raise ExpressionSyntaxError(
+                'Invalid array bound {0}'.format(token))
+
+        return obj.value
+
+    def make_expression(self, arg1, arith_op, arg2):
+        """Return the pooled expression of two args and an operator."""
+
+        return self.constant_pool.intern(
+            ArithmeticExpression(arg1, arith_op, arg2))
+
+    def parse_arith_op(self, input_str):
+        """Parse an arithmetic operator and return the shared object."""
+
+        return ARITH_OPS.get(input_str)
+
     def parse_bool_op(self, input_str):
-        """Parse a boolean operator and return the object."""
-
-        if input_str == '=':
-            return BoolEqual()
-        elif input_str == '<>':
-            return BoolNotEqual()
-        elif input_str == '<':
-            return BoolLessThan()
-        elif input_str == '<=':
-            return BoolLessOrEqual()
-        elif input_str == '>':
-            return BoolGreaterThan()
-        elif input_str == '=>':
-            return BoolGreaterOrEqual()
+        """Parse a boolean operator and return the shared object."""
+
+        return BOOL_OPS.get(input_str)
+
+
+class TokenStream():
+    """The tokens of an expression str with one token look ahead."""
+
+    def __init__(self, input_str):
+        """Split the input str into tokens.
+
+        Raises:
+          ExpressionSyntaxError: if part of the str is not a token.
+        """
+
+        self.tokens = []
+        self.position = 0
+
+        end = len(input_str.rstrip())
+        pos = 0
+        while pos < end:
+            match = TOKEN_REGEX.match(input_str, pos)
+            if not match or match.end() == pos:
+                raise ExpressionSyntaxError(
+                    'Invalid expression: {0}'.format(input_str))
+            self.tokens.append(match.group(match.lastgroup))
+            pos = match.end()
+
+    def peek(self):
+        """Return the next token without using it or None at the end."""
+
+        if self.position < len(self.tokens):
+            token = self.tokens[self.position]
+        else:
+            token = None
+
+        return token
+
+    def next_token(self):
+        """Use and return the next token or None at the end."""
+
+        token = self.peek()
+        if token is not None:
+            self.position += 1
+
+        return token
+
+    def expect(self, expected):
+        """Use the next token, which must be the expected one."""
+
+        token = self.next_token()
+        if token != expected:
+            raise ExpressionSyntaxError(
+                'Expected {0} but found {1}'.format(expected, token))
+
+    def expect_end(self):
+        """Raise an error if there are tokens left."""
+
+        if self.peek() is not None:
+            raise ExpressionSyntaxError(
+                'Unexpected token {0}'.format(self.peek()))
+
+
+class ExpressionCompiler():
+    """Compile an expression tree into a single Python function.
+
+    Each expression object writes Python source for itself through the
+    source() method, calling back here for variables and constants.  The
+    function takes the symbol table and returns the raw value.
+    """
+
+    def __init__(self):
+        """Initialize the namespace the function is compiled in."""
+
+        self.namespace = {}
+
+    def constant(self, value):
+        """Return the source for a constant value."""
+
+        if isinstance(value, str) or math.isfinite(value):
+            source = repr(value)
+        else:
+            source = '_c{0}'.format(len(self.namespace))
+            self.namespace[source] = value
+
+        return source
+
+    def variable(self, name):
+        """Return the source for the value of a variable."""
+
+        return '_st[{0!r}].value'.format(name)
+
+    def array_element(self, name, index_sources):
+        """Return the source for the value of an array element."""
+
+        return '_st[{0!r}].get({1})'.format(array_key(name),
+                                            ', '.join(index_sources))
+
+    def function_call(self, name, arg_sources):
+        """Return the source for a call of a built-in function.
+
+        The Python function is bound into the compiled function so the
+        call needs no name lookup when it runs.  RND calls the draw
+        function the engine keeps in the symbol table and ignores its
+        arg.
+        """
+
+        if name == 'RND':
+            return '_st[{0!r}]()'.format(RND_KEY)
+
+        local = '_f_{0}'.format(name)
+        self.namespace[local] = FUNCTIONS[name][0]
+
+        return '{0}({1})'.format(local, ', '.join(arg_sources))
+
+    def compile(self, expr):
+        """Return the function for an expression object."""
+
+        return self.compile_source(expr.source(self))
+
+    def compile_source(self, source):
+        """Return a function of the symbol table for Python source.
+
+        The namespace values are bound as default arguments so they are
+        local variables of the function.
+        """
+
+        params = ['_st'] + ['{0}={0}'.format(name) for name in self.namespace]
+        code = compile('lambda {0}: {1}'.format(', '.join(params), source),
+                       '<basic expression>', 'eval')
+
+        return eval(code, self.namespace)
+
+
+def array_key(name):
+    """Return the symbol table key of an array.
+
+    Arrays have their own names apart from the simple variables so A and
+    A() can both be used.
+    """
+
+    return name + '()'
+
+
+def make_number_value(value):
+    """Return a number value with whole floats made into ints.
+
+    BASIC numbers print without a decimal point when they are whole.
+    """
+
+    if (type(value) is float and value.is_integer() and
+            abs(value) < MAX_EXACT_FLOAT):
+        value = int(value)
+
+    return value
+
+
+def constant_key(obj):
+    """Return a hashable key for the structure and value of an object.
+
+    Two objects with the same key can be shared.  The args of an
+    expression are pooled before the expression is, so they are in the
+    key as themselves, which hash and compare by identity.  A key is
+    then a flat tuple however deep the expression is.
+    """
+
+    if isinstance(obj, (Number, String)):
+        key = (type(obj).__name__, type(obj.value).__name__, obj.value)
+    elif isinstance(obj, Variable):
+        key = ('Variable', obj.name)
+    elif isinstance(obj, ArithmeticExpression):
+        key = ('ArithmeticExpression', obj.arg1, obj.arith_op.symbol,
+               obj.arg2)
+    elif isinstance(obj, Negation):
+        key = ('Negation', obj.arg)
+    elif isinstance(obj, ArrayElement):
+        key = ('ArrayElement', obj.name) + tuple(obj.indices)
+    elif isinstance(obj, FunctionCall):
+        key = ('FunctionCall', obj.name) + tuple(obj.args)
+    else:
+        raise TypeError('Object {0} can not be pooled.'.format(obj))
+
+    return key
+
+
+class ConstantPool():
+    """A per-program pool of constants.
+
+    Literals and expressions that appear more than once in a program are
+    stored once here and shared by every statement that uses them.
+    Since the statements refer to the same objects, a pickled program
+    also stores each constant once.
+    """
+
+    def __init__(self):
+        """Initialize the constants list and the key index."""
+
+        self.constants = []
+        self.index = {}
+
+    def __len__(self):
+        """Return the number of constants."""
+
+        return len(self.constants)
+
+    def __getitem__(self, index):
+        """Return the constant at an index."""
+
+        return self.constants[index]
+
+    def __getstate__(self):
+        """Pickle only the constants.  The index is rebuilt on load."""
+
+        return self.constants
+
+    def __setstate__(self, state):
+        """Restore the constants and rebuild the index."""
+
+        self.constants = state
+        self.index = {constant_key(obj): i for i, obj in enumerate(state)}
+
+    def intern(self, obj):
+        """Return the pooled object equal to obj, adding obj if needed."""
+
+        key = constant_key(obj)
+        index = self.index.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.index[key] = index
+            self.constants.append(obj)
+
+        return self.constants[index]
+
+    def index_of(self, obj):
+        """Return the pool index of an object or None."""
+
+        return self.index.get(constant_key(obj))
 
 
 class String():
     """A string primative object."""
 
+    __slots__ = ('value',)
+
     def __init__(self, input_str):
         """Create a number from a string."""
 
@@ -149,24 +690,46 @@ class String():
 
         return self.value
 
+    def source(self, compiler):
+        """Return the Python source for the value."""
+
+        return compiler.constant(self.value)
+
 
 class Number():
     """A number primative object."""
 
+    __slots__ = ('value',)
+
     def __init__(self, input_str):
-        """Create a number from a string."""
+        """Create a number from a string or a number value."""
+
+        if isinstance(input_str, str):
+            try:
+                value = int(input_str)
+            except ValueError:
+                value = float(input_str)
+        else:
+            value = input_str
 
-        self.value = int(input_str)
+        self.value = make_number_value(value)
 
     def eval(self, symbol_table):
         """Evaluate a string."""
 
         return self.value
 
+    def source(self, compiler):
+        """Return the Python source for the value."""
+
+        return compiler.constant(self.value)
+
 
 class Variable():
     """A variable object."""
 
+    __slots__ = ('name', 'value')
+
     def __init__(self, input_str):
         """Create a variable object."""
 
@@ -184,141 +747,336 @@ class Variable():
 
         return obj
 
+    def assign(self, symbol_table, obj):
+        """Bind a primative object to this variable."""
+
+        symbol_table[self.name] = obj
+
+    def source(self, compiler):
+        """Return the Python source for the value."""
+
+        return compiler.variable(self.name)
+
+
+class Operator():
+    """An operator.
+
+    Operators have no state beyond their class so each one is a
+    singleton.  Creating an operator, including by unpickling, returns
+    the one shared instance.
+    """
+
+    __slots__ = ()
+    symbol = None
+
+    def __new__(cls):
+        """Return the shared instance of the operator class."""
+
+        obj = OPERATORS.get(cls)
+        if obj is None:
+            obj = super().__new__(cls)
+            OPERATORS[cls] = obj
+
+        return obj
+
 
-class ArithmeticOp():
+class ArithmeticOp(Operator):
     """An aorithmetic operator."""
 
+    __slots__ = ()
+
+    @property
+    def python_symbol(self):
+        """The Python operator for this operator."""
+
+        return self.symbol
+
 
 class ArithmeticAdd(ArithmeticOp):
     """An addition operator."""
 
-    def __init__(self):
-        """Initialize the operator symbol."""
-
-        self.symbol = '+'
+    __slots__ = ()
+    symbol = '+'
 
 
 class ArithmeticSub(ArithmeticOp):
     """An subtraction operator."""
 
-    def __init__(self):
-        """Initialize the operator symbol."""
-
-        self.symbol = '-'
+    __slots__ = ()
+    symbol = '-'
 
 
 class ArithmeticMul(ArithmeticOp):
     """An multiplication operator."""
 
-    def __init__(self):
-        """Initialize the operator symbol."""
-
-        self.symbol = '*'
+    __slots__ = ()
+    symbol = '*'
 
 
 class ArithmeticDiv(ArithmeticOp):
     """An division operator."""
 
-    def __init__(self):
-        """Initialize the operator symbol."""
+    __slots__ = ()
+    symbol = '/'
+
+
+class ArithmeticPow(ArithmeticOp):
+    """An exponent operator."""
+
+    __slots__ = ()
+    symbol = '^'
+    python_symbol = '**'
+
+
+class Expression():
+    """The base of compound expressions.
+
+    An expression is compiled into one Python function the first time
+    it is evaluated.  The function is not pickled but compiled again
+    after loading.
+    """
+
+    __slots__ = ('function',)
+    fields = ()
+
+    def __getstate__(self):
+        """Return the field values without the compiled function."""
+
+        return tuple(getattr(self, name) for name in self.fields)
+
+    def __setstate__(self, state):
+        """Restore the field values."""
+
+        for name, value in zip(self.fields, state):
+            setattr(self, name, value)
+        self.function = None
+
+    def compile(self):
+        """Compile the expression into a function of the symbol table."""
+
+        self.function = ExpressionCompiler().compile(self)
+
+        return self.function
+
+    def eval(self, symbol_table):
+        """Evaluate the expression and return a Number."""
 
-        self.symbol = '/'
+        function = self.function
+        if function is None:
+            function = self.compile()
 
+        try:
+            value = function(symbol_table)
+        except KeyError as exc:
+            raise UndefinedVariableError(
+                'The variable {0} is undefined'.format(exc.args[0]))
+        except (TypeError, ValueError, OverflowError) as exc:
+            raise ArithmeticOpError(
+                'Invalid arithmetic: {0}'.format(exc))
+
+        if not isinstance(value, (int, float)):
+            raise ArithmeticOpError(
+                'Object {0} is not a Number.'.format(value))
 
-class ArithmeticExpression():
+        return Number(value)
+
+
+class ArithmeticExpression(Expression):
     """An arithmetic expression."""
 
+    __slots__ = ('arg1', 'arith_op', 'arg2')
+    fields = __slots__
+
     def __init__(self, arg1, arith_op, arg2):
         """Initialize with the three args.
 
         Args:
-          arg1: Variable or Number.
+          arg1: A primative or expression.
           arith_op: ArithmeticOp.
-          arg2: Variable or Number.
+          arg2: A primative or expression.
         """
 
         self.arg1 = arg1
         self.arith_op = arith_op
         self.arg2 = arg2
+        self.function = None
 
-    def eval_num_arg(self, obj, symbol_table):
-        """Evaluate an expression argument.
+    def source(self, compiler):
+        """Return the Python source for the expression."""
 
-        We only allow for the object to be a Number or Variable.
-        """
+        if not isinstance(self.arith_op, ArithmeticOp):
+            raise InvalidOperatorError(
+                'Invalid Operator Error: {0}'.format(self.arith_op))
 
-        if isinstance(obj, Variable):
-            obj = obj.eval(symbol_table)
-        if not isinstance(obj, Number):
-            raise ArithmeticOpError(
-                'Object {0} is not a Number.'.format(obj))
+        return '({0} {1} {2})'.format(self.arg1.source(compiler),
+                                      self.arith_op.python_symbol,
+                                      self.arg2.source(compiler))
 
-        return obj
 
-    def eval(self, symbol_table):
-        """Evaluate the expression."""
+class Negation(Expression):
+    """A unary minus expression."""
 
-        obj1 = self.eval_num_arg(self.arg1, symbol_table)
-        obj2 = self.eval_num_arg(self.arg2, symbol_table)
+    __slots__ = ('arg',)
+    fields = __slots__
 
-        op_symbol = self.arith_op.symbol
+    def __init__(self, arg):
+        """Initialize with the negated arg."""
+
+        self.arg = arg
+        self.function = None
+
+    def source(self, compiler):
+        """Return the Python source for the expression."""
+
+        return '(-{0})'.format(self.arg.source(compiler))
 
-        if op_symbol == '+':
-            value = obj1.value + obj2.value
-        elif op_symbol == '-':
-            value = obj1.value - obj2.value
-        elif op_symbol == '*':
-            value = obj1.value * obj2.value
-        elif op_symbol == '/':
-            value = obj1.value / obj2.value
-        else:
-            raise InvalidOperatorError(
-                'Invalid Operator Error: {0}'.format(op_symbol))
 
-        return Number(str(value))
+class ArrayElement(Expression):
+    """An element of an array such as A(I) or B(I, J + 1)."""
 
+    __slots__ = ('name', 'indices', 'index_function')
+    fields = ('name', 'indices')
 
-class BooleanOp():
+    def __init__(self, name, indices):
+        """Initialize with the array name and the index expressions."""
+
+        self.name = name
+        self.indices = indices
+        self.function = None
+        self.index_function = None
+
+    def __setstate__(self, state):
+        """Restore the fields without the compiled functions."""
+
+        super().__setstate__(state)
+        self.index_function = None
+
+    def source(self, compiler):
+        """Return the Python source for the element value."""
+
+        return compiler.array_element(
+            self.name, [index.source(compiler) for index in self.indices])
+
+    def assign(self, symbol_table, obj):
+        """Store the value of a primative object in the element."""
+
+        function = self.index_function
+        if function is None:
+            compiler = ExpressionCompiler()
+            index_sources = [index.source(compiler) for index in self.indices]
+            function = compiler.compile_source(
+                '({0},)'.format(', '.join(index_sources)))
+            self.index_function = function
+
+        try:
+            indices = function(symbol_table)
+            array_obj = symbol_table[array_key(self.name)]
+        except KeyError as exc:
+            raise UndefinedVariableError(
+                'The variable {0} is undefined'.format(exc.args[0]))
+
+        array_obj.set(obj.value, *indices)
+
+
+class FunctionCall(Expression):
+    """A call of a built-in function such as SQR(X)."""
+
+    __slots__ = ('name', 'args')
+    fields = __slots__
+
+    def __init__(self, name, args):
+        """Initialize with the function name and the arg expressions."""
+
+        self.name = name
+        self.args = args
+        self.function = None
+
+    def source(self, compiler):
+        """Return the Python source for the call."""
+
+        return compiler.function_call(
+            self.name, [arg.source(compiler) for arg in self.args])
+
+
+class BooleanOp(Operator):
     """A boolean operator."""
 
+    __slots__ = ()
+
 
 class BoolEqual(BooleanOp):
     """Boolean equal."""
 
-    def __init__(self):
-        self.symbol = '='
+    __slots__ = ()
+    symbol = '='
 
 
 class BoolNotEqual(BooleanOp):
     """Boolean equal."""
 
-    def __init__(self):
-        self.symbol = '<>'
+    __slots__ = ()
+    symbol = '<>'
 
 
 class BoolLessThan(BooleanOp):
     """Boolean less than."""
 
-    def __init__(self):
-        self.symbol = '<'
+    __slots__ = ()
+    symbol = '<'
 
 
 class BoolLessOrEqual(BooleanOp):
     """Boolean less than or equal."""
 
-    def __init__(self):
-        self.symbol = '<='
+    __slots__ = ()
+    symbol = '<='
 
 
 class BoolGreaterThan(BooleanOp):
     """Boolean greater than."""
 
-    def __init__(self):
-        self.symbol = '>'
+    __slots__ = ()
+    symbol = '>'
 
 
 class BoolGreaterOrEqual(BooleanOp):
     """Boolean greater than or equal."""
 
-    def __init__(self):
-        self.symbol = '=>'
+    __slots__ = ()
+    symbol = '=>'
+
+
+ARITH_OPS = {op.symbol: op for op in (
+    ArithmeticAdd(), ArithmeticSub(), ArithmeticMul(), ArithmeticDiv(),
+    ArithmeticPow())}
+
+BOOL_OPS = {op.symbol: op for op in (
+    BoolEqual(), BoolNotEqual(), BoolLessThan(), BoolLessOrEqual(),
+    BoolGreaterThan(), BoolGreaterOrEqual())}
+BOOL_OPS['>='] = BoolGreaterOrEqual()
+
+
+def basic_sgn(value):
+    """Return -1, 0 or 1 for the sign of a value."""
+
+    return (value > 0) - (value < 0)
+
+
+# The built-in functions by name with their Python functions and the
+# number of args.  RND has no function here because it draws from the
+# random stream of the engine running the program.
+FUNCTIONS = {
+    'ABS': (abs, 1),
+    'ATN': (math.atan, 1),
+    'COS': (math.cos, 1),
+    'EXP': (math.exp, 1),
+    'INT': (math.floor, 1),
+    'LOG': (math.log, 1),
+    'RND': (None, 1),
+    'SGN': (basic_sgn, 1),
+    'SIN': (math.sin, 1),
+    'SQR': (math.sqrt, 1),
+    'TAN': (math.tan, 1),
+}
+
+OPERATOR_TOKENS = set(ARITH_OPS) | set(BOOL_OPS) | {'(', ')', ','}
@@ -0,0 +1,78 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""A pool of execution engines for running one program many times."""
+
+import contextlib
+
+from basic_lang import program
+
+
+class EnginePool():
+    """Engines for one compiled program kept for reuse across runs.
+
+    An engine is reset in the number of its variables, so a parameter
+    sweep pays for building engines only once.  Engine n of the pool
+    draws RND from stream n of the seed, so each engine draws numbers
+    independent of the others.
+
+    The engines share the program and its current_line, which is the
+    program counter, so a pool's engines run one at a time.  Use a pool
+    per thread, each with its own compiled program, to run at once.
+    """
+
+    def __init__(self, program_obj, **engine_args):
+        """Initialize the pool with no engines.
+
+        Args:
+          program_obj: program.Program. The program every engine runs.
+          engine_args: The ExecutionEngine args other than the stream.
+        """
+
+        self.program = program_obj
+        self.engine_args = engine_args
+        self.idle = []
+        self.size = 0
+
+    def acquire(self):
+        """Return an idle engine, making a new one if there are none."""
+
+        if self.idle:
+            return self.idle.pop()
+
+        engine = program.ExecutionEngine(self.program, stream=self.size,
+                                         **self.engine_args)
+        self.size += 1
+
+        return engine
+
+    def release(self, engine):
+        """Return an engine to the pool."""
+
+        self.idle.append(engine)
+
+    @contextlib.contextmanager
+    def engine(self):
+        """Use an engine in a with statement and then release it."""
+
+        engine = self.acquire()
+        try:
+            yield engine
+        finally:
+            self.release(engine)
+
+    def run(self, inputs=None, input_stream=None):
+        """Run the program once on a pooled engine.
+
+        Args:
+          inputs: dict. Values of variables to set before the run.
+          input_stream: A source for INPUT.
+
+        Returns:
+          A dict of the variable values at the end of the run.
+        """
+
+        with self.engine() as engine:
+            engine.run(inputs, input_stream)
+
+            return engine.values()
@@ -0,0 +1,154 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Compile a directory tree of BASIC programs into object files.
+
+Each .BAS file is compiled into an object file next to it, like
+basic_run.py -f X.BAS -o X.obj.  Files are compiled in parallel in
+worker processes.  An object file newer than its source is up to date
+and isn't compiled again.  A file that fails to compile is reported and
+the rest of the tree is still compiled.
+"""
+
+import concurrent.futures
+import os
+
+from basic_lang import atomic_file
+from basic_lang import error
+from basic_lang import loader
+from basic_lang import objfile
+from basic_lang import program
+
+BASIC_SUFFIX = '.bas'
+OBJ_SUFFIX = '.obj'
+# Files handed to a worker process at a time.
+CHUNK_SIZE = 16
+
+COMPILED = 'compiled'
+UP_TO_DATE = 'up to date'
+FAILED = 'failed'
+
+
+class CompileResult():
+    """The result of compiling one file."""
+
+    __slots__ = ('basic_file', 'obj_file', 'status', 'message')
+
+    def __init__(self, basic_file, obj_file, status, message=''):
+        """Initialize the result.
+
+        Args:
+          basic_file: str. The source file name.
+          obj_file: str. The object file name.
+          status: str. COMPILED, UP_TO_DATE or FAILED.
+          message: str. The error for a file that failed.
+        """
+
+        self.basic_file = basic_file
+        self.obj_file = obj_file
+        self.status = status
+        self.message = message
+
+    def __str__(self):
+        if self.message:
+            return '{0}: {1}: {2}'.format(self.basic_file, self.status,
+                                          self.message)
+
+        return '{0}: {1}'.format(self.basic_file, self.status)
+
+
+def obj_file_name(basic_file):
+    """Return the object file name for a source file name."""
+
+    return os.path.splitext(basic_file)[0] + OBJ_SUFFIX
+
+
+def is_up_to_date(basic_file, obj_file):
+    """Return True if an object file exists and is newer than its source."""
+
+    try:
+        return os.stat(obj_file).st_mtime >= os.stat(basic_file).st_mtime
+    except OSError:
+        return False
+
+
+def iter_basic_files(root):
+    """Yield the .BAS file names in a directory tree in sorted order.
+
+    Args:
+      root: str. A directory, or a single source file.
+    """
+
+    if not os.path.isdir(root):
+        yield root
+        return
+
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.lower().endswith(BASIC_SUFFIX):
+                yield os.path.join(dir_path, file_name)
+
+
+def write_obj_file(program_obj, obj_file):
+    """Write a program object file.
+
+    An interrupted write never leaves an object file that looks up to
+    date.
+    """
+
+    with atomic_file.replacing(obj_file) as out_file:
+        objfile.write_program(program_obj, out_file)
+
+
+def compile_file(basic_file, force=False):
+    """Compile one source file into its object file.
+
+    Args:
+      basic_file: str. The source file name.
+      force: bool. Compile even if the object file is up to date.
+
+    Returns:
+      A CompileResult.
+    """
+
+    obj_file = obj_file_name(basic_file)
+    if not force and is_up_to_date(basic_file, obj_file):
+        return CompileResult(basic_file, obj_file, UP_TO_DATE)
+
+    try:
+        basic = program.Basic()
+        basic.compile_program(loader.iter_source_lines(basic_file))
+        write_obj_file(basic.program, obj_file)
+    except (error.Error, OSError) as exc:
+        return CompileResult(basic_file, obj_file, FAILED,
+                             '{0}: {1}'.format(type(exc).__name__, exc))
+
+    return CompileResult(basic_file, obj_file, COMPILED)
+
+
+def compile_tree(roots, force=False, workers=None, chunk_size=CHUNK_SIZE):
+    """Compile every source file under a list of directories.
+
+    Args:
+      roots: list of str. Directories or source files.
+      force: bool. Compile files even if their object files are up to
+          date.
+      workers: int. The number of worker processes.  None is one per
+          CPU and 1 compiles in this process.
+      chunk_size: int. The files handed to a worker at a time.
+
+    Returns:
+      A list of CompileResult, in the order of the files.
+    """
+
+    basic_files = [basic_file for root in roots
+                   for basic_file in iter_basic_files(root)]
+    forces = [force] * len(basic_files)
+
+    if workers == 1 or len(basic_files) <= 1:
+        return list(map(compile_file, basic_files, forces))
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(compile_file, basic_files, forces,
+                                 chunksize=chunk_size))
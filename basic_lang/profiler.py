@@ -0,0 +1,112 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""A low overhead sampling profiler for running BASIC programs.
+
+A background thread wakes up periodically and reads the line the
+engine is executing.  Nothing is added to the execution loop itself so
+the profiler can be left on for long running programs.
+"""
+
+import collections
+import threading
+
+DEFAULT_INTERVAL = 0.005
+ROOT_FRAME = 'BASIC'
+
+
+class SamplingProfiler():
+    """Sample the current line of an execution engine."""
+
+    def __init__(self, engine, interval=DEFAULT_INTERVAL):
+        """Initialize the sample counters.
+
+        Args:
+          engine: ExecutionEngine. The engine to sample.
+          interval: float. Seconds between samples.
+        """
+
+        self.engine = engine
+        self.interval = interval
+        self.label_counts = collections.Counter()
+        self.loop_counts = collections.Counter()
+        self.stack_counts = collections.Counter()
+        self.total_samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sampling thread."""
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop,
+                                        name='basic-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread and wait for it to finish."""
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self):
+        """Take a sample every interval until stopped."""
+
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def loop_frames(self, line_index):
+        """Return the frames of the FOR loops active at a line index.
+
+        The engine keeps the line index after each FOR statement so the
+        FOR itself is the line before that.  The frames are ordered from
+        the outermost loop inwards.
+        """
+
+        labels = self.engine.program.labels
+        loops = sorted(
+            (next_index, var_name)
+            for var_name, (next_index, _) in tuple(
+                self.engine.for_loops.items())
+            if next_index <= line_index)
+
+        return ['FOR {0} ({1})'.format(var_name, labels[next_index - 1])
+                for next_index, var_name in loops]
+
+    def sample(self):
+        """Record the line the engine is currently executing."""
+
+        program_obj = self.engine.program
+        line_index = program_obj.current_line
+        if line_index is None or line_index >= len(program_obj.labels):
+            return
+
+        label = program_obj.labels[line_index]
+        loops = self.loop_frames(line_index)
+
+        self.total_samples += 1
+        self.label_counts[label] += 1
+        for frame in loops:
+            self.loop_counts[frame] += 1
+
+        stack = [ROOT_FRAME] + loops + [label]
+        self.stack_counts[';'.join(stack)] += 1
+
+    def collapsed_lines(self):
+        """Return the samples as collapsed stack lines."""
+
+        return ['{0} {1}'.format(stack, count)
+                for stack, count in sorted(self.stack_counts.items())]
+
+    def write_collapsed(self, file_name):
+        """Write the samples in the collapsed stack format.
+
+        Each line is a semicolon separated stack followed by the number
+        of samples, as read by flame graph tools.
+        """
+
+        with open(file_name, 'w') as out_file:
+            for line in self.collapsed_lines():
+                out_file.write(line + '\n')
@@ -3,14 +3,108 @@
 
 """Parse and execute a program."""
 
+import array
+import collections.abc
+import hashlib
+
 from basic_lang import error
+from basic_lang import input_reader
+from basic_lang import memo
+from basic_lang import parser
+from basic_lang import rnd
 from basic_lang import statement_parser
+from basic_lang import stats as engine_stats
+from basic_lang import vectorize
+
+DEFAULT_GOSUB_DEPTH = 256
+# Line numbers are looked up in a dense table if it has at most this
+# many entries per line.
+DENSE_LABEL_FACTOR = 16
+# The largest line number the line numbers array holds.
+MAX_LINE_NUMBER = 2 ** 63 - 1
+# The source hash of a program with no lines.
+SOURCE_HASH_START = hashlib.sha256().hexdigest()
+
+# The kind codes of the statements the run loop dispatches on.  Any
+# other statement only executes and goes on to the next line.
+KIND_OTHER = 0
+KIND_GOTO = 1
+KIND_FOR = 2
+KIND_NEXT = 3
+KIND_IF_THEN = 4
+KIND_ON_GOTO = 5
+KIND_GOSUB = 6
+KIND_RETURN = 7
+KIND_READ = 8
+KIND_INPUT = 9
+KIND_RESTORE = 10
+KIND_DIM = 11
+KIND_END = 12
+KIND_PRINT = 13
+STATEMENT_KINDS = {
+    statement_parser.Goto: KIND_GOTO,
+    statement_parser.For: KIND_FOR,
+    statement_parser.Next: KIND_NEXT,
+    statement_parser.IfThen: KIND_IF_THEN,
+    statement_parser.OnGoto: KIND_ON_GOTO,
+    statement_parser.Gosub: KIND_GOSUB,
+    statement_parser.Return: KIND_RETURN,
+    statement_parser.Read: KIND_READ,
+    statement_parser.Input: KIND_INPUT,
+    statement_parser.Restore: KIND_RESTORE,
+    statement_parser.Dim: KIND_DIM,
+    statement_parser.End: KIND_END,
+    statement_parser.Print: KIND_PRINT,
+}
 
 
 class LineLabelParseError(error.Error):
     """An illegal line number label."""
 
 
+class LinkError(error.Error):
+    """A statement refers to a line number that is not in the program."""
+
+
+class UndefinedLineError(error.Error):
+    """A computed GOTO went to a line number that is not in the program."""
+
+
+class GosubDepthError(error.Error):
+    """GOSUB calls were nested deeper than the return stack allows."""
+
+
+class ReturnWithoutGosubError(error.Error):
+    """A RETURN was executed with no GOSUB to return to."""
+
+
+class NextWithoutForError(error.Error):
+    """A NEXT was executed with no FOR loop of its variable running."""
+
+
+class OutOfDataError(error.Error):
+    """A READ was executed after all the DATA values were read."""
+
+
+def statement_kind(statement_obj):
+    """Return the kind code of a statement."""
+
+    return STATEMENT_KINDS.get(type(statement_obj), KIND_OTHER)
+
+
+def make_binding(value):
+    """Return the Number or String object for a variable value."""
+
+    if isinstance(value, (parser.Number, parser.String)):
+        obj = value
+    elif isinstance(value, str):
+        obj = parser.String('"{0}"'.format(value))
+    else:
+        obj = parser.Number(value)
+
+    return obj
+
+
 class LineParser():
     """A line parser.
 
@@ -19,10 +113,11 @@ class LineParser():
     """
 
     def __init__(self):
-        """Set up the statement parser and the program."""
+        """Set up the program and a statement parser for its constants."""
 
-        self.statement_parser = statement_parser.StatementParser()
         self.program = Program()
+        self.statement_parser = statement_parser.StatementParser(
+            self.program.constant_pool)
 
     def parse_line(self, line_input):
         """Parse the line.
@@ -36,14 +131,17 @@ class LineParser():
         rest = words[1:]
 
         try:
-            int(label)
+            number = int(label)
         except ValueError:
             raise LineLabelParseError(
                 'Invalid line number: {0}'.format(label))
+        if abs(number) > MAX_LINE_NUMBER:
+            raise LineLabelParseError(
+                'Line number out of range: {0}'.format(label))
 
         statement_obj = self.statement_parser.parse_statement(rest)
 
-        self.program.add_line(label, statement_obj)
+        self.program.add_line(label, statement_obj, ' '.join(words))
 
     def parse_lines(self, lines):
         """Parse a list of text lines."""
@@ -52,41 +150,312 @@ class LineParser():
             self.parse_line(line)
 
 
+class ProgramLabels(collections.abc.Sequence):
+    """The label strs of a program, made from its line numbers."""
+
+    __slots__ = ('numbers',)
+
+    def __init__(self, numbers):
+        """Initialize the labels of an array of line numbers."""
+
+        self.numbers = numbers
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [str(number) for number in self.numbers[index]]
+
+        return str(self.numbers[index])
+
+    def __iter__(self):
+        return map(str, self.numbers)
+
+
+class ProgramLines(collections.abc.Sequence):
+    """The (label, statement) pairs of a program.
+
+    The pairs are made when asked for from the label and statement
+    lists of the program.
+    """
+
+    __slots__ = ('program',)
+
+    def __init__(self, program_obj):
+        """Initialize the lines of a program."""
+
+        self.program = program_obj
+
+    def __len__(self):
+        return len(self.program.line_numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[line_index]
+                    for line_index in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+
+        return (self.program.labels[index], self.program.statement(index))
+
+    def __iter__(self):
+        return zip(self.program.labels, self.program.iter_statements())
+
+
 class Program():
     """A parsed and executable BASIC program."""
 
     def __init__(self):
-        """Initialize the lines list.
-
-        The lines list is a list of tuple pairs of a label and statement
-        object.  The label index is a dict whith labels as keys and
-        lines indices as values.  To go to a label you retrieve that
-        index from the label index list.
+        """Initialize the label and statement lists.
+
+        The line numbers array and the statements list hold the line
+        number and the statement object of each line at the same index,
+        so the execution loop takes a statement with one list lookup and
+        no pair or label str is kept per line.  The kinds array holds
+        the kind code of each statement, which the loop dispatches on.
+        The run loop works with line indices and only makes a label str
+        when one is asked for.
+        The labels attribute gives the line numbers as label strs and the
+        lines attribute gives the lines as (label, statement) pairs.  The
+        constant pool holds the literals and expressions shared by the
+        statements.  The data is a tuple of the values of all the DATA
+        statements in order.
+
+        The source hash is a sha256 hex digest chained over the source
+        lines, each hashed with the digest of the lines before it, so
+        two programs from the same source have the same hash.  It is
+        None if a line was added without its source.
+
+        Jumps look up line numbers as ints.  If the numbers are close
+        together, as with 10, 20, 30, the dense index is an array of
+        line indices by line number less the dense base, with -1 for
+        missing numbers.  Otherwise the number index dict is used.
         """
 
-        self.lines = []
-        self.label_index = {}
+        self.line_numbers = array.array('q')
+        self.statements = []
+        self.kinds = array.array('B')
+        self.constant_pool = parser.ConstantPool()
+        self.dense_index = None
+        self.dense_base = 0
+        self.number_index = {}
+        self.linked = False
+        self.data = ()
+        self.loop_kernels = {}
         self.current_line = None
+        self.source_hash = SOURCE_HASH_START
 
-    def add_line(self, line_label, statement_obj):
+    def add_line(self, line_label, statement_obj, source=None):
         """Add a line label and statement obj.
 
         Args:
             line_label: str.  A str form of a line number such as "10."
+                It is kept as the number, so "010" is the label "10".
             statement_obj: A statement object.
+            source: str. The source line, which is added to the source
+                hash.
+        """
+
+        self.line_numbers.append(int(line_label))
+        self.statements.append(statement_obj)
+        self.kinds.append(statement_kind(statement_obj))
+        self.linked = False
+
+        if source is None:
+            self.source_hash = None
+        elif self.source_hash is not None:
+            self.source_hash = hashlib.sha256(
+                '{0}\n{1}'.format(self.source_hash, source).encode(
+                    'utf-8')).hexdigest()
+
+    def __setstate__(self, state):
+        """Restore a program, converting the lines of older pickles."""
+
+        lines = state.pop('lines', None)
+        if lines is not None:
+            state['labels'] = [label for label, _ in lines]
+            state['statements'] = [statement_obj for _, statement_obj in lines]
+        labels = state.pop('labels', None)
+        if labels is not None:
+            state['line_numbers'] = array.array('q', map(int, labels))
+        state.pop('label_index', None)
+        state.setdefault('source_hash', None)
+        if 'kinds' not in state:
+            state['kinds'] = array.array(
+                'B', map(statement_kind, state['statements']))
+        self.__dict__.update(state)
+
+    @property
+    def labels(self):
+        """The line labels as strs."""
+
+        return ProgramLabels(self.line_numbers)
+
+    @property
+    def lines(self):
+        """The lines of the program as (label, statement) pairs."""
+
+        return ProgramLines(self)
+
+    def statement(self, index):
+        """Return the statement of a line index."""
+
+        return self.statements[index]
+
+    def iter_statements(self):
+        """Return an iterator over the statements in line order."""
+
+        return iter(self.statements)
+
+    def link(self):
+        """Rebuild the label index and resolve the statement targets.
+
+        GOSUB, ON GOTO and number GOTO targets are resolved to line
+        indices here so a jump at run time needs no label lookup, and
+        IF THEN targets are checked.  FOR loops that can run as a single
+        kernel are found here too, and the DATA values are collected.
+
+        Raises:
+          LinkError: if a statement jumps to a line number that is not
+              in the program.
+        """
+
+        data = []
+        for statement_obj in self.iter_statements():
+            if isinstance(statement_obj, statement_parser.Data):
+                data.extend(statement_obj.values)
+        self.data = tuple(data)
+        self.index_numbers()
+
+        for label, statement_obj in self.lines:
+            if isinstance(statement_obj, statement_parser.Gosub):
+                statement_obj.target = self.link_target(
+                    statement_obj.label, 'GOSUB', label)
+            elif isinstance(statement_obj, statement_parser.OnGoto):
+                statement_obj.targets = tuple(
+                    self.link_target(label_obj, 'ON GOTO', label)
+                    for label_obj in statement_obj.labels)
+            elif isinstance(statement_obj, statement_parser.Goto):
+                statement_obj.clear_cache()
+                if isinstance(statement_obj.label, parser.Number):
+                    statement_obj.target = self.link_target(
+                        statement_obj.label, 'GOTO', label)
+            elif isinstance(statement_obj, statement_parser.IfThen):
+                self.link_target(statement_obj.label, 'IF THEN', label)
+
+        self.loop_kernels = vectorize.find_loop_kernels(self.lines,
+                                                        self.line_index_of)
+        self.linked = True
+
+    def index_numbers(self):
+        """Build the dense index or the number index of the line numbers."""
+
+        self.number_index = {number: index for index, number in
+                             enumerate(self.line_numbers)}
+        self.dense_index = None
+        self.dense_base = 0
+
+        if self.number_index:
+            low = min(self.number_index)
+            span = max(self.number_index) - low + 1
+            if span <= DENSE_LABEL_FACTOR * len(self.number_index):
+                dense_index = array.array('i', [-1]) * span
+                for number, index in self.number_index.items():
+                    dense_index[number - low] = index
+                self.dense_index = dense_index
+                self.dense_base = low
+                self.number_index = {}
+
+    def link_target(self, label_obj, keyword, label):
+        """Return the line index of a jump target or raise a LinkError."""
+
+        try:
+            index = self.line_index_of(label_obj.value)
+        except KeyError:
+            raise LinkError('{0} to undefined line {1} at line {2}'.format(
+                keyword, label_obj.value, label))
+
+        return index
+
+    def number_index_or_none(self, number):
+        """Return the line index of a line number or None if it is missing."""
+
+        try:
+            index = self.line_index_of(number)
+        except KeyError:
+            index = None
+
+        return index
+
+    def inline_cache_counts(self):
+        """Return the hits and misses of the computed GOTO caches.
+
+        Returns:
+          A dict of (hits, misses) tuples by the label of the GOTO line.
+        """
+
+        return {label: (statement_obj.hits, statement_obj.misses)
+                for label, statement_obj in self.lines
+                if isinstance(statement_obj, statement_parser.Goto) and
+                not isinstance(statement_obj.label, parser.Number)}
+
+    def line_index_of(self, number):
+        """Return the line index of a line number.
+
+        Raises:
+          KeyError: if there is no line with the number.
+        """
+
+        dense_index = self.dense_index
+        if dense_index is None:
+            return self.number_index[number]
+
+        offset = number - self.dense_base
+        if type(offset) is int and 0 <= offset < len(dense_index):
+            index = dense_index[offset]
+            if index >= 0:
+                return index
+
+        raise KeyError(number)
+
+    def goto_number(self, number):
+        """Set the current line to a line number and return its label."""
+
+        self.jump_to_number(number)
+
+        return self.current_label()
+
+    def jump_to_number(self, number):
+        """Set the current line to a line number.
+
+        The dense lookup is repeated here since this is on the path of
+        every jump.
         """
 
-        self.lines.append((line_label, statement_obj))
+        dense_index = self.dense_index
+        index = -1
+        if dense_index is not None:
+            offset = number - self.dense_base
+            if 0 <= offset < len(dense_index) and type(offset) is int:
+                index = dense_index[offset]
+        if index < 0:
+            index = self.line_index_of(number)
+
+        self.current_line = index
 
     def first_line(self):
-        """Rebuild the label lindex and Return the first line label."""
+        """Link the program if needed and Return the first line label.
+
+        A program is linked once, so running it again costs nothing
+        here.  Adding a line links it again on the next run.
+        """
 
-        self.label_index = {}
-        for index, pair in enumerate(self.lines):
-            self.label_index[pair[0]] = index
+        if not self.linked:
+            self.link()
 
-        if self.lines:
-            label = self.lines[0][0]
+        if self.line_numbers:
+            label = str(self.line_numbers[0])
             self.current_line = 0
         else:
             label = None
@@ -103,28 +472,32 @@ class Program():
     def goto_label(self, label):
         """Set the current line to a label."""
 
-        self.current_line = self.label_index[label]
-        label = self.current_label()
+        self.jump_to_number(int(label))
 
-        return label
+        return self.current_label()
 
     def current_statement(self):
         """Return the current statement."""
 
-        if self.current_line == len(self.lines):
+        if self.current_line == len(self.statements):
             statement = None
         else:
-            statement = self.lines[self.current_line][1]
+            statement = self.statements[self.current_line]
 
         return statement
 
     def current_label(self):
         """Return the current label."""
 
-        if self.current_line == len(self.lines):
+        return self.label_at(self.current_line)
+
+    def label_at(self, index):
+        """Return the label of a line index, or None after the last line."""
+
+        if index == len(self.line_numbers):
             label = None
         else:
-            label = self.lines[self.current_line][0]
+            label = str(self.line_numbers[index])
 
         return label
 
@@ -134,61 +507,421 @@ class Program():
         This is for program examination purposes.
         """
 
-        line_index = self.label_index[label]
-        statement_obj = self.lines[line_index][1]
+        line_index = self.line_index_of(int(label))
+        statement_obj = self.statement(line_index)
 
         return statement_obj
 
 
 class ExecutionEngine():
-    """The program execution engine."""
+    """The program execution engine.
 
-    def __init__(self, program_obj, test_mode=False):
-        """Initialize the engine."""
+    Instrumentation is off unless asked for.  Pass stats=True to count
+    statements, jumps, FOR iterations, PRINT bytes and variable reads and
+    writes in the stats attribute.  The on_line_enter(label),
+    on_jump(from_label, to_label) and on_end() attributes can be set to
+    callables to be told about those events.
+    """
+
+    def __init__(self, program_obj, test_mode=False, stats=False,
+                 max_gosub_depth=DEFAULT_GOSUB_DEPTH, check_bounds=True,
+                 vectorize_loops=True, seed=None, stream=0,
+                 input_stream=None, output=None, coverage=False):
+        """Initialize the engine.
+
+        The GOSUB return stack is a list of line indices allocated once
+        at its full depth.  The return depth is the number in use.
+        Passing check_bounds=False runs a verified program without array
+        bounds checks.  Element-wise array loops run as single kernels
+        unless vectorize_loops is False or the engine is instrumented.
+        RND draws from the engine's own random stream.  Engines with the
+        same seed and stream draw the same numbers and engines with
+        different stream numbers draw independent ones.  INPUT reads
+        from input_stream, a text stream or an iterable of lines or
+        values, or standard input if it is None.  If output is a list
+        the values printed by PRINT are appended to it.
+
+        With coverage=True, the coverage attribute is a bytearray with a
+        byte for each line index that is set to 1 when the line runs.
+        It is kept across runs, so it holds the lines run by any of
+        them.
+
+        An engine can run its program many times.  Each run after the
+        first starts with a reset.
+        """
 
         self.program = program_obj
-        self.symbol_table = {}
         self.test_mode = test_mode
+        self.check_bounds = check_bounds
+        self.vectorize_loops = vectorize_loops
         self.for_loops = {}
+        self.max_gosub_depth = max_gosub_depth
+        self.return_stack = [0] * max_gosub_depth
+        self.return_depth = 0
+        self.data_index = 0
+        self.input_reader = input_reader.InputReader(input_stream)
+        self.run_count = 0
+        self.output = output
+        self.coverage = bytearray() if coverage else None
+        self.stop_requested = False
+        self.stopped = False
+        self.stop_on_print = False
+        self.on_line_enter = None
+        self.on_jump = None
+        self.on_end = None
+
+        if stats:
+            self.stats = engine_stats.EngineStats()
+            self.symbol_table = engine_stats.CountingSymbolTable(self.stats)
+        else:
+            self.stats = None
+            self.symbol_table = {}
 
-    def run(self):
-        """Run the program."""
+        # The draw function is not a variable so it isn't counted as a
+        # write.
+        self.random_stream = rnd.RandomStream(seed, stream)
+        self.symbol_table.update({parser.RND_KEY: self.random_stream.random})
 
-        next_line = self.program.first_line()
+    def reset(self):
+        """Clear the variables and run state for another run.
 
-        while next_line:
-            statement_obj = self.program.current_statement()
-            statement_obj.execute(self.symbol_table, self.test_mode)
+        The cost is in the number of variables set by the last run.  The
+        linked program, the return stack and the random stream are kept.
+        The counters start again from zero.
+        """
+
+        self.symbol_table.clear()
+        self.symbol_table.update({parser.RND_KEY: self.random_stream.random})
+        self.for_loops.clear()
+        self.return_depth = 0
+        self.data_index = 0
+
+        if self.stats is not None:
+            self.stats = engine_stats.EngineStats()
+            self.symbol_table.stats = self.stats
+
+    def bind(self, inputs):
+        """Set variables before a run.
+
+        Args:
+          inputs: dict. Values by variable name.  A value can be a
+              number, a str or a Number or String object.
+        """
+
+        for name, value in inputs.items():
+            self.symbol_table[name] = make_binding(value)
 
-            if isinstance(statement_obj, statement_parser.Goto):
-                goto_label = str(statement_obj.label.value)
-                next_line = self.program.goto_label(goto_label)
+    def values(self):
+        """Return the values of the variables by name, without arrays."""
+
+        return {name: obj.value for name, obj in self.symbol_table.items()
+                if isinstance(obj, (parser.Number, parser.String))}
+
+    def is_instrumented(self):
+        """Return True if any counters or callbacks are set."""
+
+        return (self.stats is not None or self.on_line_enter is not None or
+                self.on_jump is not None or self.on_end is not None)
+
+    def record_line(self, label, statement_obj):
+        """Record entering a line."""
+
+        if self.stats is not None:
+            self.stats.count_statement(statement_obj)
+        if self.on_line_enter is not None:
+            self.on_line_enter(label)
+
+    def record_jump(self, from_label, to_label):
+        """Record a jump taken."""
+
+        if self.stats is not None:
+            self.stats.jumps += 1
+        if self.on_jump is not None:
+            self.on_jump(from_label, to_label)
+
+    def record_loop_back(self, from_label, to_label):
+        """Record a NEXT jumping back to start another FOR iteration."""
+
+        if self.stats is not None:
+            self.stats.for_iterations += 1
+        self.record_jump(from_label, to_label)
+
+    def record_executed(self, statement_obj):
+        """Record the effects of an executed statement."""
+
+        if self.stats is not None:
+            if isinstance(statement_obj, statement_parser.Print):
+                self.stats.count_print(statement_obj.output)
             elif isinstance(statement_obj, statement_parser.For):
+                self.stats.for_iterations += 1
+
+    def trust_bounds(self, dim_obj):
+        """Turn off the bounds checks of the arrays made by a DIM."""
+
+        for name, _ in dim_obj.arrays:
+            self.symbol_table[parser.array_key(name)].check_bounds = False
+
+    def read_data(self, read_obj):
+        """Assign the next DATA values to the targets of a READ."""
+
+        data = self.program.data
+        for target in read_obj.targets:
+            if self.data_index == len(data):
+                raise OutOfDataError(
+                    'READ after the end of the DATA at line {0}'.format(
+                        self.program.current_label()))
+            target.assign(self.symbol_table, data[self.data_index])
+            self.data_index += 1
+
+    def read_input(self, input_obj):
+        """Assign the next input values to the targets of an INPUT."""
+
+        for target in input_obj.targets:
+            target.assign(self.symbol_table, self.input_reader.next_value())
+
+    def run_kernel(self):
+        """Run the loop at the current FOR as a kernel if it has one.
+
+        Returns:
+          True if the whole loop ran and the current line is after its
+          NEXT, or False if the loop should run the normal way.
+        """
+
+        start = self.program.current_line
+        kernel = self.program.loop_kernels.get(start)
+        if kernel is None or not kernel.run(self.symbol_table):
+            return False
+
+        self.program.current_line = kernel.next_index
+        if self.coverage is not None:
+            self.coverage[start:kernel.next_index] = (
+                b'\x01' * (kernel.next_index - start))
+
+        return True
+
+    def run(self, inputs=None, input_stream=None):
+        """Run the program.
+
+        Args:
+          inputs: dict. Values of variables to set before the run.
+          input_stream: A new source for INPUT.  The last one is kept if
+              this is None.
+        """
+
+        self.run_lines(self.start_run(inputs, input_stream))
+
+    def start_run(self, inputs=None, input_stream=None):
+        """Set up a run and return the label of its first line."""
+
+        if self.run_count:
+            self.reset()
+        self.run_count += 1
+        if inputs:
+            self.bind(inputs)
+        if input_stream is not None:
+            self.input_reader = input_reader.InputReader(input_stream)
+
+        return self.program.first_line()
+
+    def iter_output(self, inputs=None, input_stream=None):
+        """Run the program, yielding each value as PRINT prints it.
+
+        The values aren't printed to stdout but are still appended to
+        the output list if there is one.  Without one, no more than one
+        value is held at a time.  The run goes no further than
+        the values asked for, so a caller can take the first few and
+        close the generator.  The engine is then left stopped after the
+        last PRINT and resume() can carry on.  If request_stop() stops
+        the run between PRINTs, the generator ends with the engine
+        stopped.
+
+        Args:
+          inputs: dict. Values of variables to set before the run.
+          input_stream: A new source for INPUT.
+        """
+
+        next_line = self.start_run(inputs, input_stream)
+        output = self.output
+        if output is None:
+            self.output = []
+        position = len(self.output)
+        test_mode = self.test_mode
+        self.test_mode = True
+        self.stop_on_print = True
+        try:
+            while next_line:
+                self.run_lines(next_line)
+                if len(self.output) == position:
+                    break
+                value = self.output[position]
+                if output is None:
+                    # The list is only a buffer for one value.
+                    self.output.clear()
+                else:
+                    position += 1
+                next_line = self.program.current_label() if (
+                    self.stopped) else None
+                yield value
+        finally:
+            self.stop_on_print = False
+            self.test_mode = test_mode
+            self.output = output
+
+    def request_stop(self):
+        """Ask a run to stop before its next statement.
+
+        This can be called from another thread or a signal handler.  The
+        run returns with stopped set and resume() carries it on.
+        """
+
+        self.stop_requested = True
+
+    def resume(self):
+        """Carry on a stopped or restored run from its current line."""
+
+        self.run_lines(self.program.current_label())
+
+    def run_lines(self, next_line):
+        """Run the program from a line label until it ends or is stopped.
+
+        The loop works with the current line index and only makes the
+        label str of a line for the counters and callbacks or an error.
+
+        Args:
+          next_line: str. The label of the current line, or None.
+        """
+
+        self.stop_requested = False
+        instrumented = self.is_instrumented()
+        use_kernels = (self.vectorize_loops and not instrumented and
+                       bool(self.program.loop_kernels))
+        program_obj = self.program
+        line_count = len(program_obj.statements)
+        kinds = program_obj.kinds
+        coverage = self.coverage
+        if coverage is not None and len(coverage) < line_count:
+            coverage.extend(bytes(line_count - len(coverage)))
+        running = bool(next_line)
+
+        while running and not self.stop_requested:
+            line = program_obj.current_line
+            if coverage is not None:
+                coverage[line] = 1
+            statement_obj = program_obj.current_statement()
+            kind = kinds[line]
+            if instrumented:
+                from_label = program_obj.label_at(line)
+                self.record_line(from_label, statement_obj)
+            statement_obj.execute(self.symbol_table, self.test_mode)
+            if instrumented:
+                self.record_executed(statement_obj)
+
+            if kind == KIND_GOTO:
+                index = statement_obj.target
+                if index is None:
+                    try:
+                        index = statement_obj.line_index(program_obj)
+                    except KeyError:
+                        raise UndefinedLineError(
+                            'GOTO to undefined line {0} at line {1}'.format(
+                                statement_obj.label_result,
+                                program_obj.label_at(line)))
+                program_obj.current_line = index
+                if instrumented:
+                    self.record_jump(from_label, program_obj.current_label())
+            elif kind == KIND_FOR and use_kernels and self.run_kernel():
+                pass
+            elif kind == KIND_FOR:
                 var_name = statement_obj.var.name
-                next_line_index = self.program.current_line + 1
                 end_value = statement_obj.end.value
-                self.for_loops[var_name] = (next_line_index, end_value)
-                next_line = self.program.next_line()
-            elif isinstance(statement_obj, statement_parser.Next):
+                self.for_loops[var_name] = (line + 1, end_value)
+                program_obj.current_line = line + 1
+            elif kind == KIND_NEXT:
                 var_name = statement_obj.var.name
-                next_line_index, end_value = self.for_loops[var_name]
+                try:
+                    next_line_index, end_value = self.for_loops[var_name]
+                except KeyError:
+                    raise NextWithoutForError(
+                        'NEXT without FOR at line {0}'.format(
+                            program_obj.label_at(line)))
                 current_value = self.symbol_table[var_name].value
 
                 if current_value > end_value:
-                    next_line = self.program.next_line()
+                    del self.for_loops[var_name]
+                    program_obj.current_line = line + 1
                 else:
-                    self.program.current_line = next_line_index
-                    next_line = self.program.current_label()
-            elif isinstance(statement_obj, statement_parser.IfThen):
-                goto_label = str(statement_obj.label.value)
+                    program_obj.current_line = next_line_index
+                    if instrumented:
+                        self.record_loop_back(from_label,
+                                              program_obj.current_label())
+            elif kind == KIND_IF_THEN:
                 if statement_obj.bool_result:
-                    next_line = self.program.goto_label(goto_label)
+                    program_obj.jump_to_number(statement_obj.label.value)
+                    if instrumented:
+                        self.record_jump(from_label,
+                                         program_obj.current_label())
                 else:
-                    next_line = self.program.next_line()
-            elif isinstance(statement_obj, statement_parser.End):
-                next_line = None
+                    program_obj.current_line = line + 1
+            elif kind == KIND_ON_GOTO:
+                choice = statement_obj.choice
+                if 0 < choice <= len(statement_obj.targets):
+                    program_obj.current_line = statement_obj.targets[
+                        choice - 1]
+                    if instrumented:
+                        self.record_jump(from_label,
+                                         program_obj.current_label())
+                else:
+                    program_obj.current_line = line + 1
+            elif kind == KIND_GOSUB:
+                if self.return_depth == self.max_gosub_depth:
+                    raise GosubDepthError(
+                        'GOSUB nested more than {0} deep at line {1}'.format(
+                            self.max_gosub_depth, program_obj.label_at(line)))
+                self.return_stack[self.return_depth] = line + 1
+                self.return_depth += 1
+                program_obj.current_line = statement_obj.target
+                if instrumented:
+                    self.record_jump(from_label, program_obj.current_label())
+            elif kind == KIND_RETURN:
+                if self.return_depth == 0:
+                    raise ReturnWithoutGosubError(
+                        'RETURN without GOSUB at line {0}'.format(
+                            program_obj.label_at(line)))
+                self.return_depth -= 1
+                program_obj.current_line = self.return_stack[
+                    self.return_depth]
+                if instrumented:
+                    self.record_jump(from_label, program_obj.current_label())
+            elif kind == KIND_READ:
+                self.read_data(statement_obj)
+                program_obj.current_line = line + 1
+            elif kind == KIND_INPUT:
+                self.read_input(statement_obj)
+                program_obj.current_line = line + 1
+            elif kind == KIND_RESTORE:
+                self.data_index = 0
+                program_obj.current_line = line + 1
+            elif kind == KIND_DIM:
+                if not self.check_bounds:
+                    self.trust_bounds(statement_obj)
+                program_obj.current_line = line + 1
+            elif kind == KIND_END:
+                running = False
+                continue
+            elif kind == KIND_PRINT:
+                if self.output is not None:
+                    self.output.append(statement_obj.output)
+                if self.stop_on_print:
+                    self.stop_requested = True
+                program_obj.current_line = line + 1
             else:
-                next_line = self.program.next_line()
+                program_obj.current_line = line + 1
+
+            running = program_obj.current_line < line_count
+
+        self.stopped = running
+        if not self.stopped and self.on_end is not None:
+            self.on_end()
 
 
 class Basic():
@@ -208,14 +941,42 @@ class Basic():
 
         self.program = line_parser.program
 
-    def run_obj(self, test_mode=False):
-        """Run a compiled program object."""
+    def run_obj(self, test_mode=False, stats=False, seed=None, inputs=None,
+                input_stream=None, coverage=False, cache=None):
+        """Run a compiled program object.
+
+        With a memo.ResultCache, a deterministic program's result is
+        replayed from the cache if it is there and cached if not.
+        """
+
+        self.engine = ExecutionEngine(self.program, test_mode=test_mode,
+                                      stats=stats, seed=seed,
+                                      input_stream=input_stream,
+                                      coverage=coverage)
+        if cache is not None:
+            memo.run_cached(self.engine, cache, inputs)
+        else:
+            self.engine.run(inputs)
+
+    def iter_run(self, lines, stats=False, seed=None, inputs=None,
+                 input_stream=None, coverage=False):
+        """Compile and run the program lines, yielding the values printed.
+
+        See ExecutionEngine.iter_output().
+        """
+
+        self.compile_program(lines)
+        self.engine = ExecutionEngine(self.program, stats=stats, seed=seed,
+                                      input_stream=input_stream,
+                                      coverage=coverage)
 
-        self.engine = ExecutionEngine(self.program, test_mode=test_mode)
-        self.engine.run()
+        return self.engine.iter_output(inputs)
 
-    def run(self, lines, test_mode=False):
+    def run(self, lines, test_mode=False, stats=False, seed=None,
+            inputs=None, input_stream=None, coverage=False, cache=None):
         """Run the program lines."""
 
         self.compile_program(lines)
-        self.run_obj(test_mode=test_mode)
+        self.run_obj(test_mode=test_mode, stats=stats, seed=seed,
+                     inputs=inputs, input_stream=input_stream,
+                     coverage=coverage, cache=cache)
@@ -0,0 +1,44 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Seedable random number streams for the RND function."""
+
+import hashlib
+import random
+
+
+def stream_seed(seed, stream):
+    """Return the generator seed for one stream of a seed.
+
+    Streams of the same seed get unrelated generator seeds so engines
+    run in parallel don't draw the same numbers.  With no seed the
+    generator is seeded from the operating system.
+    """
+
+    if seed is None:
+        return None
+
+    digest = hashlib.sha256('{0}:{1}'.format(seed, stream).encode('utf-8'))
+
+    return int.from_bytes(digest.digest(), 'big')
+
+
+class RandomStream():
+    """A stream of random numbers from 0 up to 1 for one engine.
+
+    The random attribute is the bound C method of the stream's own
+    generator, so a draw is a single C call with no Python code run.
+    """
+
+    def __init__(self, seed=None, stream=0):
+        """Initialize the generator.
+
+        Args:
+          seed: int or str. The seed shared by related streams, or None.
+          stream: int. The stream number for this engine.
+        """
+
+        self.seed = seed
+        self.stream = stream
+        self.generator = random.Random(stream_seed(seed, stream))
+        self.random = self.generator.random
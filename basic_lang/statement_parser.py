@@ -3,9 +3,16 @@
 
 """Parse BASIC statements."""
 
+import collections
+
+from basic_lang import arrays
 from basic_lang import error
 from basic_lang import parser
 
+PRIM_PARSER = parser.Parser()
+# The most target values a computed GOTO remembers.
+GOTO_CACHE_SIZE = 8
+
 
 class StatementParseError(error.Error):
     """There was an error parsing a statement."""
@@ -18,6 +25,8 @@ class StatementParseInvalidKeyword(error.Error):
 class Print():
     """A PRINT statement object."""
 
+    __slots__ = ('arg', 'output')
+
     def __init__(self):
         """Initialize the arg attribute."""
 
@@ -30,24 +39,25 @@ class Print():
         Args:
           symbol_table: dict. A dict of variable names as keys and
               primative objects as values.
-          test_mode: bool. If true, output goes into an output attribute
-              for test verification.
+          test_mode: bool. If true, output only goes into the output
+              attribute for test verification.  The output attribute is
+              always set so the engine can count what was printed.
         """
 
-        parser_obj = parser.Parser()
         obj = self.arg
-        while not parser_obj.is_num_str_primative(obj):
+        while not PRIM_PARSER.is_num_str_primative(obj):
             obj = obj.eval(symbol_table)
 
-        if test_mode:
-            self.output = obj.value
-        else:
+        self.output = obj.value
+        if not test_mode:
             print(obj.value)
 
 
 class Let():
     """The LET statement object."""
 
+    __slots__ = ('var', 'value')
+
     def __init__(self):
         """Initialize the args."""
 
@@ -64,22 +74,63 @@ class Let():
               isn't used in the LET statement.
         """
 
-        parser_obj = parser.Parser()
-
         obj = self.value
-        while not parser_obj.is_num_str_primative(obj):
+        while not PRIM_PARSER.is_num_str_primative(obj):
             obj = obj.eval(symbol_table)
 
-        symbol_table[self.var.name] = obj
+        self.var.assign(symbol_table, obj)
 
 
 class Goto():
-    """The GOTO statement object."""
+    """The GOTO statement object.
+
+    The label can be an expression.  Executing the statement leaves the
+    label value in label_result for the engine.  A number label is
+    resolved to the target line index when the program is linked.  A
+    computed label has an inline cache of the line indices of the last
+    few values it had, with counts of the hits and misses.  The least
+    recently used value is dropped when the cache is full, so a site
+    that moves on to new targets keeps hitting.
+    """
+
+    __slots__ = ('label', 'label_result', 'target', 'cache', 'hits',
+                 'misses')
 
     def __init__(self):
         """Initialize the arg."""
 
         self.label = None
+        self.label_result = None
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Forget the target and the cached line indices."""
+
+        self.target = None
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def line_index(self, program_obj):
+        """Return the line index of the label result.
+
+        Args:
+          program_obj: program.Program. The program to look up misses in.
+        """
+
+        cache = self.cache
+        index = cache.get(self.label_result)
+        if index is None:
+            self.misses += 1
+            index = program_obj.line_index_of(self.label_result)
+            if len(cache) == GOTO_CACHE_SIZE:
+                cache.popitem(last=False)
+            cache[self.label_result] = index
+        else:
+            self.hits += 1
+            cache.move_to_end(self.label_result)
+
+        return index
 
     def execute(self, symbol_table, test_mode=False):
         """Execute the GOTO statement.
@@ -95,12 +146,50 @@ class Goto():
         while not isinstance(obj, parser.Number):
             obj = obj.eval(symbol_table)
 
-        self.label = obj
+        self.label_result = obj.value
+
+
+class OnGoto():
+    """The ON GOTO statement object.
+
+    The value of the expression picks a line from the list of labels,
+    1 for the first.  The labels are resolved to a tuple of line indices
+    when the program is linked so the jump is a tuple index.  Any other
+    value goes on to the next line.
+    """
+
+    __slots__ = ('arg', 'labels', 'targets', 'choice')
+
+    def __init__(self):
+        """Initialize the arg and labels."""
+
+        self.arg = None
+        self.labels = ()
+        self.targets = ()
+        self.choice = None
+
+    def execute(self, symbol_table, test_mode=False):
+        """Evaluate the arg into the choice for the engine.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the ON GOTO statement.
+        """
+
+        obj = self.arg
+        while not isinstance(obj, parser.Number):
+            obj = obj.eval(symbol_table)
+
+        self.choice = int(obj.value)
 
 
 class For():
     """The FOR statement object."""
 
+    __slots__ = ('var', 'start', 'end')
+
     def __init__(self):
         """Initialize the counter variable, start and end values."""
 
@@ -134,6 +223,8 @@ class For():
 class Next():
     """The NEXT statement object."""
 
+    __slots__ = ('var',)
+
     def __init__(self):
         """Initialize the counter variable name."""
 
@@ -153,7 +244,7 @@ class Next():
             raise StatementParseError(
                 'FOR var is not a Variable {0}'.format(self.var))
 
-        num_obj = symbol_table[self.var.name]
+        num_obj = self.var.eval(symbol_table)
         new_value = num_obj.value + 1
 
         symbol_table[self.var.name] = parser.Number(new_value)
@@ -162,6 +253,8 @@ class Next():
 class IfThen():
     """The IF THEN statement object."""
 
+    __slots__ = ('arg1', 'bool_op', 'arg2', 'label', 'bool_result')
+
     def __init__(self):
         """Initialize the tokens."""
 
@@ -181,14 +274,12 @@ class IfThen():
               isn't used in the LET statement.
         """
 
-        parser_obj = parser.Parser()
-
         arg1_obj = self.arg1
-        while not parser_obj.is_num_str_primative(arg1_obj):
+        while not PRIM_PARSER.is_num_str_primative(arg1_obj):
             arg1_obj = arg1_obj.eval(symbol_table)
 
         arg2_obj = self.arg2
-        while not parser_obj.is_num_str_primative(arg2_obj):
+        while not PRIM_PARSER.is_num_str_primative(arg2_obj):
             arg2_obj = arg2_obj.eval(symbol_table)
 
         bool_obj = self.bool_op
@@ -210,9 +301,161 @@ class IfThen():
                 'Invalue Boolean operator {0}'.format(bool_obj))
 
 
+class Dim():
+    """The DIM statement object."""
+
+    __slots__ = ('arrays',)
+
+    def __init__(self):
+        """Initialize the list of array names and bounds."""
+
+        self.arrays = []
+
+    def execute(self, symbol_table, test_mode=False):
+        """Allocate the arrays, replacing any with the same names.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the DIM statement.
+        """
+
+        for name, bounds in self.arrays:
+            symbol_table[parser.array_key(name)] = arrays.NumericArray(
+                name, bounds)
+
+
+class Gosub():
+    """The GOSUB statement object.
+
+    The engine pushes the return address and jumps.  The target is the
+    line index of the label, resolved when the program is linked.
+    """
+
+    __slots__ = ('label', 'target')
+
+    def __init__(self):
+        """Initialize the label and target."""
+
+        self.label = None
+        self.target = None
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on GOSUB does nothing.  The engine does the call.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the GOSUB statement.
+        """
+
+
+class Return():
+    """The RETURN statement."""
+
+    __slots__ = ()
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on RETURN does nothing.  The engine does the return.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the RETURN statement.
+        """
+
+
+class Data():
+    """The DATA statement object.
+
+    The values of all the DATA statements are collected into one tuple
+    when the program is linked.
+    """
+
+    __slots__ = ('values',)
+
+    def __init__(self):
+        """Initialize the values."""
+
+        self.values = ()
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on DATA does nothing.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the DATA statement.
+        """
+
+
+class Read():
+    """The READ statement object.  The engine assigns the DATA values."""
+
+    __slots__ = ('targets',)
+
+    def __init__(self):
+        """Initialize the targets."""
+
+        self.targets = ()
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on READ does nothing.  The engine does the reads.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the READ statement.
+        """
+
+
+class Restore():
+    """The RESTORE statement.  The engine starts READ over."""
+
+    __slots__ = ()
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on RESTORE does nothing.  The engine does the restore.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the RESTORE statement.
+        """
+
+
+class Input():
+    """The INPUT statement object.  The engine assigns the input values."""
+
+    __slots__ = ('targets',)
+
+    def __init__(self):
+        """Initialize the targets."""
+
+        self.targets = ()
+
+    def execute(self, symbol_table, test_mode=False):
+        """Execute on INPUT does nothing.  The engine reads the input.
+
+        Args:
+          symbol_table: dict. A dict of variable names as keys and
+              primative objects as values.
+          test_mode: bool. This arg has to be here for the API but
+              isn't used in the INPUT statement.
+        """
+
+
 class End():
     """The END statement."""
 
+    __slots__ = ()
+
     def execute(self, symbol_table, test_mode=False):
         """Execute on END does nothing.
 
@@ -227,6 +470,8 @@ class End():
 class Rem():
     """The REM statement."""
 
+    __slots__ = ()
+
     def execute(self, symbol_table, test_mode=False):
         """Execute on REM does nothing.
 
@@ -250,10 +495,15 @@ class StatementParser():
     key word.
     """
 
-    def __init__(self):
-        """Initialize a primative parser."""
+    def __init__(self, constant_pool=None):
+        """Initialize a primative parser.
+
+        Args:
+          constant_pool: parser.ConstantPool. The pool shared by the
+              program being parsed.
+        """
 
-        self.prim_parser = parser.Parser()
+        self.prim_parser = parser.Parser(constant_pool)
 
     def parse_print(self, words):
         """Parse the PRINT statement.
@@ -280,33 +530,42 @@ class StatementParser():
     def parse_let(self, words):
         """Parse the LET statement args.
 
-        The arguments are a variable, "=", and an expression.
+        The arguments are a variable or array element, "=", and an
+        expression.
         """
 
         let_obj = Let()
-        obj_var = self.prim_parser.parse_var(words[0])
+
+        if '=' in words:
+            equal_index = words.index('=')
+        else:
+            raise StatementParseError(
+                'Invalid syntax for LET: {0}'.format(' '.join(words)))
+
+        target_str = ' '.join(words[:equal_index])
+        obj_var = self.prim_parser.parse_target(target_str)
         if obj_var:
             let_obj.var = obj_var
-            if words[1] == '=':
-                rest = words[2:]
-                rest_str = ' '.join(words[2:])
-                arith_expr_obj = self.prim_parser.parse_arith_expr(rest_str)
+            rest = words[equal_index + 1:]
+            rest_str = ' '.join(rest)
+            arith_expr_obj = self.prim_parser.parse_arith_expr(rest_str)
+            if arith_expr_obj:
+                prim_obj = None
+            else:
                 prim_obj = self.prim_parser.parse_primative_obj(rest_str)
 
-                if arith_expr_obj:
-                    let_obj.value = arith_expr_obj
-                elif prim_obj:
-                    let_obj.value = prim_obj
-                else:
-                    raise StatementParseError(
-                        'Invalid args for LET {0} = {1}'.format(
-                            words[0], rest))
+            if arith_expr_obj:
+                let_obj.value = arith_expr_obj
+            elif prim_obj:
+                let_obj.value = prim_obj
             else:
                 raise StatementParseError(
-                    'Invalid syntax for LET: {0}'.format(' '.join(words)))
+                    'Invalid args for LET {0} = {1}'.format(
+                        target_str, rest))
         else:
             raise StatementParseError(
-                'Invalid syntax for LET: {0} not variable.'.format(words[0]))
+                'Invalid syntax for LET: {0} not variable.'.format(
+                    target_str))
 
         return let_obj
 
@@ -320,31 +579,56 @@ class StatementParser():
         input_str = ' '.join(words)
 
         obj = self.prim_parser.parse_arith_expr(input_str)
-        if obj:
+        if obj and not isinstance(obj, parser.String):
             goto_obj.label = obj
         else:
-            obj = self.prim_parser.parse_num(input_str)
-            if obj:
-                goto_obj.label = obj
-            else:
-                raise StatementParseError(
-                    'No valid print args: {0}.'.format(words))
+            raise StatementParseError(
+                'No valid GOTO args: {0}.'.format(words))
 
         return goto_obj
 
+    def parse_on_goto(self, words):
+        """Parse the ON GOTO statement, an expression and line numbers."""
+
+        on_goto_obj = OnGoto()
+
+        if 'GOTO' in words:
+            goto_index = words.index('GOTO')
+            arg = self.prim_parser.parse_arith_expr(
+                ' '.join(words[:goto_index]))
+            labels = tuple(
+                self.prim_parser.parse_num(word.strip())
+                for word in ' '.join(words[goto_index + 1:]).split(','))
+        else:
+            arg = None
+            labels = ()
+
+        if (arg and not isinstance(arg, parser.String) and labels and
+                all(labels)):
+            on_goto_obj.arg = arg
+            on_goto_obj.labels = labels
+        else:
+            raise StatementParseError(
+                'Invalid ON GOTO statement. Words: {0}.'.format(words))
+
+        return on_goto_obj
+
     def parse_for(self, words):
         """Parse the FOR statement."""
 
         for_obj = For()
 
-        if len(words) == 5:
-            var_obj = self.prim_parser.parse_var(words[0])
-            equal_flag = words[1] == '='
-            start_obj = self.prim_parser.parse_num(words[2])
-            to_flag = words[3] == 'TO'
-            end_obj = self.prim_parser.parse_num(words[4])
+        if len(words) != 5:
+            raise StatementParseError(
+                'Invalid FOR statement. Words: {0}.'.format(words))
+
+        var_obj = self.prim_parser.parse_var(words[0])
+        equal_flag = words[1] == '='
+        start_obj = self.prim_parser.parse_num(words[2])
+        to_flag = words[3] == 'TO'
+        end_obj = self.prim_parser.parse_num(words[4])
 
-        if all([for_obj, var_obj, equal_flag, start_obj, to_flag, end_obj]):
+        if all([var_obj, equal_flag, start_obj, to_flag, end_obj]):
             for_obj.var = var_obj
             for_obj.start = start_obj
             for_obj.end = end_obj
@@ -372,20 +656,24 @@ class StatementParser():
         return next_obj
 
     def parse_ifthen(self, words):
-        """Parse the IFTHEN statement."""
+        """Parse the IFTHEN statement.
+
+        The condition is two expressions around a boolean operator and
+        is followed by THEN and a line number.
+        """
 
         ifthen_obj = IfThen()
-        if len(words) == 5:
-            arg1_obj = self.prim_parser.parse_primative_obj(words[0])
-            bool_op_obj = self.prim_parser.parse_bool_op(words[1])
-            arg2_obj = self.prim_parser.parse_primative_obj(words[2])
-            then_flag = words[3] == 'THEN'
-            label_obj = self.prim_parser.parse_num(words[4])
-
-        if all([arg1_obj, bool_op_obj, arg2_obj, then_flag, label_obj]):
-            ifthen_obj.arg1 = arg1_obj
-            ifthen_obj.bool_op = bool_op_obj
-            ifthen_obj.arg2 = arg2_obj
+        condition = None
+        then_flag = False
+        label_obj = None
+
+        if len(words) >= 5:
+            condition = self.prim_parser.parse_condition(' '.join(words[:-2]))
+            then_flag = words[-2] == 'THEN'
+            label_obj = self.prim_parser.parse_num(words[-1])
+
+        if all([condition, then_flag, label_obj]):
+            ifthen_obj.arg1, ifthen_obj.bool_op, ifthen_obj.arg2 = condition
             ifthen_obj.label = label_obj
         else:
             raise StatementParseError(
@@ -393,6 +681,104 @@ class StatementParser():
 
         return ifthen_obj
 
+    def parse_dim(self, words):
+        """Parse the DIM statement, a list of arrays and their bounds."""
+
+        dim_obj = Dim()
+        decls = self.prim_parser.parse_array_decls(' '.join(words))
+
+        if decls:
+            dim_obj.arrays = decls
+        else:
+            raise StatementParseError(
+                'Invalid DIM statement. Words: {0}.'.format(words))
+
+        return dim_obj
+
+    def parse_gosub(self, words):
+        """Parse the GOSUB statement.  The argument is a line number."""
+
+        gosub_obj = Gosub()
+
+        if len(words) == 1:
+            label_obj = self.prim_parser.parse_num(words[0])
+        else:
+            label_obj = None
+
+        if label_obj:
+            gosub_obj.label = label_obj
+        else:
+            raise StatementParseError(
+                'Invalid GOSUB statement. Words: {0}.'.format(words))
+
+        return gosub_obj
+
+    def parse_return(self, words):
+        """Parse the RETURN statement."""
+
+        return_obj = Return()
+
+        if words:
+            raise StatementParseError(
+                'The RETURN statement should have no extra words: '
+                '{0}.'.format(words))
+
+        return return_obj
+
+    def parse_data(self, words):
+        """Parse the DATA statement, a list of number and string literals."""
+
+        data_obj = Data()
+        values = self.prim_parser.parse_data_values(' '.join(words))
+
+        if values:
+            data_obj.values = values
+        else:
+            raise StatementParseError(
+                'Invalid DATA statement. Words: {0}.'.format(words))
+
+        return data_obj
+
+    def parse_read(self, words):
+        """Parse the READ statement, a list of variables or elements."""
+
+        read_obj = Read()
+        targets = self.prim_parser.parse_target_list(' '.join(words))
+
+        if targets:
+            read_obj.targets = targets
+        else:
+            raise StatementParseError(
+                'Invalid READ statement. Words: {0}.'.format(words))
+
+        return read_obj
+
+    def parse_restore(self, words):
+        """Parse the RESTORE statement."""
+
+        restore_obj = Restore()
+
+        if words:
+            raise StatementParseError(
+                'The RESTORE statement should have no extra words: '
+                '{0}.'.format(words))
+
+        return restore_obj
+
+    def parse_input(self, words):
+        """Parse the INPUT statement, a list of variables or elements."""
+
+        input_obj = Input()
+        targets = self.prim_parser.parse_target_list(' '.join(words))
+
+        if targets:
+            input_obj.targets = targets
+        else:
+            raise StatementParseError(
+                'Invalid INPUT statement. Words: {0}.'.format(words))
+
+        return input_obj
+
     def parse_end(self, words):
         """Parse the END statement."""
 
@@ -423,6 +809,9 @@ class StatementParser():
             words: list of str.
         """
 
+        if not words:
+            raise StatementParseError('Missing statement.')
+
         keyword = words[0]
         rest = words[1:]
 
@@ -432,12 +821,28 @@ class StatementParser():
             obj = self.parse_let(rest)
         elif keyword == 'GOTO':
             obj = self.parse_goto(rest)
+        elif keyword == 'ON':
+            obj = self.parse_on_goto(rest)
         elif keyword == 'FOR':
             obj = self.parse_for(rest)
         elif keyword == 'NEXT':
             obj = self.parse_next(rest)
         elif keyword == 'IF':
             obj = self.parse_ifthen(rest)
+        elif keyword == 'DIM':
+            obj = self.parse_dim(rest)
+        elif keyword == 'GOSUB':
+            obj = self.parse_gosub(rest)
+        elif keyword == 'RETURN':
+            obj = self.parse_return(rest)
+        elif keyword == 'DATA':
+            obj = self.parse_data(rest)
+        elif keyword == 'READ':
+            obj = self.parse_read(rest)
+        elif keyword == 'RESTORE':
+            obj = self.parse_restore(rest)
+        elif keyword == 'INPUT':
+            obj = self.parse_input(rest)
         elif keyword == 'END':
             obj = self.parse_end(rest)
         elif keyword == 'REM':
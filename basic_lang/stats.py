@@ -0,0 +1,85 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Runtime counters for the execution engine."""
+
+import collections
+import json
+
+
+class EngineStats():
+    """Counters updated by an execution engine as it runs.
+
+    The counters are plain attributes so they can be read while the
+    program is still running.
+    """
+
+    def __init__(self):
+        """Initialize the counters to zero."""
+
+        self.statements = collections.Counter()
+        self.jumps = 0
+        self.for_iterations = 0
+        self.print_bytes = 0
+        self.var_reads = 0
+        self.var_writes = 0
+
+    def count_statement(self, statement_obj):
+        """Count one executed statement by its type."""
+
+        self.statements[type(statement_obj).__name__] += 1
+
+    def count_print(self, value):
+        """Count the bytes written by a PRINT, including the newline."""
+
+        self.print_bytes += len(str(value).encode('utf-8')) + 1
+
+    def total_statements(self):
+        """Return the number of statements executed."""
+
+        return sum(self.statements.values())
+
+    def as_dict(self):
+        """Return the counters as a dict."""
+
+        return {
+            'statements': dict(self.statements),
+            'total_statements': self.total_statements(),
+            'jumps': self.jumps,
+            'for_iterations': self.for_iterations,
+            'print_bytes': self.print_bytes,
+            'var_reads': self.var_reads,
+            'var_writes': self.var_writes,
+        }
+
+    def to_json(self):
+        """Return the counters as a JSON str."""
+
+        return json.dumps(self.as_dict(), indent=2, sort_keys=True)
+
+
+class CountingSymbolTable(dict):
+    """A symbol table that counts variable reads and writes."""
+
+    def __init__(self, stats):
+        """Initialize an empty table that updates the stats counters.
+
+        Args:
+          stats: EngineStats.
+        """
+
+        super().__init__()
+        self.stats = stats
+
+    def __getitem__(self, name):
+        """Count a variable read."""
+
+        self.stats.var_reads += 1
+
+        return super().__getitem__(name)
+
+    def __setitem__(self, name, value):
+        """Count a variable write."""
+
+        self.stats.var_writes += 1
+        super().__setitem__(name, value)
@@ -0,0 +1,304 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Lower element-wise FOR loops over arrays into single kernels.
+
+A FOR loop whose body only assigns array elements at the loop index,
+such as
+
+    10 FOR I = 0 TO 999
+    20 LET C(I) = A(I) * B(I) + K
+    30 NEXT I
+
+has no dependencies between iterations.  The whole loop is compiled
+into one Python function that runs over the array data directly, so it
+costs one dispatch instead of one per statement per element.  Loops
+that don't match run in the engine as usual.
+"""
+
+from basic_lang import parser
+from basic_lang import statement_parser
+
+
+# The errors of a loop body.  The loop variable is set to the index of
+# the failing iteration, as it is when the engine runs the loop.
+KERNEL_ERRORS = (TypeError, ValueError, OverflowError, ZeroDivisionError)
+
+
+def engine_error(exc):
+    """Return the error the engine raises for an error in a loop body.
+
+    Expression.eval() raises an ArithmeticOpError for a TypeError,
+    ValueError or OverflowError and lets a ZeroDivisionError through.
+    """
+
+    if isinstance(exc, ZeroDivisionError):
+        return exc
+
+    return parser.ArithmeticOpError('Invalid arithmetic: {0}'.format(exc))
+
+
+class KernelCompiler(parser.ExpressionCompiler):
+    """Compile the expressions of a loop body for a kernel.
+
+    The loop variable is the Python loop index, other variables are
+    read once into locals and array elements index the array data.
+    """
+
+    def __init__(self, var_name):
+        """Initialize the names used by the kernel.
+
+        Args:
+          var_name: str. The loop variable name.
+        """
+
+        super().__init__()
+        self.var_name = var_name
+        self.scalars = {}
+        self.arrays = {}
+
+    def variable(self, name):
+        """Return the source for a variable value."""
+
+        if name == self.var_name:
+            return '_i'
+        if name not in self.scalars:
+            self.scalars[name] = '_v{0}'.format(len(self.scalars))
+
+        return self.scalars[name]
+
+    def array_data(self, name):
+        """Return the local name of an array's data."""
+
+        if name not in self.arrays:
+            self.arrays[name] = len(self.arrays)
+
+        return '_d{0}'.format(self.arrays[name])
+
+    def array_element(self, name, index_sources):
+        """Return the source for an element at the loop index."""
+
+        return '_n({0}[_i])'.format(self.array_data(name))
+
+
+class LoopKernel():
+    """A FOR loop compiled into one function.
+
+    The function returns False without changing anything if the arrays
+    or variables it needs are not right for it.  The engine then runs
+    the loop the normal way.
+    """
+
+    __slots__ = ('for_obj', 'body', 'next_index', 'function')
+
+    def __init__(self, for_obj, body, next_index):
+        """Initialize the loop.
+
+        Args:
+          for_obj: statement_parser.For. The FOR statement.
+          body: list of statement_parser.Let. The loop body.
+          next_index: int. The line index after the NEXT statement.
+        """
+
+        self.for_obj = for_obj
+        self.body = body
+        self.next_index = next_index
+        self.function = None
+
+    def __getstate__(self):
+        """Return the loop without the compiled function."""
+
+        return (self.for_obj, self.body, self.next_index)
+
+    def __setstate__(self, state):
+        """Restore the loop."""
+
+        self.for_obj, self.body, self.next_index = state
+        self.function = None
+
+    def source(self, compiler):
+        """Return the Python source of the kernel function.
+
+        Args:
+          compiler: KernelCompiler. Collects the names the kernel uses.
+        """
+
+        var_name = self.for_obj.var.name
+        start = self.for_obj.start.value
+        last = max(start, self.for_obj.end.value)
+
+        assignments = []
+        for let_obj in self.body:
+            value_source = let_obj.value.source(compiler)
+            target_source = compiler.array_data(let_obj.var.name)
+            assignments.append('            {0}[_i] = {1}'.format(
+                target_source, value_source))
+
+        lines = ['def _kernel(_st):', '    try:']
+        for name, local in compiler.scalars.items():
+            lines.append('        {0} = _st[{1!r}].value'.format(local, name))
+        for name, number in compiler.arrays.items():
+            lines.append('        _a{0} = _st[{1!r}]'.format(
+                number, parser.array_key(name)))
+        lines += ['    except KeyError:', '        return False']
+
+        for local in compiler.scalars.values():
+            lines += [
+                '    if not isinstance({0}, (int, float)):'.format(local),
+                '        return False']
+        for number in compiler.arrays.values():
+            lines += [
+                '    if len(_a{0}.bounds) != 1:'.format(number),
+                '        return False',
+                '    if _a{0}.check_bounds and not (0 <= {1} and {2} <= '
+                '_a{0}.bounds[0]):'.format(number, start, last),
+                '        return False',
+                '    _d{0} = _a{0}.data'.format(number)]
+
+        lines += ['    try:',
+                  '        for _i in range({0}, {1}):'.format(start, last + 1)]
+        lines += assignments
+        lines += ['    except _KERNEL_ERRORS as _e:',
+                  '        _st[{0!r}] = _Number(_i)'.format(var_name),
+                  '        raise _error(_e)',
+                  '    _st[{0!r}] = _Number({1})'.format(var_name, last + 1),
+                  '    return True']
+
+        return '\n'.join(lines) + '\n'
+
+    def compile(self):
+        """Compile the kernel function."""
+
+        compiler = KernelCompiler(self.for_obj.var.name)
+        source = self.source(compiler)
+
+        namespace = dict(compiler.namespace)
+        namespace['_n'] = parser.make_number_value
+        namespace['_Number'] = parser.Number
+        namespace['_KERNEL_ERRORS'] = KERNEL_ERRORS
+        namespace['_error'] = engine_error
+        exec(compile(source, '<basic loop kernel>', 'exec'), namespace)
+        self.function = namespace['_kernel']
+
+        return self.function
+
+    def run(self, symbol_table):
+        """Run the whole loop.
+
+        Returns:
+          True if the loop was run or False if the engine should run it.
+        """
+
+        function = self.function
+        if function is None:
+            function = self.compile()
+
+        return function(symbol_table)
+
+
+def is_element_wise(obj, var_name):
+    """Return True if an expression only reads elements at the loop index."""
+
+    if isinstance(obj, (parser.Number, parser.Variable)):
+        result = True
+    elif isinstance(obj, parser.ArrayElement):
+        result = (len(obj.indices) == 1 and
+                  isinstance(obj.indices[0], parser.Variable) and
+                  obj.indices[0].name == var_name)
+    elif isinstance(obj, parser.ArithmeticExpression):
+        result = (is_element_wise(obj.arg1, var_name) and
+                  is_element_wise(obj.arg2, var_name))
+    elif isinstance(obj, parser.Negation):
+        result = is_element_wise(obj.arg, var_name)
+    elif isinstance(obj, parser.FunctionCall):
+        result = all(is_element_wise(arg, var_name) for arg in obj.args)
+    else:
+        result = False
+
+    return result
+
+
+def is_kernel_body(body, var_name):
+    """Return True if every body statement is an element-wise LET."""
+
+    for statement_obj in body:
+        if not isinstance(statement_obj, statement_parser.Let):
+            return False
+        if not (isinstance(statement_obj.var, parser.ArrayElement) and
+                is_element_wise(statement_obj.var, var_name) and
+                is_element_wise(statement_obj.value, var_name)):
+            return False
+
+    return True
+
+
+def jump_targets(lines, line_index_of):
+    """Return the line indices that statements can jump to.
+
+    Returns None if a computed GOTO could jump anywhere.
+    """
+
+    targets = set()
+    for _, statement_obj in lines:
+        if isinstance(statement_obj, statement_parser.OnGoto):
+            for label_obj in statement_obj.labels:
+                try:
+                    targets.add(line_index_of(label_obj.value))
+                except KeyError:
+                    pass
+        elif isinstance(statement_obj, (statement_parser.Goto,
+                                        statement_parser.IfThen,
+                                        statement_parser.Gosub)):
+            if not isinstance(statement_obj.label, parser.Number):
+                return None
+            try:
+                targets.add(line_index_of(statement_obj.label.value))
+            except KeyError:
+                pass
+
+    return targets
+
+
+def find_loop_kernels(lines, line_index_of):
+    """Find the FOR loops that can run as kernels.
+
+    Args:
+      lines: list of (label, statement) tuples.
+      line_index_of: callable. Returns the line index of a line number.
+
+    Returns:
+      A dict of LoopKernel objects by the line index of their FOR.
+    """
+
+    kernels = {}
+    targets = jump_targets(lines, line_index_of)
+    if targets is None:
+        return kernels
+
+    for index, (_, for_obj) in enumerate(lines):
+        if not isinstance(for_obj, statement_parser.For):
+            continue
+        if not (isinstance(for_obj.start.value, int) and
+                isinstance(for_obj.end.value, int)):
+            continue
+
+        var_name = for_obj.var.name
+        next_index = None
+        for body_index in range(index + 1, len(lines)):
+            statement_obj = lines[body_index][1]
+            if not isinstance(statement_obj, statement_parser.Let):
+                if (isinstance(statement_obj, statement_parser.Next) and
+                        statement_obj.var.name == var_name):
+                    next_index = body_index
+                break
+
+        if next_index is None or next_index == index + 1:
+            continue
+        if targets.intersection(range(index + 1, next_index + 1)):
+            continue
+
+        body = [lines[i][1] for i in range(index + 1, next_index)]
+        if is_kernel_body(body, var_name):
+            kernels[index] = LoopKernel(for_obj, body, next_index + 1)
+
+    return kernels
@@ -0,0 +1,49 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Measure how compiling and running generated programs scale."""
+
+import argparse
+import json
+from basic_lang import benchmark
+from basic_lang import generate
+
+
+def get_args():
+    """Get the program arguments."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(benchmark.DEFAULT_SIZES),
+                        help='Program sizes in lines.')
+    parser.add_argument('--shapes', nargs='+', choices=generate.SHAPES,
+                        default=list(generate.SHAPES),
+                        help='Program shapes.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the generated programs.')
+    parser.add_argument('--dir',
+                        help='Directory for the generated files.')
+    parser.add_argument('--json',
+                        help='Write the results to a JSON file.')
+
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark and print the results."""
+
+    opts = get_args()
+
+    results = benchmark.run_benchmark(opts.shapes, opts.sizes, opts.seed,
+                                      opts.dir)
+    for line in benchmark.format_results(results):
+        print(line)
+
+    if opts.json:
+        with open(opts.json, 'w') as out_file:
+            json.dump(results, out_file, indent=2, sort_keys=True)
+            out_file.write('\n')
+
+
+if __name__ == '__main__':
+    main()
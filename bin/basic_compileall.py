@@ -0,0 +1,47 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Compile the BASIC programs in directory trees into object files."""
+
+import argparse
+import sys
+from basic_lang import precompile
+
+
+def get_args():
+    """Get the program arguments."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('roots', nargs='+',
+                        help='Directories or files to compile.')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='Worker processes, one per CPU by default.')
+    parser.add_argument('-f', '--force', action='store_true', default=False,
+                        help='Compile files even if they are up to date.')
+    parser.add_argument('-q', '--quiet', action='store_true', default=False,
+                        help='Only report the files that fail.')
+
+    return parser.parse_args()
+
+
+def main():
+    """Compile the files and report the results."""
+
+    opts = get_args()
+
+    results = precompile.compile_tree(opts.roots, force=opts.force,
+                                      workers=opts.workers)
+    failed = 0
+    for result in results:
+        if result.status == precompile.FAILED:
+            failed += 1
+            print(result, file=sys.stderr)
+        elif not opts.quiet:
+            print(result)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,20 @@
 """Load, compile and run a BASIC program."""
 
 import argparse
-import pickle
+import signal
+import sys
+from basic_lang import checkpoint
+from basic_lang import coverage
+from basic_lang import emit
+from basic_lang import loader
+from basic_lang import memo
+from basic_lang import objfile
+from basic_lang import profiler
 from basic_lang import program
 
 BASIC = program.Basic()
+# The exit status of a run stopped after writing its snapshot.
+STOPPED_EXIT_STATUS = 75
 
 
 def get_args():
@@ -19,10 +29,117 @@ def get_args():
                         help='The output object file name.')
     parser.add_argument('-l', '--load_obj_file',
                         help='Load a compiled object file.')
+    parser.add_argument('--emit-py', dest='emit_py',
+                        help='Write the program as a Python module.')
     parser.add_argument('-r', '--run', action='store_true', default=False,
                         help='Run the file.')
-
-    return parser.parse_args()
+    parser.add_argument('--profile',
+                        help='Sample the run and write collapsed stacks.')
+    parser.add_argument('--profile_interval', type=float,
+                        default=profiler.DEFAULT_INTERVAL,
+                        help='Seconds between profile samples.')
+    parser.add_argument('--stats',
+                        help='Write the run counters to a JSON file.')
+    parser.add_argument('--seed', type=int,
+                        help='Seed RND for a reproducible run.')
+    parser.add_argument('--input',
+                        help='Read INPUT values from a file, not stdin.')
+    parser.add_argument('--checkpoint',
+                        help='Write a snapshot file if the run is stopped.')
+    parser.add_argument('--checkpoint_interval', type=float,
+                        help='Seconds between snapshots.')
+    parser.add_argument('--restore',
+                        help='Carry on the run saved in a snapshot file.')
+    parser.add_argument('--cache',
+                        help='Replay or save results in a cache directory.')
+    parser.add_argument('--cache_bytes', type=int,
+                        default=memo.DEFAULT_MAX_BYTES,
+                        help='The size the cache is kept under.')
+    parser.add_argument('--coverage',
+                        help='Merge the lines run into a coverage file.')
+    parser.add_argument('--coverage_listing',
+                        help='Write the source marked with the lines run.')
+
+    opts = parser.parse_args()
+    if opts.profile and (opts.checkpoint or opts.restore or opts.cache):
+        parser.error('--profile can not be used with --checkpoint, '
+                     '--restore or --cache')
+
+    return opts
+
+
+def run_profiled(opts, input_stream):
+    """Run the program with the sampling profiler on."""
+
+    BASIC.engine = program.ExecutionEngine(BASIC.program,
+                                           stats=bool(opts.stats),
+                                           seed=opts.seed,
+                                           input_stream=input_stream,
+                                           coverage=wants_coverage(opts))
+    sampler = profiler.SamplingProfiler(BASIC.engine,
+                                        interval=opts.profile_interval)
+
+    sampler.start()
+    try:
+        BASIC.engine.run()
+    finally:
+        sampler.stop()
+        sampler.write_collapsed(opts.profile)
+
+
+def run_checkpointed(opts, input_stream):
+    """Run the program, writing snapshots on SIGTERM or at intervals.
+
+    Returns:
+      True if the program ran to its end.
+    """
+
+    BASIC.engine = program.ExecutionEngine(BASIC.program,
+                                           stats=bool(opts.stats),
+                                           seed=opts.seed,
+                                           input_stream=input_stream,
+                                           coverage=wants_coverage(opts))
+    if opts.restore:
+        checkpoint.restore(BASIC.engine,
+                           checkpoint.read_snapshot(opts.restore),
+                           input_stream)
+
+    runner = checkpoint.CheckpointRunner(
+        BASIC.engine, opts.checkpoint or opts.restore,
+        opts.checkpoint_interval)
+    signal.signal(signal.SIGTERM, lambda signum, frame: runner.terminate())
+
+    return runner.run(resume=bool(opts.restore))
+
+
+def wants_coverage(opts):
+    """Return True if the lines run should be recorded."""
+
+    return bool(opts.coverage or opts.coverage_listing)
+
+
+def write_coverage(opts):
+    """Merge the coverage of the run and write the listing."""
+
+    bits = BASIC.engine.coverage
+    if opts.coverage:
+        bits = coverage.update_coverage_file(opts.coverage, bits,
+                                             BASIC.program.source_hash)
+
+    if opts.coverage_listing:
+        if not opts.basic_file:
+            raise SystemExit('--coverage_listing needs --basic_file')
+        listing = coverage.annotate(
+            BASIC.program, bits, loader.iter_source_lines(opts.basic_file))
+        with open(opts.coverage_listing, 'w') as out_file:
+            out_file.write('\n'.join(listing) + '\n')
+
+
+def write_stats(file_name):
+    """Write the engine counters as JSON."""
+
+    with open(file_name, 'w') as out_file:
+        out_file.write(BASIC.engine.stats.to_json() + '\n')
 
 
 def main():
@@ -31,22 +148,40 @@ def main():
     opts = get_args()
 
     if opts.basic_file:
-        with open(opts.basic_file, 'r') as in_file:
-            raw_lines = in_file.readlines()
-
-        lines = [r.strip() for r in raw_lines]
-        BASIC.compile_program(lines)
+        BASIC.compile_program(loader.iter_source_lines(opts.basic_file))
 
     if opts.write_obj_file:
-        with open(opts.write_obj_file, 'wb') as out_file:
-            pickle.dump(BASIC.program, out_file)
+        objfile.write_obj_file(BASIC.program, opts.write_obj_file)
 
     if opts.load_obj_file:
-        with open(opts.load_obj_file, 'rb') as in_obj_file:
-            BASIC.program = pickle.load(in_obj_file)
+        BASIC.program = objfile.load_obj_file(opts.load_obj_file)
+
+    if opts.emit_py:
+        emit.write_module(BASIC.program, opts.emit_py)
 
     if opts.run:
-        BASIC.run_obj()
+        input_stream = open(opts.input, 'r') if opts.input else None
+        try:
+            if opts.profile:
+                run_profiled(opts, input_stream)
+            elif opts.checkpoint or opts.restore:
+                if not run_checkpointed(opts, input_stream):
+                    sys.exit(STOPPED_EXIT_STATUS)
+            else:
+                cache = (memo.ResultCache(opts.cache, opts.cache_bytes)
+                         if opts.cache else None)
+                BASIC.run_obj(stats=bool(opts.stats), seed=opts.seed,
+                              input_stream=input_stream,
+                              coverage=wants_coverage(opts), cache=cache)
+        finally:
+            if input_stream is not None:
+                input_stream.close()
+            # A run that fails or stops at a checkpoint still records
+            # its counters and the lines it ran.
+            if opts.stats and BASIC.engine is not None:
+                write_stats(opts.stats)
+            if wants_coverage(opts) and BASIC.engine is not None:
+                write_coverage(opts)
 
 
 if __name__ == '__main__':
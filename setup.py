@@ -12,5 +12,6 @@ setup(
     author_email='kenguyton@gmail.com',
     packages=['basic_lang'],
     include_package_data=True,
-    scripts=['bin/basic_run.py']
+    scripts=['bin/basic_run.py', 'bin/basic_compileall.py',
+             'bin/basic_benchmark.py']
 )
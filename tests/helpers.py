@@ -0,0 +1,16 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Helpers shared by the tests."""
+
+from basic_lang import program
+
+
+def compile_lines(lines):
+    """Return a linked program for the lines."""
+
+    basic = program.Basic()
+    basic.compile_program(lines)
+    basic.program.link()
+
+    return basic.program
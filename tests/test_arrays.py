@@ -0,0 +1,67 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the arrays module."""
+
+import unittest
+
+from basic_lang import arrays
+
+
+class TestNumericArray(unittest.TestCase):
+    """Test a numeric array."""
+
+    def setUp(self):
+        """Create a one and a two dimensional array."""
+
+        self.vector = arrays.NumericArray('A', (10,))
+        self.matrix = arrays.NumericArray('B', (2, 3))
+
+    def test_create(self):
+        """Test the sizes and the zeroed elements."""
+
+        self.assertEqual(len(self.vector), 11)
+        self.assertEqual(len(self.matrix), 12)
+        self.assertEqual(self.vector.get(10), 0)
+        self.assertEqual(self.vector.data.itemsize, 8)
+
+    def test_set_get(self):
+        """Test storing and reading elements."""
+
+        self.vector.set(5, 3)
+        self.matrix.set(2.5, 1, 2)
+        self.matrix.set(7, 2, 0)
+
+        self.assertEqual(self.vector.get(3), 5)
+        self.assertTrue(isinstance(self.vector.get(3), int))
+        self.assertEqual(self.matrix.get(1, 2), 2.5)
+        self.assertEqual(self.matrix.get(2, 0), 7)
+        self.assertEqual(self.matrix.data[6], 2.5)
+
+    def test_bounds(self):
+        """Test the bounds checks."""
+
+        with self.assertRaises(arrays.ArrayBoundsError):
+            self.vector.get(11)
+        with self.assertRaises(arrays.ArrayBoundsError):
+            self.vector.set(1, -1)
+        with self.assertRaises(arrays.ArrayBoundsError):
+            self.matrix.get(1)
+
+    def test_no_bounds_check(self):
+        """Test that unchecked indices address the flat data."""
+
+        self.matrix.check_bounds = False
+        self.matrix.set(9, 0, 4)
+
+        self.assertEqual(self.matrix.get(1, 0), 9)
+
+    def test_set_string(self):
+        """Test that strings can't be stored."""
+
+        with self.assertRaises(arrays.ArrayValueError):
+            self.vector.set('HELLO', 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
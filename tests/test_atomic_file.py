@@ -0,0 +1,58 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the atomic_file module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import atomic_file
+
+
+class TestAtomicFile(unittest.TestCase):
+    """Test replacing files whole."""
+
+    def setUp(self):
+        """Make a temporary directory with a file in it."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, 'DATA')
+        with open(self.file_name, 'wb') as out_file:
+            out_file.write(b'old')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+
+        self.temp_dir.cleanup()
+
+    def read(self):
+        """Return the bytes of the file."""
+
+        with open(self.file_name, 'rb') as in_file:
+            return in_file.read()
+
+    def test_replacing(self):
+        """Test that the file is replaced at the end of the block."""
+
+        with atomic_file.replacing(self.file_name) as out_file:
+            out_file.write(b'new')
+            self.assertEqual(self.read(), b'old')
+
+        self.assertEqual(self.read(), b'new')
+        self.assertEqual(os.listdir(self.temp_dir.name), ['DATA'])
+
+    def test_interrupted(self):
+        """Test that an error leaves the file and no temporary file."""
+
+        with self.assertRaises(KeyboardInterrupt):
+            with atomic_file.replacing(self.file_name) as out_file:
+                out_file.write(b'new')
+                raise KeyboardInterrupt
+
+        self.assertEqual(self.read(), b'old')
+        self.assertEqual(os.listdir(self.temp_dir.name), ['DATA'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the benchmark module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import benchmark
+from basic_lang import generate
+
+
+def make_result(shape, lines, seconds):
+    """Return a result with the same time for every phase."""
+
+    return {'shape': shape, 'size': lines, 'lines': lines,
+            'times': {phase: seconds for phase in benchmark.PHASES},
+            'obj_bytes': 1000, 'peak_rss_bytes': 2000000}
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test measuring generated programs."""
+
+    def test_measure(self):
+        """Test timing the phases of a program in this process."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_file = os.path.join(temp_dir, 'GEN.BAS')
+            obj_file = os.path.join(temp_dir, 'GEN.obj')
+            count = generate.write_program(source_file, 300, generate.JUMP)
+
+            result = benchmark.measure(source_file, obj_file)
+
+        self.assertEqual(result['lines'], count)
+        self.assertEqual(sorted(result['times']), sorted(benchmark.PHASES))
+        self.assertGreater(result['obj_bytes'], 0)
+        self.assertGreater(result['peak_rss_bytes'], 0)
+
+    def test_run_benchmark(self):
+        """Test measuring cases in new processes."""
+
+        results = benchmark.run_benchmark([generate.LOOP], [300, 250])
+
+        self.assertEqual([result['size'] for result in results], [250, 300])
+        table = benchmark.format_results(results)
+        self.assertEqual(
+            len(table) - len(benchmark.super_linear(results)), 3)
+
+    def test_growth(self):
+        """Test the growth exponents and finding super-linear phases."""
+
+        results = [make_result('straight', 1000, 0.1),
+                   make_result('straight', 10000, 1.0),
+                   make_result('jump', 1000, 0.1),
+                   make_result('jump', 10000, 10.0),
+                   make_result('loop', 1000, 0.001),
+                   make_result('loop', 10000, 1.0)]
+
+        exponents = {(shape, phase): exponent for shape, phase, _, _, exponent
+                     in benchmark.growth(results)}
+        slow = benchmark.super_linear(results)
+
+        self.assertAlmostEqual(exponents['straight', 'run'], 1.0)
+        self.assertAlmostEqual(exponents['jump', 'parse'], 2.0)
+        self.assertNotIn(('loop', 'run'), exponents)
+        self.assertEqual(len(slow), len(benchmark.PHASES))
+        self.assertEqual({item[0] for item in slow}, {'jump'})
+        self.assertIn('super-linear: jump parse from 1000 to 10000 lines',
+                      benchmark.format_results(results)[-5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the checkpoint module."""
+
+import os
+import struct
+import tempfile
+import unittest
+
+from basic_lang import checkpoint
+from basic_lang import program
+
+import helpers
+
+LINES = ['10 DATA 5, 7',
+         '15 LET T = 0',
+         '20 READ A, B',
+         '30 INPUT C',
+         '40 FOR I = 1 TO 6',
+         '50 GOSUB 200',
+         '60 PRINT T',
+         '70 NEXT I',
+         '80 INPUT D',
+         '90 PRINT T + D + C',
+         '100 END',
+         '200 LET T = T + A * I + RND(1)',
+         '210 RETURN']
+
+INPUT_LINES = ['3 4']
+
+LOOP_LINES = ['10 LET S = 0',
+              '20 FOR I = 1 TO 20000',
+              '30 LET S = S + RND(1)',
+              '40 NEXT I']
+
+
+def make_engine(lines=LINES, seed=5):
+    """Return an engine with an output list for a new program."""
+
+    return program.ExecutionEngine(helpers.compile_lines(lines),
+                                   test_mode=True, seed=seed, output=[])
+
+
+def stop_at(engine, label, count):
+    """Ask the engine to stop on the count'th time it enters a label."""
+
+    seen = []
+
+    def on_line_enter(line_label):
+        if line_label == label:
+            seen.append(line_label)
+            if len(seen) == count:
+                engine.request_stop()
+
+    engine.on_line_enter = on_line_enter
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Test saving and restoring engines."""
+
+    def setUp(self):
+        """Run the program to its end for the expected results."""
+
+        self.full_engine = make_engine()
+        self.full_engine.run(input_stream=INPUT_LINES)
+
+    def stopped_engine(self):
+        """Return an engine stopped in the GOSUB in the FOR loop."""
+
+        engine = make_engine()
+        stop_at(engine, '200', 3)
+        engine.run(input_stream=INPUT_LINES)
+
+        self.assertTrue(engine.stopped)
+        self.assertEqual(engine.return_depth, 1)
+        self.assertIn('I', engine.for_loops)
+
+        return engine
+
+    def test_resume(self):
+        """Test carrying on a stopped run on the same engine."""
+
+        engine = self.stopped_engine()
+        engine.resume()
+
+        self.assertFalse(engine.stopped)
+        self.assertEqual(engine.values(), self.full_engine.values())
+        self.assertEqual(engine.output, self.full_engine.output)
+
+    def test_restore(self):
+        """Test carrying on a run in a new engine and program."""
+
+        engine = self.stopped_engine()
+        snapshot = checkpoint.checkpoint(engine)
+
+        new_engine = make_engine(seed=99)
+        checkpoint.restore(new_engine, snapshot, INPUT_LINES)
+        new_engine.resume()
+
+        self.assertEqual(new_engine.values(), self.full_engine.values())
+        self.assertEqual(engine.output + new_engine.output,
+                         self.full_engine.output)
+
+    def test_restore_output(self):
+        """Test that values printed after the snapshot are dropped."""
+
+        engine = self.stopped_engine()
+        snapshot = checkpoint.checkpoint(engine)
+        output_position = len(engine.output)
+        engine.resume()
+
+        checkpoint.restore(engine, snapshot, INPUT_LINES)
+
+        self.assertEqual(len(engine.output), output_position)
+        engine.resume()
+        self.assertEqual(engine.output, self.full_engine.output)
+
+    def test_not_stopped(self):
+        """Test that only a stopped run is saved."""
+
+        with self.assertRaises(checkpoint.SnapshotError):
+            checkpoint.checkpoint(self.full_engine)
+
+    def test_other_program(self):
+        """Test that a snapshot is only restored into its program."""
+
+        snapshot = checkpoint.checkpoint(self.stopped_engine())
+
+        with self.assertRaises(checkpoint.SnapshotError):
+            checkpoint.restore(make_engine(LOOP_LINES), snapshot)
+
+    def test_bad_snapshots(self):
+        """Test snapshots of other versions or damaged ones."""
+
+        snapshot = checkpoint.checkpoint(self.stopped_engine())
+        other_version = (checkpoint.MAGIC + struct.pack(
+            checkpoint.VERSION_FORMAT, checkpoint.VERSION + 1) +
+                         snapshot[checkpoint.HEADER_SIZE:])
+
+        for bad_snapshot in (b'not a snapshot', other_version,
+                             snapshot[:checkpoint.HEADER_SIZE + 5]):
+            with self.assertRaises(checkpoint.SnapshotError):
+                checkpoint.restore(make_engine(), bad_snapshot)
+
+
+class TestCheckpointRunner(unittest.TestCase):
+    """Test running with a snapshot file."""
+
+    def setUp(self):
+        """Make a temporary directory."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.temp_dir.name, 'RUN.snap')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+
+        self.temp_dir.cleanup()
+
+    def test_terminate(self):
+        """Test stopping a run for good and carrying it on from a file."""
+
+        full_engine = make_engine(LOOP_LINES)
+        full_engine.run()
+
+        engine = make_engine(LOOP_LINES)
+        runner = checkpoint.CheckpointRunner(engine, self.snapshot_file)
+        engine.on_line_enter = lambda label: (
+            label == '30' and engine.symbol_table['I'].value == 500 and
+            runner.terminate())
+
+        self.assertFalse(runner.run())
+        self.assertEqual(runner.snapshot_count, 1)
+
+        new_engine = make_engine(LOOP_LINES, seed=1)
+        checkpoint.restore(new_engine,
+                           checkpoint.read_snapshot(self.snapshot_file))
+        new_runner = checkpoint.CheckpointRunner(new_engine,
+                                                 self.snapshot_file)
+
+        self.assertTrue(new_runner.run(resume=True))
+        self.assertEqual(new_engine.values(), full_engine.values())
+
+    def test_interval(self):
+        """Test writing snapshots as the run goes on."""
+
+        full_engine = make_engine(LOOP_LINES)
+        full_engine.run()
+
+        engine = make_engine(LOOP_LINES)
+        runner = checkpoint.CheckpointRunner(engine, self.snapshot_file,
+                                             interval=0.001)
+
+        self.assertTrue(runner.run())
+        self.assertGreater(runner.snapshot_count, 0)
+        self.assertEqual(engine.values(), full_engine.values())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the coverage module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import coverage
+from basic_lang import program
+
+import helpers
+
+BRANCH_LINES = ['10 LET X = 1',
+                '20 IF X = N THEN 40',
+                '30 PRINT "NOT N"',
+                '40 PRINT "DONE"']
+
+KERNEL_LINES = ['10 DIM A(10)',
+                '20 FOR I = 0 TO 10',
+                '30 LET A(I) = I * 2',
+                '40 NEXT I',
+                '50 END',
+                '60 PRINT "NEVER"']
+
+
+class TestCoverage(unittest.TestCase):
+    """Test recording and merging the lines run."""
+
+    def setUp(self):
+        """Make a temporary directory."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cov_file = os.path.join(self.temp_dir.name, 'TEST.cov')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+
+        self.temp_dir.cleanup()
+
+    def test_engine_coverage(self):
+        """Test that coverage adds up over the runs of an engine."""
+
+        engine = program.ExecutionEngine(helpers.compile_lines(BRANCH_LINES),
+                                         test_mode=True, coverage=True)
+
+        engine.run({'N': 1})
+        self.assertEqual(engine.coverage, bytearray([1, 1, 0, 1]))
+
+        engine.run({'N': 2})
+        self.assertEqual(engine.coverage, bytearray([1, 1, 1, 1]))
+
+    def test_no_coverage(self):
+        """Test that coverage is off by default."""
+
+        engine = program.ExecutionEngine(helpers.compile_lines(BRANCH_LINES),
+                                         test_mode=True)
+        engine.run({'N': 1})
+
+        self.assertIsNone(engine.coverage)
+
+    def test_kernel_coverage(self):
+        """Test that a loop run as a kernel covers its lines."""
+
+        program_obj = helpers.compile_lines(KERNEL_LINES)
+        engine = program.ExecutionEngine(program_obj, test_mode=True,
+                                         coverage=True)
+        engine.run()
+
+        self.assertTrue(program_obj.loop_kernels)
+        self.assertEqual(engine.coverage, bytearray([1, 1, 1, 1, 1, 0]))
+
+    def test_merge(self):
+        """Test merging coverage bytes of different lengths."""
+
+        merged = coverage.merge(b'\x01\x00\x00\x01', b'\x00\x00\x01')
+
+        self.assertEqual(merged, bytearray([1, 0, 1, 1]))
+
+    def test_pack(self):
+        """Test packing coverage bytes a bit per line."""
+
+        bits = bytearray([1, 0, 0, 0, 0, 0, 0, 1, 0, 1])
+
+        packed = coverage.pack(bits)
+
+        self.assertEqual(packed, b'\x81\x02')
+        self.assertEqual(coverage.unpack(packed, len(bits)), bits)
+        self.assertEqual(coverage.pack(bytearray()), b'')
+        self.assertEqual(coverage.unpack(b'', 0), bytearray())
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.unpack(b'\x81\x04', len(bits))
+
+    def test_coverage_file_size(self):
+        """Test that a coverage file holds a bit per line."""
+
+        coverage.update_coverage_file(self.cov_file, bytearray(800))
+
+        self.assertEqual(os.path.getsize(self.cov_file),
+                         coverage.HEADER_SIZE + 100)
+
+    def test_byte_coverage_file(self):
+        """Test reading a file written with a byte per line."""
+
+        data = coverage.format_coverage(bytearray([1, 0, 1]))
+        with open(self.cov_file, 'wb') as out_file:
+            out_file.write(coverage.BYTE_MAGIC +
+                           data[len(coverage.MAGIC):coverage.HEADER_SIZE] +
+                           b'\x01\x00\x01')
+
+        bits = coverage.update_coverage_file(self.cov_file,
+                                             bytearray([0, 1, 0]))
+
+        self.assertEqual(bits, bytearray([1, 1, 1]))
+        self.assertEqual(coverage.read_coverage(self.cov_file), bits)
+
+    def test_update_coverage_file(self):
+        """Test merging into a coverage file over several runs."""
+
+        coverage.update_coverage_file(self.cov_file, bytearray([1, 0, 0]))
+        bits = coverage.update_coverage_file(self.cov_file,
+                                             bytearray([0, 0, 1]))
+
+        self.assertEqual(bits, bytearray([1, 0, 1]))
+        self.assertEqual(coverage.read_coverage(self.cov_file), bits)
+
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.update_coverage_file(self.cov_file, bytearray(4))
+
+    def test_merge_files(self):
+        """Test merging the coverage files of several processes."""
+
+        other_file = os.path.join(self.temp_dir.name, 'OTHER.cov')
+        coverage.update_coverage_file(self.cov_file, bytearray([1, 0, 0]))
+        coverage.update_coverage_file(other_file, bytearray([0, 1, 0]))
+
+        bits = coverage.merge_files([self.cov_file, other_file])
+
+        self.assertEqual(bits, bytearray([1, 1, 0]))
+
+    def test_other_program(self):
+        """Test that coverage of another program isn't merged."""
+
+        other_file = os.path.join(self.temp_dir.name, 'OTHER.cov')
+        program_hash = helpers.compile_lines(BRANCH_LINES).source_hash
+        other_lines = BRANCH_LINES[:2] + ['30 PRINT "N"', '40 END']
+        other_hash = helpers.compile_lines(other_lines).source_hash
+
+        coverage.update_coverage_file(self.cov_file, bytearray([1, 0, 0, 1]),
+                                      program_hash)
+        coverage.update_coverage_file(other_file, bytearray([0, 1, 0, 0]),
+                                      other_hash)
+
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.update_coverage_file(self.cov_file, bytearray(4),
+                                          other_hash)
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.merge_files([self.cov_file, other_file])
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.read_coverage(self.cov_file, other_hash)
+
+        bits = coverage.update_coverage_file(self.cov_file,
+                                             bytearray([0, 1, 0, 0]))
+        self.assertEqual(bits, bytearray([1, 1, 0, 1]))
+        self.assertEqual(coverage.read_coverage(self.cov_file, program_hash),
+                         bits)
+
+    def test_bad_file(self):
+        """Test reading a file that isn't a coverage file."""
+
+        with open(self.cov_file, 'wb') as out_file:
+            out_file.write(b'not coverage')
+
+        with self.assertRaises(coverage.CoverageFileError):
+            coverage.read_coverage(self.cov_file)
+
+    def test_annotate(self):
+        """Test the marked listing of a program."""
+
+        program_obj = helpers.compile_lines(BRANCH_LINES)
+
+        listing = coverage.annotate(program_obj, bytearray([1, 1, 0, 1]),
+                                    BRANCH_LINES)
+
+        self.assertEqual(listing, ['> 10 LET X = 1',
+                                   '> 20 IF X = N THEN 40',
+                                   '! 30 PRINT "NOT N"',
+                                   '> 40 PRINT "DONE"',
+                                   '3 of 4 lines run (75.0%)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
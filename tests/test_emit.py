@@ -0,0 +1,211 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the emit module."""
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from basic_lang import emit
+from basic_lang import error
+from basic_lang import parser
+from basic_lang import program
+
+import helpers
+
+PROGRAMS = {
+    'formula': ['10 LET A = 3',
+                '20 LET B = 4',
+                '30 LET C = (A ^ 2 + B ^ 2) ^ 0.5',
+                '40 IF C - 5 = 0 THEN 60',
+                '50 PRINT "WRONG"',
+                '60 PRINT -C * 2 + A / 2'],
+    'gosub': ['10 LET X = 1',
+              '20 GOSUB 100',
+              '30 GOSUB 100',
+              '40 PRINT X',
+              '50 END',
+              '100 LET X = X * 3',
+              '110 GOSUB 200',
+              '120 RETURN',
+              '200 LET X = X + 1',
+              '210 RETURN'],
+    'arrays': ['10 DIM A(5), T(2, 2)',
+               '20 FOR I = 0 TO 5',
+               '30 LET A(I) = I * I',
+               '40 NEXT I',
+               '50 LET T(1, 2) = A(3) + A(4)',
+               '60 PRINT T(1, 2) / 5',
+               '70 PRINT SQR(A(4)) + SGN(-2) + INT(2.5)'],
+    'data': ['10 READ X, Y$',
+             '20 RESTORE',
+             '30 READ Z',
+             '40 PRINT X + Z',
+             '50 PRINT Y$',
+             '60 DATA 2, "NAME"'],
+    'dispatch': ['10 FOR I = 1 TO 6',
+                 '20 GOTO (I - 3 * INT((I - 1) / 3)) * 100',
+                 '30 NEXT I',
+                 '40 ON 2 GOTO 500, 600',
+                 '100 PRINT "ONE"',
+                 '110 GOTO 30',
+                 '200 PRINT "TWO"',
+                 '210 GOTO 30',
+                 '300 PRINT "THREE"',
+                 '310 GOTO 30',
+                 '500 PRINT "FIVE"',
+                 '600 END'],
+}
+
+
+def engine_output(lines, **run_args):
+    """Return the PRINT values of running lines on an engine."""
+
+    output = []
+    engine = program.ExecutionEngine(helpers.compile_lines(lines),
+                                     test_mode=True, output=output)
+    engine.run(**run_args)
+
+    return output
+
+
+def load_module(lines):
+    """Emit lines as a module and return the executed module."""
+
+    source = emit.PythonEmitter(helpers.compile_lines(lines)).source()
+    namespace = {}
+    exec(compile(source, '<emitted>', 'exec'), namespace)
+
+    return namespace
+
+
+class TestPythonEmitter(unittest.TestCase):
+    """Test writing programs as Python."""
+
+    def test_same_output(self):
+        """Test that the modules print what the engine prints."""
+
+        for name, lines in PROGRAMS.items():
+            output = []
+            load_module(lines)['run'](output=output)
+
+            self.assertEqual(output, engine_output(lines), name)
+
+    def test_inputs(self):
+        """Test the preset variables, INPUT and the returned values."""
+
+        lines = ['10 INPUT X', '20 LET Y = X * N', '30 PRINT Y']
+        output = []
+
+        values = load_module(lines)['run'](
+            output=output, inputs={'N': 2}, input_stream=['1.5'])
+
+        self.assertEqual(output, [3])
+        self.assertEqual(values, {'N': 2, 'X': 1.5, 'Y': 3})
+
+    def test_errors(self):
+        """Test that a module raises the errors the engine raises."""
+
+        cases = [['10 RETURN'],
+                 ['10 GOSUB 10'],
+                 ['10 NEXT I'],
+                 ['10 LET I = 1', '20 NEXT I'],
+                 ['10 FOR I = 1 TO 2', '20 NEXT I', '30 NEXT I'],
+                 ['10 READ X'],
+                 ['10 INPUT X'],
+                 ['10 GOTO X'],
+                 ['10 PRINT Y'],
+                 ['10 PRINT A(1)'],
+                 ['10 LET A(1) = 2'],
+                 ['10 DIM A(2)', '20 LET A(3) = 1'],
+                 ['10 DIM A(2)', '20 PRINT A(1, 1)'],
+                 ['10 DIM A(2)', '20 LET A(1) = "TEXT"'],
+                 ['10 LET X = "TEXT" + 1'],
+                 ['10 LET X = SQR(-1)']]
+        inputs = {'X': 99}
+        for lines in cases:
+            engine = program.ExecutionEngine(helpers.compile_lines(lines),
+                                             test_mode=True, output=[],
+                                             input_stream=[])
+            with self.assertRaises(error.Error) as engine_context:
+                engine.run(inputs)
+
+            namespace = load_module(lines)
+            with self.assertRaises(namespace['BasicError']) as context:
+                namespace['run'](output=[], inputs=inputs, input_stream=[])
+
+            self.assertEqual(type(context.exception).__name__,
+                             type(engine_context.exception).__name__, lines)
+
+    def test_seed(self):
+        """Test that a seed and stream draw what the engine draws."""
+
+        lines = ['10 PRINT RND(1)', '20 PRINT RND(1)']
+        run = load_module(lines)['run']
+
+        for seed, stream in ((5, 0), (5, 3), ('name', 1)):
+            output = []
+            run(output=output, seed=seed, stream=stream)
+            engine = program.ExecutionEngine(helpers.compile_lines(lines),
+                                             test_mode=True, seed=seed,
+                                             stream=stream, output=[])
+            engine.run()
+            self.assertEqual(output, engine.output)
+
+    def test_undefined(self):
+        """Test reading a variable that was never set."""
+
+        namespace = load_module(['10 LET Y = 1', '20 PRINT X + Y'])
+        with self.assertRaises(Exception) as context:
+            namespace['run'](output=[])
+
+        self.assertEqual(type(context.exception).__name__,
+                         'UndefinedVariableError')
+        self.assertIsInstance(context.exception, namespace['BasicError'])
+        self.assertEqual(str(context.exception),
+                         'The variable X is undefined')
+
+    def test_bound_values(self):
+        """Test that bound inputs are stored the way the engine does."""
+
+        lines = ['10 PRINT N', '20 PRINT N$']
+        inputs = {'N': 5.0, 'N$': parser.String('"TEXT"')}
+        output = []
+
+        values = load_module(lines)['run'](output=output, inputs=inputs)
+
+        self.assertEqual(output, engine_output(lines, inputs=inputs))
+        self.assertEqual(output, [5, 'TEXT'])
+        self.assertIs(type(values['N']), int)
+
+    def test_functions(self):
+        """Test that every built-in function has a source."""
+
+        self.assertEqual(set(emit.FUNCTION_SOURCES), set(parser.FUNCTIONS))
+
+    def test_write_module(self):
+        """Test writing and importing a module file."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'formula.py')
+            emit.write_module(helpers.compile_lines(PROGRAMS['formula']),
+                              file_name)
+            with open(file_name) as in_file:
+                source = in_file.read()
+            self.assertFalse('import basic_lang' in source)
+            self.assertFalse('from basic_lang' in source)
+
+            spec = importlib.util.spec_from_file_location('formula',
+                                                          file_name)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+        output = []
+        module.run(output=output)
+        self.assertEqual(output, [-8.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
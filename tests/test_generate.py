@@ -0,0 +1,61 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the generate module."""
+
+import unittest
+
+from basic_lang import generate
+from basic_lang import program
+
+
+class TestGenerate(unittest.TestCase):
+    """Test generating programs."""
+
+    def run_shape(self, shape, line_count):
+        """Compile and run a generated program and return its engine."""
+
+        lines = list(generate.ProgramGenerator(shape).iter_lines(line_count))
+        basic = program.Basic()
+        basic.run(lines, test_mode=True)
+
+        return lines, basic.engine
+
+    def test_shapes(self):
+        """Test that every shape compiles and runs to its END."""
+
+        for shape in generate.SHAPES:
+            lines, engine = self.run_shape(shape, 1000)
+
+            self.assertGreaterEqual(len(lines), 1000)
+            self.assertLess(len(lines), 1010)
+            self.assertIn('V0', engine.values())
+
+    def test_seed(self):
+        """Test that the same seed makes the same program."""
+
+        lines1 = list(generate.ProgramGenerator('loop', 5).iter_lines(300))
+        lines2 = list(generate.ProgramGenerator('loop', 5).iter_lines(300))
+        lines3 = list(generate.ProgramGenerator('loop', 6).iter_lines(300))
+
+        self.assertEqual(lines1, lines2)
+        self.assertNotEqual(lines1, lines3)
+
+    def test_jump_subroutine(self):
+        """Test that the GOSUB subroutine of the jump shape runs."""
+
+        lines, engine = self.run_shape(generate.JUMP, 400)
+
+        gosub_count = sum(' GOSUB ' in line for line in lines)
+        self.assertGreater(gosub_count, 0)
+        self.assertGreaterEqual(engine.values()['V1'], 1)
+
+    def test_unknown_shape(self):
+        """Test that an unknown shape is an error."""
+
+        with self.assertRaises(generate.ShapeError):
+            generate.ProgramGenerator('spiral')
+
+
+if __name__ == '__main__':
+    unittest.main()
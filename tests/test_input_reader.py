@@ -0,0 +1,135 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the input_reader module."""
+
+import io
+import unittest
+
+from basic_lang import input_reader
+from basic_lang import parser
+
+INPUT_TEXT = '1, 2.5 -3\n"A, B" NAME\n1E3\n'
+
+
+class TerminalStream():
+    """A stream that reads like a terminal, one typed line at a time."""
+
+    def __init__(self, lines):
+        """Initialize with the lines the user types."""
+
+        self.lines = list(lines)
+        self.lines_read = 0
+
+    def isatty(self):
+        """Return True like a terminal."""
+
+        return True
+
+    def read(self, size=-1):
+        """Fail, as a large read would wait for more typing."""
+
+        raise AssertionError('A terminal was read in chunks')
+
+    def readline(self):
+        """Return the next typed line, or '' at the end."""
+
+        if self.lines_read == len(self.lines):
+            return ''
+        self.lines_read += 1
+
+        return self.lines[self.lines_read - 1]
+
+
+def read_all(reader):
+    """Return the values of a reader until its end."""
+
+    values = []
+    while True:
+        try:
+            values.append(reader.next_value().value)
+        except input_reader.InputEndError:
+            return values
+
+
+class TestMakeValue(unittest.TestCase):
+    """Test making values from fields."""
+
+    def test_make_value(self):
+        """Test numbers, strings and values."""
+
+        self.assertTrue(isinstance(input_reader.make_value('12'),
+                                   parser.Number))
+        self.assertEqual(input_reader.make_value('-.5').value, -0.5)
+        self.assertEqual(input_reader.make_value('"X Y"').value, 'X Y')
+        self.assertEqual(input_reader.make_value('INF').value, 'INF')
+        self.assertEqual(input_reader.make_value(7).value, 7)
+
+
+class TestInputReader(unittest.TestCase):
+    """Test reading values."""
+
+    def test_stream(self):
+        """Test reading a stream."""
+
+        reader = input_reader.InputReader(io.StringIO(INPUT_TEXT))
+
+        self.assertEqual(read_all(reader), [1, 2.5, -3, 'A, B', 'NAME', 1000])
+
+    def test_small_chunks(self):
+        """Test that fields are not cut at the chunk ends."""
+
+        reader = input_reader.InputReader(io.StringIO(INPUT_TEXT),
+                                          chunk_size=3)
+
+        self.assertEqual(read_all(reader), [1, 2.5, -3, 'A, B', 'NAME', 1000])
+
+    def test_quoted_newline(self):
+        """Test a quoted field with a newline across chunk ends."""
+
+        text = 'A "X\nY, Z" B\n"P\nQ"\n'
+        for chunk_size in range(1, len(text) + 1):
+            reader = input_reader.InputReader(io.StringIO(text),
+                                              chunk_size=chunk_size)
+
+            self.assertEqual(read_all(reader),
+                             ['A', 'X\nY, Z', 'B', 'P\nQ'], chunk_size)
+
+    def test_terminal(self):
+        """Test that a terminal is read a line at a time."""
+
+        stream = TerminalStream(['1 2\n', '"A\n', 'B" 3\n'])
+        reader = input_reader.InputReader(stream)
+
+        self.assertEqual(reader.next_value().value, 1)
+        self.assertEqual(stream.lines_read, 1)
+        self.assertEqual(read_all(reader), [2, 'A\nB', 3])
+
+    def test_no_final_newline(self):
+        """Test a last line without a newline."""
+
+        reader = input_reader.InputReader(io.StringIO('4\n5'), chunk_size=2)
+
+        self.assertEqual(read_all(reader), [4, 5])
+
+    def test_iterable(self):
+        """Test reading lines and values from an iterable."""
+
+        reader = input_reader.InputReader(['1 2', 3.5, 'X'])
+
+        self.assertEqual(read_all(reader), [1, 2, 3.5, 'X'])
+
+    def test_position(self):
+        """Test counting and skipping values."""
+
+        reader = input_reader.InputReader(io.StringIO(INPUT_TEXT))
+        reader.next_value()
+        reader.skip(2)
+
+        self.assertEqual(reader.position, 3)
+        self.assertEqual(reader.next_value().value, 'A, B')
+        self.assertEqual(reader.position, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the loader module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import loader
+from basic_lang import program
+
+SOURCE = b'10 LET X = 2\r\n\n   \n20 PRINT "\xc3\x89T\xc3\x89"\n30 PRINT X'
+
+
+class TestLoader(unittest.TestCase):
+    """Test loading source files."""
+
+    def setUp(self):
+        """Make a temporary directory."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+
+        self.temp_dir.cleanup()
+
+    def write_source(self, source):
+        """Write a source file and return its name."""
+
+        file_name = os.path.join(self.temp_dir.name, 'TEST.BAS')
+        with open(file_name, 'wb') as out_file:
+            out_file.write(source)
+
+        return file_name
+
+    def test_iter_mapped_lines(self):
+        """Test splitting bytes into lines."""
+
+        lines = list(loader.iter_mapped_lines(SOURCE))
+
+        self.assertEqual(lines, ['10 LET X = 2', '20 PRINT "ÉTÉ"',
+                                 '30 PRINT X'])
+
+    def test_iter_source_lines(self):
+        """Test loading and running a file."""
+
+        file_name = self.write_source(SOURCE)
+        basic = program.Basic()
+
+        basic.run(loader.iter_source_lines(file_name), test_mode=True)
+
+        self.assertEqual(basic.program.lines[1][1].output, 'ÉTÉ')
+        self.assertEqual(len(basic.program.lines), 3)
+
+    def test_empty_file(self):
+        """Test that an empty file has no lines."""
+
+        file_name = self.write_source(b'')
+
+        self.assertEqual(list(loader.iter_source_lines(file_name)), [])
+
+    def test_invalid_encoding(self):
+        """Test that a line that isn't UTF-8 is a source error."""
+
+        file_name = self.write_source(b'10 PRINT "\xff"\n')
+
+        with self.assertRaises(loader.SourceDecodeError):
+            list(loader.iter_source_lines(file_name))
+
+
+if __name__ == '__main__':
+    unittest.main()
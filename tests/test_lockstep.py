@@ -0,0 +1,123 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the lockstep module."""
+
+import unittest
+
+from basic_lang import lockstep
+from basic_lang import parser
+from basic_lang import program
+
+import helpers
+
+SWEEP_LINES = ['10 LET T = 0',
+               '20 FOR I = 1 TO 10',
+               '30 LET T = T + I * X',
+               '40 IF T < 100 THEN 60',
+               '50 LET T = T - 100',
+               '60 NEXT I',
+               '70 PRINT T',
+               '80 GOTO X * 10 + 100',
+               '110 PRINT "ONE"',
+               '120 END',
+               '130 PRINT "THREE"']
+
+ERROR_LINES = ['10 LET Y = 1 / X',
+               '20 PRINT Y']
+
+ARRAY_LINES = ['10 DIM A(2)',
+               '20 LET A(1) = X',
+               '30 PRINT A(1) * 2']
+
+
+def run_single(program_obj, inputs_list):
+    """Return the outputs of running each input set on its own engine."""
+
+    outputs = []
+    for inputs in inputs_list:
+        output = []
+        engine = program.ExecutionEngine(program_obj, test_mode=True,
+                                         output=output)
+        engine.run(inputs)
+        outputs.append(output)
+
+    return outputs
+
+
+class TestLockstepEngine(unittest.TestCase):
+    """Test running lanes in lockstep."""
+
+    def test_same_as_single_runs(self):
+        """Test that the outputs match ordinary runs of each lane."""
+
+        program_obj = helpers.compile_lines(SWEEP_LINES)
+        inputs_list = [{'X': x} for x in (1, 3, 1, 3)]
+
+        engine = lockstep.LockstepEngine(program_obj, inputs_list)
+        engine.run()
+
+        self.assertEqual(engine.outputs, run_single(program_obj, inputs_list))
+        self.assertEqual(engine.outputs[1], [65, 'THREE'])
+        self.assertEqual(engine.values(0)['I'], 11)
+        self.assertEqual(engine.single_lane_values, {})
+
+    def test_steps(self):
+        """Test that lanes that don't diverge share their steps."""
+
+        program_obj = helpers.compile_lines(SWEEP_LINES)
+        few = lockstep.LockstepEngine(program_obj, [{'X': 1}])
+        many = lockstep.LockstepEngine(program_obj, [{'X': 1}] * 100)
+
+        few.run()
+        many.run()
+
+        self.assertEqual(few.steps, many.steps)
+
+    def test_divergence(self):
+        """Test that too many groups send lanes to single runs."""
+
+        program_obj = helpers.compile_lines(SWEEP_LINES)
+        inputs_list = [{'X': x} for x in (1, 3, 3, 1)]
+
+        engine = lockstep.LockstepEngine(program_obj, inputs_list,
+                                         max_groups=1)
+        engine.run()
+
+        self.assertTrue(engine.single_lane_values)
+        self.assertEqual(engine.outputs, run_single(program_obj, inputs_list))
+
+    def test_error_lanes(self):
+        """Test that an error in a group is raised by the lane's run."""
+
+        program_obj = helpers.compile_lines(ERROR_LINES)
+        engine = lockstep.LockstepEngine(program_obj, [{'X': 2}])
+        engine.run()
+        self.assertEqual(engine.outputs, [[0.5]])
+
+        engine = lockstep.LockstepEngine(program_obj, [{'X': 2}, {'X': 0}])
+        with self.assertRaises(ZeroDivisionError):
+            engine.run()
+
+        engine = lockstep.LockstepEngine(program_obj, [{'X': 'A'}])
+        with self.assertRaises(parser.ArithmeticOpError):
+            engine.run()
+
+    def test_not_lockstep_program(self):
+        """Test a program with arrays, which runs lanes one at a time."""
+
+        program_obj = helpers.compile_lines(ARRAY_LINES)
+
+        self.assertFalse(lockstep.is_lockstep_program(program_obj))
+        self.assertTrue(lockstep.is_lockstep_program(
+            helpers.compile_lines(SWEEP_LINES)))
+
+        engine = lockstep.LockstepEngine(program_obj, [{'X': 1}, {'X': 4}])
+        engine.run()
+
+        self.assertEqual(engine.outputs, [[2], [8]])
+        self.assertEqual(engine.steps, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the memo module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import memo
+from basic_lang import program
+
+import helpers
+
+SUM_LINES = ['10 LET S = 0',
+             '20 LET I = 1',
+             '30 LET S = S + I',
+             '40 LET I = I + 1',
+             '50 IF I <= N THEN 30',
+             '60 PRINT S',
+             '70 PRINT "DONE"']
+
+RND_LINES = ['10 LET X = 1',
+             '20 IF X > 0 THEN 40',
+             '30 PRINT 1',
+             '40 LET Y = -(2 + RND(1))']
+
+INPUT_LINES = ['10 INPUT X',
+               '20 PRINT X']
+
+
+def make_engine(lines=SUM_LINES, output=None):
+    """Return a test mode engine for a new program."""
+
+    return program.ExecutionEngine(helpers.compile_lines(lines),
+                                   test_mode=True, output=output)
+
+
+class TestDeterminism(unittest.TestCase):
+    """Test the static determinism check."""
+
+    def test_is_deterministic(self):
+        """Test programs with and without RND and INPUT."""
+
+        for lines, deterministic in ((SUM_LINES, True), (RND_LINES, False),
+                                     (INPUT_LINES, False)):
+            self.assertEqual(
+                memo.is_deterministic(helpers.compile_lines(lines)),
+                deterministic)
+
+    def test_result_key(self):
+        """Test that the key changes with the source and inputs."""
+
+        sum_program = helpers.compile_lines(SUM_LINES)
+        key = memo.result_key(sum_program, {'N': 3})
+
+        self.assertEqual(
+            memo.result_key(helpers.compile_lines(SUM_LINES), {'N': 3}), key)
+        self.assertNotEqual(memo.result_key(sum_program, {'N': 4}), key)
+        self.assertNotEqual(
+            memo.result_key(helpers.compile_lines(SUM_LINES[:-1]), {'N': 3}),
+            key)
+
+        sum_program.add_line('80', program.statement_parser.End())
+        self.assertIsNone(memo.result_key(sum_program))
+
+
+class TestResultCache(unittest.TestCase):
+    """Test caching and replaying results."""
+
+    def setUp(self):
+        """Make a cache in a temporary directory."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = memo.ResultCache(os.path.join(self.temp_dir.name,
+                                                   'cache'))
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+
+        self.temp_dir.cleanup()
+
+    def test_replay(self):
+        """Test that a second run replays the first."""
+
+        engine = make_engine(output=[])
+        self.assertFalse(memo.run_cached(engine, self.cache, {'N': 4}))
+
+        new_engine = make_engine(output=[])
+        self.assertTrue(memo.run_cached(new_engine, self.cache, {'N': 4}))
+
+        self.assertEqual(new_engine.output, [10, 'DONE'])
+        self.assertEqual(new_engine.output, engine.output)
+        self.assertEqual(new_engine.values(), engine.values())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.assertFalse(memo.run_cached(make_engine(), self.cache,
+                                         {'N': 5}))
+
+    def test_not_cached(self):
+        """Test that nondeterministic and instrumented runs aren't cached."""
+
+        for engine in (make_engine(RND_LINES), make_engine(INPUT_LINES),
+                       program.ExecutionEngine(
+                           helpers.compile_lines(SUM_LINES), test_mode=True,
+                           coverage=True)):
+            engine.input_reader = program.input_reader.InputReader(['7'])
+            self.assertFalse(memo.run_cached(engine, self.cache, {'N': 1}))
+
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_damaged_entry(self):
+        """Test that a damaged entry is a miss and is removed."""
+
+        engine = make_engine()
+        memo.run_cached(engine, self.cache, {'N': 2})
+        key = memo.result_key(engine.program, {'N': 2})
+        with open(self.cache.entry_file(key), 'wb') as out_file:
+            out_file.write(b'damaged')
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.exists(self.cache.entry_file(key)))
+
+    def test_evict(self):
+        """Test that the least recently used entries are removed."""
+
+        engine = make_engine()
+        memo.run_cached(engine, self.cache, {'N': 1})
+        entry_size = os.path.getsize(self.cache.entry_file(
+            memo.result_key(engine.program, {'N': 1})))
+        self.cache.max_bytes = 2 * entry_size
+
+        keys = []
+        for number in range(1, 4):
+            keys.append(memo.result_key(engine.program, {'N': number}))
+            file_name = self.cache.entry_file(keys[-1])
+            if os.path.exists(file_name):
+                os.utime(file_name, (number, number))
+            else:
+                memo.run_cached(make_engine(), self.cache, {'N': number})
+
+        self.assertEqual(sorted(os.listdir(self.cache.directory)),
+                         sorted(os.path.basename(self.cache.entry_file(key))
+                                for key in keys[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
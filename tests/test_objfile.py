@@ -0,0 +1,139 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the objfile module."""
+
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+from basic_lang import objfile
+from basic_lang import program
+
+import helpers
+
+LINES = ['10 DATA 2, 3, "A"',
+         '20 READ X, Y, Z$',
+         '30 GOSUB 100',
+         '40 GOTO 200',
+         '100 LET W = X * Y + 1',
+         '110 RETURN',
+         '200 IF W > 5 THEN 400',
+         '300 LET W = 0',
+         '400 PRINT W + X']
+
+KERNEL_LINES = ['10 DIM A(10), B(10)',
+                '20 FOR I = 0 TO 10',
+                '30 LET A(I) = I * 2',
+                '40 LET B(I) = A(I) + 1',
+                '50 NEXT I',
+                '60 LET C = B(10)']
+
+
+def write_and_load(program_obj):
+    """Return a LazyProgram written from a program."""
+
+    out_file = io.BytesIO()
+    objfile.write_program(program_obj, out_file)
+
+    return objfile.LazyProgram(out_file.getvalue())
+
+
+def run_values(program_obj):
+    """Run a program and return its variable values."""
+
+    engine = program.ExecutionEngine(program_obj, test_mode=True)
+    engine.run()
+
+    return engine.values()
+
+
+class TestObjFile(unittest.TestCase):
+    """Test writing and lazily loading object files."""
+
+    def test_lazy_load(self):
+        """Test that only the statements that run are loaded."""
+
+        lazy_program = write_and_load(helpers.compile_lines(LINES))
+
+        self.assertEqual(lazy_program.statements, [None] * len(LINES))
+        self.assertEqual(lazy_program.data[2].value, 'A')
+
+        values = run_values(lazy_program)
+
+        self.assertEqual(values, {'X': 2, 'Y': 3, 'Z$': 'A', 'W': 7})
+        self.assertIsNone(lazy_program.statements[7])
+        self.assertEqual(len([statement_obj for statement_obj
+                              in lazy_program.statements
+                              if statement_obj is not None]), 8)
+
+    def test_shared_constants(self):
+        """Test that pooled constants are still shared after loading."""
+
+        lazy_program = write_and_load(helpers.compile_lines(
+            ['10 LET X = 2 * 3', '20 LET Y = 2 * 3']))
+
+        self.assertIs(lazy_program.lines[0][1].value,
+                      lazy_program.lines[1][1].value)
+
+    def test_loop_kernels(self):
+        """Test that loop kernels are loaded when their FOR runs."""
+
+        lazy_program = write_and_load(helpers.compile_lines(KERNEL_LINES))
+
+        self.assertEqual(list(lazy_program.loop_kernels), [1])
+        self.assertEqual(lazy_program.loop_kernels.kernels, {})
+
+        self.assertEqual(run_values(lazy_program)['C'], 21)
+        self.assertEqual(list(lazy_program.loop_kernels.kernels), [1])
+
+    def test_add_line(self):
+        """Test that adding a line links the program again."""
+
+        lazy_program = write_and_load(helpers.compile_lines(LINES))
+        let_obj = helpers.compile_lines(['410 LET V = 1']).lines[0][1]
+        lazy_program.add_line('410', let_obj)
+
+        self.assertEqual(run_values(lazy_program)['V'], 1)
+        self.assertEqual(lazy_program.line_index_of(410), 9)
+
+    def test_pickle(self):
+        """Test that a LazyProgram pickles as an ordinary Program."""
+
+        lazy_program = write_and_load(helpers.compile_lines(LINES))
+        program_obj = pickle.loads(pickle.dumps(lazy_program))
+
+        self.assertIs(type(program_obj), program.Program)
+        self.assertEqual(run_values(program_obj)['W'], 7)
+
+    def test_load_obj_file(self):
+        """Test loading both object file formats."""
+
+        program_obj = helpers.compile_lines(LINES)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lazy_file = os.path.join(temp_dir, 'LAZY.obj')
+            pickle_file = os.path.join(temp_dir, 'PICKLE.obj')
+            objfile.write_obj_file(program_obj, lazy_file)
+            with open(pickle_file, 'wb') as out_file:
+                pickle.dump(helpers.compile_lines(LINES), out_file)
+
+            lazy_program = objfile.load_obj_file(lazy_file)
+            self.assertIsInstance(lazy_program, objfile.LazyProgram)
+            self.assertEqual(run_values(lazy_program)['W'], 7)
+            lazy_program.mapped.close()
+
+            pickled_program = objfile.load_obj_file(pickle_file)
+            self.assertIs(type(pickled_program), program.Program)
+            self.assertEqual(run_values(pickled_program)['W'], 7)
+
+    def test_not_an_object_file(self):
+        """Test that other bytes are rejected."""
+
+        with self.assertRaises(objfile.ObjectFileError):
+            objfile.LazyProgram(b'not an object file')
+
+
+if __name__ == '__main__':
+    unittest.main()
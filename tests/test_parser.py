@@ -3,9 +3,13 @@
 
 """Test the parser module."""
 
+import math
+import pickle
 import unittest
 
+from basic_lang import arrays
 from basic_lang import parser
+from basic_lang import rnd
 
 NUM = '10'
 VAR = 'X'
@@ -114,6 +118,309 @@ class TestParser(unittest.TestCase):
         self.assertTrue(isinstance(gt_obj, parser.BoolGreaterThan))
         self.assertTrue(isinstance(ge_obj, parser.BoolGreaterOrEqual))
 
+    def test_shared_operators(self):
+        """Test that parsed operators are shared instances."""
+
+        self.assertTrue(self.parser.parse_arith_op('+') is
+                        self.parser.parse_arith_op('+'))
+        self.assertTrue(self.parser.parse_bool_op('<>') is
+                        parser.BoolNotEqual())
+        self.assertTrue(pickle.loads(pickle.dumps(parser.ArithmeticMul())) is
+                        parser.ArithmeticMul())
+
+    def test_shared_variables(self):
+        """Test that a variable name is parsed into one shared object."""
+
+        var_x = self.parser.parse_var(VAR)
+        expr = self.parser.parse_arith_expr(ARITH_VAR_NUM)
+
+        self.assertTrue(expr.arg1 is var_x)
+        self.assertFalse(self.parser.parse_var('Y') is var_x)
+
+    def test_no_instance_dict(self):
+        """Test that parsed objects have no per-instance dict."""
+
+        objs = [self.parser.parse_num(NUM), self.parser.parse_str(STR),
+                self.parser.parse_var(VAR),
+                self.parser.parse_arith_expr(ARITH_EXPR),
+                self.parser.parse_arith_op('-'),
+                self.parser.parse_bool_op('=')]
+
+        for obj in objs:
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+
+class TestExpressionGrammar(unittest.TestCase):
+    """Test parsing and evaluating compound expressions."""
+
+    def setUp(self):
+        """Set up a parser and a symbol table."""
+
+        self.parser = parser.Parser()
+        self.symbol_table = {'X': parser.Number('5'),
+                             'S': parser.String('"TEXT"')}
+
+    def eval_expr(self, input_str):
+        """Parse and evaluate an expression and return its value."""
+
+        obj = self.parser.parse_arith_expr(input_str)
+
+        return obj.eval(self.symbol_table).value
+
+    def test_precedence(self):
+        """Test operator precedence and parentheses."""
+
+        self.assertEqual(self.eval_expr('2 + 3 * 4'), 14)
+        self.assertEqual(self.eval_expr('(2 + 3) * 4'), 20)
+        self.assertEqual(self.eval_expr('10 - 4 - 3'), 3)
+        self.assertEqual(self.eval_expr('2*(X+1)/3'), 4)
+
+    def test_power(self):
+        """Test the right associative exponent operator."""
+
+        self.assertEqual(self.eval_expr('2 ^ 3 ^ 2'), 512)
+        self.assertEqual(self.eval_expr('-2 ^ 2'), -4)
+        self.assertEqual(self.eval_expr('X ^ 2'), 25)
+
+    def test_unary_minus(self):
+        """Test negation."""
+
+        self.assertEqual(self.eval_expr('-X + 1'), -4)
+        self.assertEqual(self.eval_expr('2 * -3'), -6)
+        self.assertEqual(self.eval_expr('-(X - 8)'), 3)
+
+        obj = self.parser.parse_arith_expr('-7')
+        self.assertTrue(isinstance(obj, parser.Number))
+        self.assertEqual(obj.value, -7)
+
+    def test_division(self):
+        """Test that whole quotients are ints and others are floats."""
+
+        self.assertEqual(self.eval_expr('7 / 2'), 3.5)
+        self.assertTrue(isinstance(self.eval_expr('4 / 2'), int))
+        self.assertEqual(self.eval_expr('.5 + 1.25'), 1.75)
+
+    def test_invalid(self):
+        """Test that invalid expressions are not parsed."""
+
+        self.assertTrue(self.parser.parse_arith_expr('2 +') is None)
+        self.assertTrue(self.parser.parse_arith_expr('(2 + 3') is None)
+        self.assertTrue(self.parser.parse_arith_expr('X Y') is None)
+        self.assertTrue(self.parser.parse_arith_expr('2 # 3') is None)
+
+    def test_eval_errors(self):
+        """Test undefined variables and arithmetic on strings."""
+
+        with self.assertRaises(parser.UndefinedVariableError):
+            self.eval_expr('Q + 1')
+        with self.assertRaises(parser.ArithmeticOpError):
+            self.eval_expr('S * 2')
+
+    def test_compiled_once(self):
+        """Test that an expression is compiled into one function."""
+
+        obj = self.parser.parse_arith_expr('(X + 1) * (X - 1)')
+        obj.eval(self.symbol_table)
+        function = obj.function
+        obj.eval(self.symbol_table)
+
+        self.assertTrue(function is obj.function)
+        self.assertTrue(obj.arg1.function is None)
+
+    def test_pickle_compiled(self):
+        """Test pickling an expression after it is compiled."""
+
+        obj = self.parser.parse_arith_expr('X * X + 1')
+        obj.eval(self.symbol_table)
+
+        loaded = pickle.loads(pickle.dumps(obj))
+
+        self.assertTrue(loaded.function is None)
+        self.assertEqual(loaded.eval(self.symbol_table).value, 26)
+
+    def test_parse_condition(self):
+        """Test parsing a condition with expressions."""
+
+        arg1, bool_op, arg2 = self.parser.parse_condition('X + 1 >= 2 * 3')
+
+        self.assertTrue(isinstance(arg1, parser.ArithmeticExpression))
+        self.assertTrue(bool_op is parser.BoolGreaterOrEqual())
+        self.assertTrue(isinstance(arg2, parser.ArithmeticExpression))
+        self.assertTrue(self.parser.parse_condition('X + 1') is None)
+
+
+class TestArrayElements(unittest.TestCase):
+    """Test parsing array elements and declarations."""
+
+    def setUp(self):
+        """Set up a parser and a symbol table with an array."""
+
+        self.parser = parser.Parser()
+        self.array_obj = arrays.NumericArray('A', (3, 3))
+        self.array_obj.set(7, 1, 2)
+        self.symbol_table = {'A()': self.array_obj, 'I': parser.Number(1)}
+
+    def test_parse_element(self):
+        """Test an array element in an expression."""
+
+        obj = self.parser.parse_arith_expr('A(I, I + 1) * 2')
+
+        self.assertTrue(isinstance(obj.arg1, parser.ArrayElement))
+        self.assertEqual(obj.arg1.name, 'A')
+        self.assertEqual(len(obj.arg1.indices), 2)
+        self.assertEqual(obj.eval(self.symbol_table).value, 14)
+
+    def test_parse_target(self):
+        """Test parsing assignment targets."""
+
+        var_obj = self.parser.parse_target('X')
+        elem_obj = self.parser.parse_target('A(I, 0)')
+
+        self.assertTrue(isinstance(var_obj, parser.Variable))
+        self.assertTrue(isinstance(elem_obj, parser.ArrayElement))
+        self.assertTrue(self.parser.parse_target('A(I') is None)
+        self.assertTrue(self.parser.parse_target('2') is None)
+
+    def test_assign(self):
+        """Test storing into an element."""
+
+        elem_obj = self.parser.parse_target('A(I + 1, 0)')
+        elem_obj.assign(self.symbol_table, parser.Number(4))
+
+        self.assertEqual(self.array_obj.get(2, 0), 4)
+
+    def test_undefined_array(self):
+        """Test reading an array that was not dimensioned."""
+
+        obj = self.parser.parse_arith_expr('Z(1)')
+
+        with self.assertRaises(parser.UndefinedVariableError):
+            obj.eval(self.symbol_table)
+
+    def test_parse_array_decls(self):
+        """Test parsing DIM declarations."""
+
+        decls = self.parser.parse_array_decls('A(10), B(3, 4)')
+
+        self.assertEqual(decls, [('A', (10,)), ('B', (3, 4))])
+        self.assertTrue(self.parser.parse_array_decls('A(X)') is None)
+        self.assertTrue(self.parser.parse_array_decls('A(2.5)') is None)
+        self.assertTrue(self.parser.parse_array_decls('A(1) B(2)') is None)
+
+
+class TestFunctions(unittest.TestCase):
+    """Test the built-in functions."""
+
+    def setUp(self):
+        """Set up a parser and a symbol table."""
+
+        self.parser = parser.Parser()
+        self.symbol_table = {'X': parser.Number('-2.5'),
+                             parser.RND_KEY: rnd.RandomStream(7).random}
+
+    def eval_expr(self, input_str):
+        """Parse and evaluate an expression and return its value."""
+
+        obj = self.parser.parse_arith_expr(input_str)
+
+        return obj.eval(self.symbol_table).value
+
+    def test_math(self):
+        """Test the math functions."""
+
+        self.assertEqual(self.eval_expr('SQR(16) + 1'), 5)
+        self.assertEqual(self.eval_expr('ABS(X) * 2'), 5)
+        self.assertEqual(self.eval_expr('INT(X)'), -3)
+        self.assertEqual(self.eval_expr('SGN(X) + SGN(0)'), -1)
+        self.assertAlmostEqual(self.eval_expr('EXP(LOG(7))'), 7)
+        self.assertAlmostEqual(self.eval_expr('SIN(1) ^ 2 + COS(1) ^ 2'), 1)
+        self.assertAlmostEqual(self.eval_expr('4 * ATN(1)'), math.pi)
+        self.assertAlmostEqual(self.eval_expr('TAN(0.5)'), math.tan(0.5))
+
+    def test_rnd(self):
+        """Test that RND is from 0 up to 1."""
+
+        value = self.eval_expr('RND(1)')
+
+        self.assertTrue(0 <= value < 1)
+
+    def test_bound_call(self):
+        """Test that the function is bound into the compiled function."""
+
+        obj = self.parser.parse_arith_expr('SQR(X * X)')
+        obj.eval(self.symbol_table)
+
+        self.assertTrue(isinstance(obj, parser.FunctionCall))
+        self.assertTrue(math.sqrt in obj.function.__defaults__)
+        self.assertFalse('SQR' in obj.function.__code__.co_names)
+
+    def test_invalid(self):
+        """Test bad calls and domain errors."""
+
+        self.assertTrue(self.parser.parse_arith_expr('SQR(1, 2)') is None)
+        self.assertTrue(self.parser.parse_arith_expr('SQR 2') is None)
+        with self.assertRaises(parser.ArithmeticOpError):
+            self.eval_expr('SQR(X)')
+        with self.assertRaises(parser.ArithmeticOpError):
+            self.eval_expr('LOG(0)')
+
+
+class TestConstantPool(unittest.TestCase):
+    """Test the constant pool."""
+
+    def setUp(self):
+        """Set up a parser with its pool."""
+
+        self.parser = parser.Parser()
+        self.pool = self.parser.constant_pool
+
+    def test_intern_literals(self):
+        """Test that equal literals are parsed into one object."""
+
+        num1 = self.parser.parse_num(NUM)
+        num2 = self.parser.parse_num(NUM)
+        str1 = self.parser.parse_str(STR)
+        str2 = self.parser.parse_primative_obj(STR)
+
+        self.assertTrue(num1 is num2)
+        self.assertTrue(str1 is str2)
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(self.pool.index_of(str1), 1)
+        self.assertTrue(self.pool[0] is num1)
+
+    def test_intern_expressions(self):
+        """Test that equal expressions are parsed into one object."""
+
+        expr1 = self.parser.parse_arith_expr(ARITH_VAR_NUM)
+        expr2 = self.parser.parse_arith_expr(ARITH_VAR_NUM)
+        expr3 = self.parser.parse_arith_expr('X + 5')
+
+        self.assertTrue(expr1 is expr2)
+        self.assertFalse(expr1 is expr3)
+        self.assertTrue(expr1.arg2 is expr3.arg2)
+
+    def test_flat_keys(self):
+        """Test that the key of a nested expression is a flat tuple."""
+
+        expr = self.parser.parse_arith_expr('((X + 1) * (Y - 2)) / -(X + 1)')
+        key = parser.constant_key(expr)
+
+        self.assertEqual(len(key), 4)
+        self.assertTrue(key[1] is expr.arg1)
+        self.assertTrue(self.pool.intern(
+            parser.ArithmeticExpression(expr.arg1, expr.arith_op,
+                                        expr.arg2)) is expr)
+
+    def test_pickle(self):
+        """Test that the index is rebuilt after unpickling."""
+
+        self.parser.parse_arith_expr(ARITH_EXPR)
+        pool = pickle.loads(pickle.dumps(self.pool))
+        new_num = parser.Number('2')
+
+        self.assertEqual(len(pool), 3)
+        self.assertTrue(pool.intern(new_num) is pool[0])
+
 
 class TestString(unittest.TestCase):
     """Test a string object."""
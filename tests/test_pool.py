@@ -0,0 +1,53 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the pool module."""
+
+import unittest
+
+from basic_lang import pool
+from basic_lang import program
+
+SWEEP_LINES = ['10 LET Y = X * X + 1',
+               '20 IF Y > 50 THEN 40',
+               '30 LET Y = 0',
+               '40 LET R = RND(1)',
+               '50 END']
+
+
+class TestEnginePool(unittest.TestCase):
+    """Test reusing engines."""
+
+    def setUp(self):
+        """Compile the sweep program and make a pool."""
+
+        basic = program.Basic()
+        basic.compile_program(SWEEP_LINES)
+        self.pool = pool.EnginePool(basic.program, test_mode=True, seed=1)
+
+    def test_run(self):
+        """Test a sweep of runs on one reused engine."""
+
+        results = [self.pool.run({'X': x}) for x in range(10)]
+
+        self.assertEqual([result['Y'] for result in results],
+                         [0] * 8 + [65, 82])
+        self.assertEqual(self.pool.size, 1)
+
+    def test_independent_streams(self):
+        """Test that engines in use at once draw different numbers."""
+
+        with self.pool.engine() as engine1:
+            with self.pool.engine() as engine2:
+                engine1.run({'X': 1})
+                engine2.run({'X': 1})
+
+                self.assertNotEqual(engine1.values()['R'],
+                                    engine2.values()['R'])
+
+        self.assertEqual(self.pool.size, 2)
+        self.assertEqual(len(self.pool.idle), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
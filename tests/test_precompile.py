@@ -0,0 +1,126 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the precompile module."""
+
+import os
+import tempfile
+import unittest
+
+from basic_lang import objfile
+from basic_lang import precompile
+from basic_lang import program
+
+GOOD_SOURCE = '10 LET X = 2\n20 LET Y = X * 3\n'
+BAD_SOURCE = '10 PRINT (\n'
+# Lines the parser once failed on with errors other than its own.
+CRASH_SOURCES = ('10 FOR I = 1 TO\n', '10\n', '10 LET\n',
+                 '10 LET X = 1 +\n', '{0} END\n'.format(2 ** 64))
+
+
+class TestPrecompile(unittest.TestCase):
+    """Test compiling trees of source files."""
+
+    def setUp(self):
+        """Make a temporary tree of source files."""
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        os.mkdir(os.path.join(self.root, 'sub'))
+        self.good_file = self.write_source('GOOD.BAS', GOOD_SOURCE)
+        self.sub_file = self.write_source(
+            os.path.join('sub', 'OTHER.bas'), GOOD_SOURCE)
+        self.bad_file = self.write_source('BAD.BAS', BAD_SOURCE)
+        self.write_source('NOTES.TXT', 'Not a program.')
+
+    def tearDown(self):
+        """Remove the temporary tree."""
+
+        self.temp_dir.cleanup()
+
+    def write_source(self, name, source):
+        """Write a source file and return its name."""
+
+        file_name = os.path.join(self.root, name)
+        with open(file_name, 'w') as out_file:
+            out_file.write(source)
+
+        return file_name
+
+    def test_iter_basic_files(self):
+        """Test finding the source files in a tree."""
+
+        self.assertEqual(list(precompile.iter_basic_files(self.root)),
+                         [self.bad_file, self.good_file, self.sub_file])
+        self.assertEqual(list(precompile.iter_basic_files(self.good_file)),
+                         [self.good_file])
+
+    def test_compile_tree(self):
+        """Test that errors are reported and other files compiled."""
+
+        results = precompile.compile_tree([self.root], workers=1)
+        statuses = {result.basic_file: result.status for result in results}
+
+        self.assertEqual(statuses, {
+            self.bad_file: precompile.FAILED,
+            self.good_file: precompile.COMPILED,
+            self.sub_file: precompile.COMPILED})
+        self.assertIn('StatementParseError', str(results[0]))
+        self.assertFalse(os.path.exists(
+            precompile.obj_file_name(self.bad_file)))
+
+        program_obj = objfile.load_obj_file(
+            precompile.obj_file_name(self.good_file))
+        engine = program.ExecutionEngine(program_obj, test_mode=True)
+        engine.run()
+        self.assertEqual(engine.values(), {'X': 2, 'Y': 6})
+
+    def test_parser_crash(self):
+        """Test that lines that once crashed the parser fail to compile."""
+
+        crash_files = [self.write_source('CRASH{0}.BAS'.format(number),
+                                         source)
+                       for number, source in enumerate(CRASH_SOURCES)]
+
+        for workers in (1, 2):
+            results = precompile.compile_tree([self.root], workers=workers,
+                                              force=True, chunk_size=1)
+            statuses = {result.basic_file: result.status
+                        for result in results}
+
+            expected = dict.fromkeys(crash_files, precompile.FAILED)
+            expected.update({self.bad_file: precompile.FAILED,
+                             self.good_file: precompile.COMPILED,
+                             self.sub_file: precompile.COMPILED})
+            self.assertEqual(statuses, expected)
+
+    def test_up_to_date(self):
+        """Test that only changed files are compiled again."""
+
+        precompile.compile_tree([self.root], workers=1)
+        obj_file = precompile.obj_file_name(self.good_file)
+        obj_time = os.stat(obj_file).st_mtime
+        os.utime(self.sub_file, (obj_time + 10, obj_time + 10))
+
+        results = precompile.compile_tree([self.root], workers=1)
+        statuses = [result.status for result in results]
+
+        self.assertEqual(statuses, [precompile.FAILED, precompile.UP_TO_DATE,
+                                    precompile.COMPILED])
+
+        results = precompile.compile_tree([self.good_file], force=True)
+        self.assertEqual(results[0].status, precompile.COMPILED)
+
+    def test_workers(self):
+        """Test compiling in worker processes."""
+
+        results = precompile.compile_tree([self.root], workers=2,
+                                          chunk_size=1)
+
+        self.assertEqual([result.status for result in results],
+                         [precompile.FAILED, precompile.COMPILED,
+                          precompile.COMPILED])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the profiler module."""
+
+import os
+import tempfile
+import time
+import unittest
+
+from basic_lang import profiler
+from basic_lang import program
+
+LOOP_LINES = ['10 FOR I = 1 TO 3',
+              '20 LET X = I * 2',
+              '30 NEXT I',
+              '40 END']
+
+# A loop that runs long enough for the sampler to see its body.
+HOT_LINES = ['10 FOR I = 1 TO 20000',
+             '20 LET X = I * 2',
+             '30 NEXT I',
+             '40 END']
+# Seconds to keep running the loop until line 20 is sampled.
+HOT_TIMEOUT = 10
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test the sampling profiler."""
+
+    def setUp(self):
+        """Compile a loop and set up an engine and profiler."""
+
+        self.basic = program.Basic()
+        self.basic.compile_program(LOOP_LINES)
+        self.engine = program.ExecutionEngine(self.basic.program,
+                                              test_mode=True)
+        self.sampler = profiler.SamplingProfiler(self.engine)
+
+    def test_sample_not_started(self):
+        """Test that nothing is recorded before the program starts."""
+
+        self.sampler.sample()
+
+        self.assertEqual(self.sampler.total_samples, 0)
+
+    def test_sample_in_loop(self):
+        """Test a sample inside a FOR loop."""
+
+        self.basic.program.first_line()
+        self.engine.for_loops['I'] = (1, 3)
+        self.basic.program.current_line = 1
+
+        self.sampler.sample()
+
+        self.assertEqual(self.sampler.label_counts['20'], 1)
+        self.assertEqual(self.sampler.loop_counts['FOR I (10)'], 1)
+        self.assertEqual(self.sampler.collapsed_lines(),
+                         ['BASIC;FOR I (10);20 1'])
+
+    def test_sample_after_loop(self):
+        """Test a sample after the loop is finished."""
+
+        self.engine.run()
+        self.basic.program.current_line = 3
+
+        self.sampler.sample()
+
+        self.assertEqual(self.sampler.collapsed_lines(), ['BASIC;40 1'])
+
+    def test_start_stop(self):
+        """Test the sampling thread with a running program.
+
+        The loop is run again until its body is sampled, so a slow or
+        busy machine only makes the test take longer.
+        """
+
+        self.basic.compile_program(HOT_LINES)
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True)
+        sampler = profiler.SamplingProfiler(engine, interval=0.001)
+
+        sampler.start()
+        deadline = time.monotonic() + HOT_TIMEOUT
+        try:
+            engine.run()
+            while not sampler.label_counts['20'] and (
+                    time.monotonic() < deadline):
+                engine.run()
+        finally:
+            sampler.stop()
+
+        self.assertTrue(sampler.total_samples > 0)
+        self.assertTrue(sampler.label_counts['20'] > 0)
+        self.assertTrue(sampler._thread is None)
+
+    def test_write_collapsed(self):
+        """Test writing the collapsed stack file."""
+
+        self.basic.program.first_line()
+        self.sampler.sample()
+        self.sampler.sample()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_name = os.path.join(tmp_dir, 'profile.txt')
+            self.sampler.write_collapsed(file_name)
+            with open(file_name) as in_file:
+                text = in_file.read()
+
+        self.assertEqual(text, 'BASIC;10 2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,16 @@
 
 """Test the parser module."""
 
+import array
+import contextlib
+import io
+import itertools
+import pickle
+import tracemalloc
 import unittest
 
+from basic_lang import arrays
+from basic_lang import input_reader
 from basic_lang import program
 from basic_lang import statement_parser
 
@@ -17,6 +25,79 @@ LINES_INPUT = [LINE_INPUT, LINE_INPUT2]
 
 FOR_LINES = ['10 FOR I = 1 TO 2']
 
+ENDLESS_LINES = ['10 LET I = 0',
+                 '20 LET I = I + 1',
+                 '30 PRINT I',
+                 '40 GOTO 20']
+
+FORMULA_LINES = ['10 LET A = 3',
+                 '20 LET B = 4',
+                 '30 LET C = (A ^ 2 + B ^ 2) ^ 0.5',
+                 '40 IF C - 5 = 0 THEN 60',
+                 '50 PRINT "WRONG"',
+                 '60 PRINT -C * 2 + A / 2']
+
+GOSUB_LINES = ['10 LET X = 1',
+               '20 GOSUB 100',
+               '30 GOSUB 100',
+               '40 PRINT X',
+               '50 END',
+               '100 LET X = X * 3',
+               '110 GOSUB 200',
+               '120 RETURN',
+               '200 LET X = X + 1',
+               '210 RETURN']
+
+ARRAY_LINES = ['10 DIM A(5), T(2, 2)',
+               '20 FOR I = 0 TO 5',
+               '30 LET A(I) = I * I',
+               '40 NEXT I',
+               '50 LET T(1, 2) = A(3) + A(4)',
+               '60 IF T(1, 2) = 25 THEN 80',
+               '70 END',
+               '80 PRINT T(1, 2) / 5']
+
+RECURSIVE_GOSUB_LINES = ['10 GOSUB 10']
+
+DISPATCH_LINES = ['10 LET T = 0',
+                  '20 FOR I = 1 TO 6',
+                  '30 GOTO (I - 3 * INT((I - 1) / 3)) * 100',
+                  '40 NEXT I',
+                  '50 ON T - 10 GOTO 500, 600',
+                  '60 PRINT T',
+                  '70 END',
+                  '100 LET T = T + 1',
+                  '110 GOTO 40',
+                  '200 LET T = T + 2',
+                  '210 GOTO 40',
+                  '300 LET T = T + 3',
+                  '310 GOTO 40',
+                  '500 PRINT "ONE"',
+                  '510 END',
+                  '600 PRINT "TWO"']
+
+DATA_LINES = ['10 DIM A(2)',
+              '20 FOR I = 0 TO 2',
+              '30 READ A(I)',
+              '40 NEXT I',
+              '50 RESTORE',
+              '60 READ X, Y$',
+              '70 PRINT A(0) + A(1) + A(2) + X',
+              '80 DATA 5, -2',
+              '90 DATA 0.5, "NAME"']
+
+INPUT_LINES = ['10 LET T = 0',
+               '20 INPUT X',
+               '30 IF X < 0 THEN 60',
+               '40 LET T = T + X',
+               '50 GOTO 20',
+               '60 PRINT T']
+
+FOOTPRINT_LINES = ['{0} LET X = X + 1'.format(10 * (i + 1))
+                   for i in range(5000)]
+# Bytes per parsed line, including the line number and the list slot.
+MAX_LINE_FOOTPRINT = 90
+
 
 class TestLineParser(unittest.TestCase):
     """Test the line parser."""
@@ -41,6 +122,63 @@ class TestLineParser(unittest.TestCase):
         self.assertEqual(label, '10')
         self.assertTrue(isinstance(statement_obj, statement_parser.Print))
 
+    def test_line_footprint(self):
+        """Test the memory used per parsed line."""
+
+        tracemalloc.start()
+        try:
+            self.line_parser.parse_lines(FOOTPRINT_LINES)
+            used, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertTrue(used / len(FOOTPRINT_LINES) < MAX_LINE_FOOTPRINT)
+
+    def test_source_hash(self):
+        """Test the hash chained over the source lines."""
+
+        other_parser = program.LineParser()
+        self.line_parser.parse_lines(LINES_INPUT)
+        other_parser.parse_lines(['10  PRINT "HELLO"  ', LINE_INPUT2])
+        changed_parser = program.LineParser()
+        changed_parser.parse_lines([LINE_INPUT2, LINE_INPUT])
+
+        source_hash = self.line_parser.program.source_hash
+        self.assertEqual(len(source_hash), 64)
+        self.assertEqual(other_parser.program.source_hash, source_hash)
+        self.assertNotEqual(changed_parser.program.source_hash, source_hash)
+
+        self.line_parser.program.add_line('30', statement_parser.Rem())
+        self.assertIsNone(self.line_parser.program.source_hash)
+
+    def test_pickle_statements(self):
+        """Test pickling a program of slotted statement objects."""
+
+        self.line_parser.parse_lines(LINES_INPUT)
+
+        loaded = pickle.loads(pickle.dumps(self.line_parser.program))
+        loaded.first_line()
+        statement_obj = loaded.statement_at_label('20')
+
+        self.assertEqual(statement_obj.arg.value, 'IT WORKED!')
+
+    def test_shared_constants(self):
+        """Test that lines share the program's pooled constants."""
+
+        self.line_parser.parse_lines(['10 PRINT "DONE."', '20 PRINT "DONE."',
+                                      '30 LET X = X + 1', '40 LET Y = X + 1'])
+        program_obj = self.line_parser.program
+        program_obj.first_line()
+
+        print10 = program_obj.statement_at_label('10')
+        print20 = program_obj.statement_at_label('20')
+        let30 = program_obj.statement_at_label('30')
+        let40 = program_obj.statement_at_label('40')
+
+        self.assertTrue(print10.arg is print20.arg)
+        self.assertTrue(let30.value is let40.value)
+        self.assertEqual(len(program_obj.constant_pool), 3)
+
     def test_parse_lines(self):
         """Test parse multiple lines."""
 
@@ -104,6 +242,109 @@ class TestProgram(unittest.TestCase):
         self.assertEqual(next_line, '20')
         self.assertEqual(last_line, None)
 
+    def test_lines(self):
+        """Test the lines view of the label and statement lists."""
+
+        self.program.add_line('10', self.print_obj)
+        self.program.add_line('20', self.print_obj)
+
+        self.assertEqual(len(self.program.lines), 2)
+        self.assertEqual(self.program.lines[-1], ('20', self.print_obj))
+        self.assertEqual(list(self.program.lines),
+                         [('10', self.print_obj), ('20', self.print_obj)])
+        with self.assertRaises(IndexError):
+            self.program.lines[2]
+        self.assertEqual(self.program.lines[0:1], [('10', self.print_obj)])
+        self.assertEqual(self.program.lines[::-1],
+                         [('20', self.print_obj), ('10', self.print_obj)])
+
+    def test_unpickle_lines(self):
+        """Test loading a program pickled with a list of line pairs."""
+
+        self.program.add_line('10', self.print_obj)
+        state = dict(vars(self.program))
+        del state['line_numbers'], state['statements']
+        state['lines'] = [('10', self.print_obj)]
+
+        loaded = program.Program.__new__(program.Program)
+        loaded.__setstate__(state)
+
+        self.assertEqual(list(loaded.labels), ['10'])
+        self.assertEqual(loaded.first_line(), '10')
+        self.assertTrue(loaded.current_statement() is self.print_obj)
+
+    def test_unpickle_labels(self):
+        """Test loading a program pickled with a list of label strs."""
+
+        self.program.add_line('10', self.print_obj)
+        state = dict(vars(self.program))
+        del state['line_numbers']
+        del state['kinds']
+        state['labels'] = ['10']
+        state['label_index'] = {'10': 0}
+
+        loaded = program.Program.__new__(program.Program)
+        loaded.__setstate__(state)
+
+        self.assertEqual(loaded.line_numbers, array.array('q', [10]))
+        self.assertFalse('label_index' in vars(loaded))
+        self.assertEqual(loaded.kinds, array.array('B', [program.KIND_PRINT]))
+
+    def test_line_numbers(self):
+        """Test that labels are kept as numbers and made when asked for."""
+
+        self.program.add_line('010', self.print_obj)
+        self.program.add_line('20', self.print_obj)
+
+        self.assertEqual(self.program.line_numbers, array.array('q', [10, 20]))
+        self.assertEqual(list(self.program.labels), ['10', '20'])
+        self.assertEqual(self.program.labels[-1], '20')
+        self.assertEqual(self.program.labels[1:], ['20'])
+        self.assertEqual(self.program.first_line(), '10')
+        self.assertEqual(self.program.goto_label('20'), '20')
+        self.assertEqual(self.program.next_line(), None)
+
+    def test_statement_kinds(self):
+        """Test that each line keeps the kind code of its statement."""
+
+        line_parser = program.LineParser()
+        line_parser.parse_lines(['10 LET X = 1', '20 GOTO 40', '30 PRINT X',
+                                 '40 END'])
+
+        self.assertEqual(line_parser.program.kinds, array.array('B', [
+            program.KIND_OTHER, program.KIND_GOTO, program.KIND_PRINT,
+            program.KIND_END]))
+
+    def test_dense_index(self):
+        """Test looking up regularly spaced line numbers."""
+
+        for label in ('10', '20', '30', '50'):
+            self.program.add_line(label, self.print_obj)
+
+        self.program.first_line()
+
+        self.assertEqual(self.program.dense_base, 10)
+        self.assertEqual(len(self.program.dense_index), 41)
+        self.assertEqual(self.program.line_index_of(50), 3)
+        self.assertEqual(self.program.goto_number(20), '20')
+        for number in (15, 9, 51, 20.5):
+            with self.assertRaises(KeyError):
+                self.program.line_index_of(number)
+
+    def test_sparse_index(self):
+        """Test looking up line numbers far apart."""
+
+        for label in ('05', '1000', '20000'):
+            self.program.add_line(label, self.print_obj)
+
+        self.program.first_line()
+
+        self.assertTrue(self.program.dense_index is None)
+        self.assertEqual(self.program.line_index_of(5), 0)
+        self.assertEqual(self.program.goto_number(20000), '20000')
+        with self.assertRaises(KeyError):
+            self.program.line_index_of(10)
+
 
 class TestExecutionEngine(unittest.TestCase):
     """Test the execution engine object."""
@@ -154,6 +395,203 @@ class TestBasic(unittest.TestCase):
         obj = self.basic.program.statement_at_label('10')
         self.assertEqual(obj.output, 'HELLO')
 
+    def test_run_formula(self):
+        """Test a program with compound expressions."""
+
+        self.basic.run(FORMULA_LINES, test_mode=True)
+
+        obj = self.basic.program.lines[-1][1]
+        self.assertEqual(obj.output, -8.5)
+        self.assertEqual(self.basic.engine.symbol_table['C'].value, 5)
+
+    def test_run_gosub(self):
+        """Test nested GOSUB and RETURN."""
+
+        self.basic.run(GOSUB_LINES, test_mode=True)
+
+        obj = self.basic.program.statement_at_label('40')
+        self.assertEqual(obj.output, 13)
+        self.assertEqual(self.basic.engine.return_depth, 0)
+        self.assertEqual(
+            self.basic.program.statement_at_label('20').target, 5)
+
+    def test_run_arrays(self):
+        """Test DIM and array elements in LET, IF and PRINT."""
+
+        self.basic.run(ARRAY_LINES, test_mode=True)
+
+        obj = self.basic.program.statement_at_label('80')
+        self.assertEqual(obj.output, 5)
+
+    def test_array_bounds(self):
+        """Test the bounds check and running without it."""
+
+        lines = ['10 DIM A(2)', '20 LET A(3) = 1']
+        self.basic.compile_program(lines)
+
+        with self.assertRaises(arrays.ArrayBoundsError):
+            program.ExecutionEngine(self.basic.program).run()
+
+        engine = program.ExecutionEngine(self.basic.program,
+                                         check_bounds=False)
+        with self.assertRaises(IndexError):
+            engine.run()
+        self.assertFalse(engine.symbol_table['A()'].check_bounds)
+
+    def test_gosub_depth(self):
+        """Test the GOSUB depth limit."""
+
+        self.basic.compile_program(RECURSIVE_GOSUB_LINES)
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True,
+                                         max_gosub_depth=8)
+
+        with self.assertRaises(program.GosubDepthError):
+            engine.run()
+        self.assertEqual(engine.return_depth, 8)
+
+    def test_return_without_gosub(self):
+        """Test a RETURN with an empty return stack."""
+
+        with self.assertRaises(program.ReturnWithoutGosubError):
+            self.basic.run(['10 RETURN'], test_mode=True)
+
+    def test_next_without_for(self):
+        """Test a NEXT with no loop of its variable running."""
+
+        with self.assertRaises(program.NextWithoutForError):
+            self.basic.run(['10 LET I = 1', '20 NEXT I'], test_mode=True)
+        with self.assertRaises(program.NextWithoutForError):
+            self.basic.run(['10 FOR I = 1 TO 2', '20 NEXT I', '30 NEXT I'],
+                           test_mode=True)
+
+    def test_gosub_undefined_line(self):
+        """Test that a GOSUB to a missing line fails when linked."""
+
+        with self.assertRaises(program.LinkError):
+            self.basic.run(['10 GOSUB 99', '20 END'], test_mode=True)
+
+    def test_goto_undefined_line(self):
+        """Test that a GOTO or IF THEN to a missing line fails when linked."""
+
+        with self.assertRaises(program.LinkError):
+            self.basic.run(['10 GOTO 99', '20 END'], test_mode=True)
+        with self.assertRaises(program.LinkError):
+            self.basic.run(['10 IF 1 < 2 THEN 99', '20 END'], test_mode=True)
+
+    def test_computed_goto_undefined_line(self):
+        """Test a computed GOTO to a missing line."""
+
+        with self.assertRaises(program.UndefinedLineError):
+            self.basic.run(['10 LET X = 99', '20 GOTO X', '30 END'],
+                           test_mode=True)
+
+    def test_run_data(self):
+        """Test READ, DATA and RESTORE."""
+
+        self.basic.run(DATA_LINES, test_mode=True)
+
+        self.assertEqual(self.basic.program.data[3].value, 'NAME')
+        obj = self.basic.program.statement_at_label('70')
+        self.assertEqual(obj.output, 8.5)
+        self.assertEqual(self.basic.engine.symbol_table['Y$'].value, -2)
+
+    def test_out_of_data(self):
+        """Test a READ after the last DATA value."""
+
+        with self.assertRaises(program.OutOfDataError):
+            self.basic.run(['10 READ X, Y', '20 DATA 1'], test_mode=True)
+
+    def test_run_input(self):
+        """Test one compiled program run on two inputs."""
+
+        self.basic.compile_program(INPUT_LINES)
+        obj = self.basic.program.lines[-1][1]
+
+        self.basic.run_obj(test_mode=True,
+                           input_stream=io.StringIO('1, 2\n3 -1\n'))
+        self.assertEqual(obj.output, 6)
+
+        self.basic.run_obj(test_mode=True, input_stream=['10', 0.5, -1])
+        self.assertEqual(obj.output, 10.5)
+
+        with self.assertRaises(input_reader.InputEndError):
+            self.basic.run_obj(test_mode=True, input_stream=['2 1'])
+
+    def test_rerun(self):
+        """Test running one engine again with other variable values."""
+
+        self.basic.compile_program(FORMULA_LINES[2:])
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True)
+        obj = self.basic.program.lines[-1][1]
+
+        engine.run({'A': 3, 'B': 4})
+        self.assertEqual(obj.output, -8.5)
+        dense_index = self.basic.program.dense_index
+
+        engine.run({'A': 6, 'B': 8})
+        self.assertEqual(obj.output, -17)
+        self.assertEqual(engine.values(), {'A': 6, 'B': 8, 'C': 10})
+        self.assertTrue(self.basic.program.dense_index is dense_index)
+
+    def test_reset(self):
+        """Test that a reset clears the run state."""
+
+        self.basic.compile_program(GOSUB_LINES)
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True,
+                                         stats=True)
+        engine.run()
+        first_stats = engine.stats.as_dict()
+        engine.symbol_table['Z'] = program.make_binding('LEFT OVER')
+
+        engine.run()
+
+        self.assertEqual(engine.values(), {'X': 13})
+        self.assertEqual(engine.return_depth, 0)
+        self.assertEqual(engine.stats.as_dict(), first_stats)
+
+    def test_relink_after_add_line(self):
+        """Test that adding a line links the program again."""
+
+        self.basic.compile_program(['10 LET X = 1'])
+        engine = program.ExecutionEngine(self.basic.program)
+        engine.run()
+        self.basic.program.add_line('20', engine.program.lines[0][1])
+
+        engine.run()
+
+        self.assertEqual(self.basic.program.line_index_of(20), 1)
+
+    def test_run_dispatch(self):
+        """Test computed GOTO and ON GOTO."""
+
+        self.basic.run(DISPATCH_LINES, test_mode=True)
+
+        self.assertEqual(self.basic.program.statement_at_label('600').output,
+                         'TWO')
+        self.assertEqual(self.basic.program.inline_cache_counts(),
+                         {'30': (3, 3)})
+        self.assertEqual(self.basic.program.statement_at_label('110').target,
+                         self.basic.program.line_index_of(40))
+
+    def test_on_goto_out_of_range(self):
+        """Test that ON GOTO goes on to the next line for other values."""
+
+        lines = ['10 ON X GOTO 30', '20 PRINT "NEXT"', '30 END']
+        self.basic.compile_program(lines)
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True)
+
+        for value, count in ((0, 1), (1, 0), (1.5, 0), (2, 1)):
+            output = []
+            engine.output = output
+            engine.run({'X': value})
+            self.assertEqual(len(output), count)
+
+    def test_on_goto_undefined_line(self):
+        """Test that an ON GOTO to a missing line fails when linked."""
+
+        with self.assertRaises(program.LinkError):
+            self.basic.run(['10 ON X GOTO 10, 99'], test_mode=True)
+
     def test_run_for(self):
         """Test running a single FOR statement."""
 
@@ -165,6 +603,56 @@ class TestBasic(unittest.TestCase):
         self.assertEqual(line_index, 1)
         self.assertEqual(end_value, 2)
 
+    def test_iter_run(self):
+        """Test taking the first values printed by an endless program."""
+
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            values = list(itertools.islice(
+                self.basic.iter_run(ENDLESS_LINES), 3))
+
+        self.assertEqual(values, [1, 2, 3])
+        self.assertEqual(stdout.getvalue(), '')
+        engine = self.basic.engine
+        self.assertTrue(engine.stopped)
+        self.assertEqual(engine.values(), {'I': 3})
+
+    def test_iter_output(self):
+        """Test yielding every value and appending them to the output."""
+
+        output = []
+        self.basic.compile_program(LINES_INPUT)
+        engine = program.ExecutionEngine(self.basic.program, output=output)
+
+        self.assertEqual(list(engine.iter_output()), ['HELLO', 'IT WORKED!'])
+        self.assertEqual(output, ['HELLO', 'IT WORKED!'])
+        self.assertFalse(engine.stopped)
+        self.assertFalse(engine.test_mode)
+
+    def test_iter_output_bounded(self):
+        """Test that values aren't kept after they are yielded."""
+
+        self.basic.compile_program(ENDLESS_LINES)
+        engine = program.ExecutionEngine(self.basic.program)
+
+        for count, value in enumerate(itertools.islice(
+                engine.iter_output(), 1000)):
+            self.assertEqual(value, count + 1)
+            self.assertLessEqual(len(engine.output), 1)
+
+        self.assertIsNone(engine.output)
+
+    def test_iter_output_stopped(self):
+        """Test that a stop before any PRINT ends the values."""
+
+        self.basic.compile_program(ENDLESS_LINES)
+        engine = program.ExecutionEngine(self.basic.program)
+        engine.on_line_enter = lambda label: (
+            label == '20' and engine.request_stop())
+
+        self.assertEqual(list(engine.iter_output()), [])
+        self.assertTrue(engine.stopped)
+
 
 if __name__ == '__main__':
     unittest.main()
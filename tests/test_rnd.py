@@ -0,0 +1,85 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the rnd module."""
+
+import unittest
+
+from basic_lang import program
+from basic_lang import rnd
+
+MONTE_LINES = ['10 DIM A(4)',
+               '20 FOR I = 0 TO 4',
+               '30 LET A(I) = RND(1)',
+               '40 NEXT I',
+               '50 LET X = RND(1)',
+               '60 END']
+
+
+def draws(stream_obj, count):
+    """Return a list of draws from a stream."""
+
+    return [stream_obj.random() for _ in range(count)]
+
+
+class TestRandomStream(unittest.TestCase):
+    """Test the random streams."""
+
+    def test_range(self):
+        """Test that the values are from 0 up to 1."""
+
+        values = draws(rnd.RandomStream(), 1000)
+
+        self.assertTrue(all(0 <= value < 1 for value in values))
+        self.assertTrue(len(set(values)) > 990)
+
+    def test_reproducible(self):
+        """Test that the same seed and stream draw the same numbers."""
+
+        self.assertEqual(draws(rnd.RandomStream(42), 20),
+                         draws(rnd.RandomStream(42), 20))
+
+    def test_independent_streams(self):
+        """Test that other streams and seeds draw other numbers."""
+
+        values = draws(rnd.RandomStream(42), 20)
+
+        self.assertNotEqual(draws(rnd.RandomStream(42, stream=1), 20), values)
+        self.assertNotEqual(draws(rnd.RandomStream(43), 20), values)
+
+    def test_stream_seed(self):
+        """Test the seed of a stream."""
+
+        self.assertTrue(rnd.stream_seed(None, 3) is None)
+        self.assertEqual(rnd.stream_seed(42, 3), rnd.stream_seed('42', 3))
+        self.assertNotEqual(rnd.stream_seed(42, 3), rnd.stream_seed(42, 4))
+
+
+class TestEngineRnd(unittest.TestCase):
+    """Test RND in running programs."""
+
+    def run_values(self, seed, stream=0):
+        """Run the program and return the values drawn."""
+
+        basic = program.Basic()
+        basic.compile_program(MONTE_LINES)
+        engine = program.ExecutionEngine(basic.program, test_mode=True,
+                                         seed=seed, stream=stream)
+        engine.run()
+
+        return (engine.symbol_table['A()'].data.tolist() +
+                [engine.symbol_table['X'].value])
+
+    def test_seeded_run(self):
+        """Test that a seeded program prints the same numbers."""
+
+        values = self.run_values(42)
+
+        self.assertEqual(len(set(values)), 6)
+        self.assertTrue(all(0 <= value < 1 for value in values))
+        self.assertEqual(values, self.run_values(42))
+        self.assertNotEqual(values, self.run_values(42, stream=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@
 import unittest
 
 from basic_lang import parser
+from basic_lang import program
 from basic_lang import statement_parser
 
 PRINT_WORDS = ['X', '+', 'Y']
@@ -26,6 +27,18 @@ NEXT_STATEMENT_WORDS = ['NEXT', 'I']
 IFTHEN_WORDS = ['X', '=', '2', 'THEN', '20']
 IFTHEN_STATEMENT_WORDS = ['IF', 'X', '=', '2', 'THEN', '20']
 
+DIM_STATEMENT_WORDS = ['DIM', 'A(10),', 'B(2,', '3)']
+
+ON_GOTO_STATEMENT_WORDS = ['ON', 'X', '+', '1', 'GOTO', '100,', '200', ',',
+                           '300']
+
+GOSUB_STATEMENT_WORDS = ['GOSUB', '100']
+RETURN_STATEMENT_WORDS = ['RETURN']
+
+DATA_STATEMENT_WORDS = ['DATA', '1,', '-2.5,', '"AB"']
+READ_STATEMENT_WORDS = ['READ', 'X,', 'A(I,', 'J)']
+INPUT_STATEMENT_WORDS = ['INPUT', 'N']
+
 END_STATEMENT_WORDS = ['END']
 
 REM_STATEMENT_WORDS = ['REM', 'THIS', 'IS', 'A', 'COMMENT.']
@@ -98,6 +111,14 @@ class TestStatementParser(unittest.TestCase):
 
         self.assertTrue(isinstance(for_obj, statement_parser.For))
 
+    def test_parse_short_statements(self):
+        """Test that missing words are parse errors."""
+
+        for words in ([], ['FOR'], ['FOR', 'I', '=', '1', 'TO'],
+                      ['LET'], ['LET', 'X', '=', '1', '+']):
+            with self.assertRaises(statement_parser.StatementParseError):
+                self.parser.parse_statement(words)
+
     def test_parse_next_statement(self):
         """Test parsing the NEXT statement."""
 
@@ -112,6 +133,110 @@ class TestStatementParser(unittest.TestCase):
 
         self.assertTrue(isinstance(ifthen_obj, statement_parser.IfThen))
 
+    def test_parse_dim_statement(self):
+        """Test parsing the DIM statement."""
+
+        dim_obj = self.parser.parse_statement(DIM_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(dim_obj, statement_parser.Dim))
+        self.assertEqual(dim_obj.arrays, [('A', (10,)), ('B', (2, 3))])
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_dim(['A'])
+
+    def test_parse_let_element(self):
+        """Test a LET with an array element target."""
+
+        let_obj = self.parser.parse_let(['A(I,', 'J)', '=', 'I', '*', 'J'])
+
+        self.assertTrue(isinstance(let_obj.var, parser.ArrayElement))
+        self.assertTrue(isinstance(let_obj.value,
+                                   parser.ArithmeticExpression))
+
+    def test_parse_on_goto_statement(self):
+        """Test parsing the ON GOTO statement."""
+
+        on_goto_obj = self.parser.parse_statement(ON_GOTO_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(on_goto_obj, statement_parser.OnGoto))
+        self.assertEqual([obj.value for obj in on_goto_obj.labels],
+                         [100, 200, 300])
+
+        for words in (['X', 'GOTO'], ['X', '10'], ['X', 'GOTO', '10,'],
+                      ['"A"', 'GOTO', '10']):
+            with self.assertRaises(statement_parser.StatementParseError):
+                self.parser.parse_on_goto(words)
+
+    def test_parse_gosub_statement(self):
+        """Test parsing the GOSUB statement."""
+
+        gosub_obj = self.parser.parse_statement(GOSUB_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(gosub_obj, statement_parser.Gosub))
+        self.assertEqual(gosub_obj.label.value, 100)
+        self.assertTrue(gosub_obj.target is None)
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_gosub(['X'])
+
+    def test_parse_return_statement(self):
+        """Test parsing the RETURN statement."""
+
+        return_obj = self.parser.parse_statement(RETURN_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(return_obj, statement_parser.Return))
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_return(['10'])
+
+    def test_parse_data_statement(self):
+        """Test parsing the DATA statement."""
+
+        data_obj = self.parser.parse_statement(DATA_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(data_obj, statement_parser.Data))
+        self.assertEqual([obj.value for obj in data_obj.values],
+                         [1, -2.5, 'AB'])
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_data(['X'])
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_data(['1', '2'])
+
+    def test_parse_read_statement(self):
+        """Test parsing the READ statement."""
+
+        read_obj = self.parser.parse_statement(READ_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(read_obj, statement_parser.Read))
+        self.assertEqual(len(read_obj.targets), 2)
+        self.assertTrue(isinstance(read_obj.targets[0], parser.Variable))
+        self.assertTrue(isinstance(read_obj.targets[1], parser.ArrayElement))
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_read(['1'])
+
+    def test_parse_restore_statement(self):
+        """Test parsing the RESTORE statement."""
+
+        restore_obj = self.parser.parse_statement(['RESTORE'])
+
+        self.assertTrue(isinstance(restore_obj, statement_parser.Restore))
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_restore(['10'])
+
+    def test_parse_input_statement(self):
+        """Test parsing the INPUT statement."""
+
+        input_obj = self.parser.parse_statement(INPUT_STATEMENT_WORDS)
+
+        self.assertTrue(isinstance(input_obj, statement_parser.Input))
+        self.assertEqual(input_obj.targets[0].name, 'N')
+
+        with self.assertRaises(statement_parser.StatementParseError):
+            self.parser.parse_input([])
+
     def test_parse_end_statement(self):
         """Test parsing the END statement."""
 
@@ -211,6 +336,63 @@ class TestGoto(unittest.TestCase):
 
         self.goto_obj.execute(self.symbol_table, test_mode=True)
 
+        self.assertEqual(self.goto_obj.label_result, 10)
+
+    def test_execute_computed(self):
+        """Test that a computed label is evaluated on each execute."""
+
+        goto_obj = self.parser_obj.parse_goto(['X', '*', '10'])
+
+        goto_obj.execute({'X': parser.Number(2)})
+        self.assertEqual(goto_obj.label_result, 20)
+        goto_obj.execute({'X': parser.Number(3)})
+        self.assertEqual(goto_obj.label_result, 30)
+        self.assertFalse(isinstance(goto_obj.label, parser.Number))
+
+    def test_line_index_cache(self):
+        """Test the inline cache of computed targets."""
+
+        program_obj = program.Program()
+        for label in ('10', '20', '30'):
+            program_obj.add_line(label, self.goto_obj)
+        program_obj.link()
+        goto_obj = self.parser_obj.parse_goto(['X', '*', '10'])
+
+        for value in (2, 3, 2, 2):
+            goto_obj.execute({'X': parser.Number(value)})
+            self.assertEqual(goto_obj.line_index(program_obj), value - 1)
+
+        self.assertEqual((goto_obj.hits, goto_obj.misses), (2, 2))
+        goto_obj.clear_cache()
+        self.assertEqual(goto_obj.cache, {})
+
+    def test_line_index_cache_eviction(self):
+        """Test that the least recently used target is dropped."""
+
+        size = statement_parser.GOTO_CACHE_SIZE
+        program_obj = program.Program()
+        for number in range(1, size + 3):
+            program_obj.add_line(str(number * 10), self.goto_obj)
+        program_obj.link()
+        goto_obj = self.parser_obj.parse_goto(['X', '*', '10'])
+
+        def jump(value):
+            goto_obj.execute({'X': parser.Number(value)})
+            self.assertEqual(goto_obj.line_index(program_obj), value - 1)
+
+        for value in range(1, size + 1):
+            jump(value)
+        jump(1)
+        jump(size + 1)
+        self.assertEqual((goto_obj.hits, goto_obj.misses), (1, size + 1))
+        self.assertNotIn(20, goto_obj.cache)
+
+        jump(1)
+        self.assertEqual(goto_obj.hits, 2)
+        jump(2)
+        self.assertEqual(goto_obj.misses, size + 2)
+        self.assertEqual(len(goto_obj.cache), size)
+
 
 class TestFor(unittest.TestCase):
     """Test the FOR statement."""
@@ -318,6 +500,18 @@ class TestIfthen(unittest.TestCase):
 
         self.assertFalse(self.ifthen_obj.bool_result)
 
+    def test_execute_expressions(self):
+        """Test a condition with an expression on each side."""
+
+        ifthen_obj = self.parser_obj.parse_ifthen(
+            ['X', '*', '2', '<>', '(X', '+', '1)', 'THEN', '20'])
+        self.symbol_table['X'] = parser.Number(2)
+
+        ifthen_obj.execute(self.symbol_table)
+
+        self.assertTrue(ifthen_obj.bool_result)
+        self.assertEqual(ifthen_obj.label.value, 20)
+
     def test_execute_greater_than(self):
         """Test a not equal ifthen object."""
 
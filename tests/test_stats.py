@@ -0,0 +1,117 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the stats module."""
+
+import json
+import unittest
+
+from basic_lang import program
+from basic_lang import stats
+
+LOOP_LINES = ['10 FOR I = 1 TO 3',
+              '20 LET X = I * 2',
+              '30 PRINT X',
+              '40 NEXT I',
+              '50 GOTO 70',
+              '60 PRINT "SKIPPED"',
+              '70 END']
+
+
+class TestEngineStats(unittest.TestCase):
+    """Test the counters object."""
+
+    def setUp(self):
+        """Create the counters."""
+
+        self.stats = stats.EngineStats()
+
+    def test_count_print(self):
+        """Test counting PRINT bytes with the newline."""
+
+        self.stats.count_print('HELLO')
+        self.stats.count_print(25)
+
+        self.assertEqual(self.stats.print_bytes, 9)
+
+    def test_to_json(self):
+        """Test dumping the counters as JSON."""
+
+        self.stats.jumps = 2
+        values = json.loads(self.stats.to_json())
+
+        self.assertEqual(values['jumps'], 2)
+        self.assertEqual(values['total_statements'], 0)
+
+
+class TestCountingSymbolTable(unittest.TestCase):
+    """Test the counting symbol table."""
+
+    def test_reads_writes(self):
+        """Test that reads and writes are counted."""
+
+        engine_stats = stats.EngineStats()
+        symbol_table = stats.CountingSymbolTable(engine_stats)
+
+        symbol_table['X'] = 1
+        value = symbol_table['X']
+
+        self.assertEqual(value, 1)
+        self.assertEqual(engine_stats.var_reads, 1)
+        self.assertEqual(engine_stats.var_writes, 1)
+
+
+class TestEngineInstrumentation(unittest.TestCase):
+    """Test the counters and callbacks of a running engine."""
+
+    def setUp(self):
+        """Compile the loop program."""
+
+        self.basic = program.Basic()
+        self.basic.compile_program(LOOP_LINES)
+
+    def test_counters(self):
+        """Test the counters after a run."""
+
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True,
+                                         stats=True)
+        engine.run()
+
+        counters = engine.stats.as_dict()
+        self.assertEqual(counters['statements']['Let'], 3)
+        self.assertEqual(counters['statements']['Print'], 3)
+        self.assertEqual(counters['statements']['End'], 1)
+        self.assertEqual(counters['for_iterations'], 3)
+        self.assertEqual(counters['jumps'], 3)
+        self.assertEqual(counters['print_bytes'], 6)
+        self.assertEqual(counters['var_writes'], 7)
+
+    def test_callbacks(self):
+        """Test the line, jump and end callbacks."""
+
+        events = []
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True)
+        engine.on_line_enter = lambda label: events.append(('line', label))
+        engine.on_jump = lambda from_label, to_label: events.append(
+            ('jump', from_label, to_label))
+        engine.on_end = lambda: events.append(('end',))
+        engine.run()
+
+        self.assertEqual(events[0], ('line', '10'))
+        self.assertTrue(('jump', '40', '20') in events)
+        self.assertTrue(('jump', '50', '70') in events)
+        self.assertFalse(('line', '60') in events)
+        self.assertEqual(events[-1], ('end',))
+
+    def test_not_instrumented(self):
+        """Test that an engine without stats has no counters."""
+
+        engine = program.ExecutionEngine(self.basic.program, test_mode=True)
+        engine.run()
+
+        self.assertTrue(engine.stats is None)
+        self.assertFalse(engine.is_instrumented())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+# coding: utf-8
+# © 2018 by Ken Guyton.  All rights reserved.
+
+"""Test the vectorize module."""
+
+import unittest
+
+from basic_lang import arrays
+from basic_lang import parser
+from basic_lang import program
+from basic_lang import vectorize
+
+import helpers
+
+ELEMENT_WISE_LINES = ['10 DIM A(100), B(100), C(100)',
+                      '20 LET K = 3',
+                      '30 FOR I = 0 TO 100',
+                      '40 LET A(I) = I / 4',
+                      '50 LET B(I) = 100 - I',
+                      '60 NEXT I',
+                      '70 FOR I = 0 TO 100',
+                      '80 LET C(I) = A(I) * B(I) + K',
+                      '90 LET C(I) = -C(I) ^ 2 / (I + 1)',
+                      '100 NEXT I',
+                      '110 PRINT C(7) + I']
+
+PRINT_LOOP_LINES = ['10 DIM A(3)',
+                    '20 FOR I = 0 TO 3',
+                    '30 LET A(I) = I',
+                    '40 PRINT A(I)',
+                    '50 NEXT I']
+
+SHIFTED_LINES = ['10 DIM A(3)',
+                 '20 FOR I = 1 TO 3',
+                 '30 LET A(I) = A(I - 1) + 1',
+                 '40 NEXT I']
+
+JUMP_IN_LINES = ['10 DIM A(3)',
+                 '20 GOTO 40',
+                 '30 FOR I = 0 TO 3',
+                 '40 LET A(I) = I',
+                 '50 NEXT I']
+
+DOMAIN_LINES = ['10 DIM A(3)',
+                '20 FOR I = 0 TO 3',
+                '30 LET A(I) = SQR(1 - I)',
+                '40 NEXT I']
+
+ZERO_LINES = ['10 DIM A(3)',
+              '20 FOR I = 0 TO 3',
+              '30 LET A(I) = 1 / (2 - I)',
+              '40 NEXT I']
+
+BOUNDS_LINES = ['10 DIM A(3)',
+                '20 FOR I = 0 TO 4',
+                '30 LET A(I) = I',
+                '40 NEXT I']
+
+
+def run_engine(lines, vectorize_loops):
+    """Run the lines and return the engine."""
+
+    engine = program.ExecutionEngine(helpers.compile_lines(lines),
+                                     test_mode=True,
+                                     vectorize_loops=vectorize_loops)
+    engine.run()
+
+    return engine
+
+
+class TestFindLoopKernels(unittest.TestCase):
+    """Test finding the loops to lower."""
+
+    def test_element_wise(self):
+        """Test that both element-wise loops are found."""
+
+        program_obj = helpers.compile_lines(ELEMENT_WISE_LINES)
+
+        self.assertEqual(sorted(program_obj.loop_kernels), [2, 6])
+        self.assertEqual(program_obj.loop_kernels[6].next_index, 10)
+
+    def test_functions(self):
+        """Test that built-in functions of elements can be lowered."""
+
+        lines = ['10 DIM A(9), B(9)', '20 FOR I = 0 TO 9',
+                 '30 LET B(I) = SQR(A(I) + I) + ABS(-I)', '40 NEXT I']
+
+        fast = run_engine(lines, True)
+        slow = run_engine(lines, False)
+
+        self.assertEqual(list(fast.program.loop_kernels), [1])
+        self.assertEqual(fast.symbol_table['B()'].data,
+                         slow.symbol_table['B()'].data)
+
+    def test_not_lowered(self):
+        """Test loops that must run in the engine."""
+
+        for lines in (PRINT_LOOP_LINES, SHIFTED_LINES, JUMP_IN_LINES):
+            program_obj = helpers.compile_lines(lines)
+            self.assertEqual(program_obj.loop_kernels, {})
+
+
+class TestLoopKernel(unittest.TestCase):
+    """Test running lowered loops."""
+
+    def test_same_results(self):
+        """Test that kernels give the same results as the engine."""
+
+        fast = run_engine(ELEMENT_WISE_LINES, True)
+        slow = run_engine(ELEMENT_WISE_LINES, False)
+
+        for name in ('A()', 'B()', 'C()'):
+            self.assertEqual(fast.symbol_table[name].data,
+                             slow.symbol_table[name].data)
+        self.assertEqual(fast.symbol_table['I'].value, 101)
+        self.assertEqual(slow.symbol_table['I'].value, 101)
+        self.assertEqual(fast.for_loops, slow.for_loops)
+        self.assertEqual(
+            fast.program.statement_at_label('110').output,
+            slow.program.statement_at_label('110').output)
+
+    def test_single_iteration(self):
+        """Test a loop whose end is below its start runs once."""
+
+        lines = ['10 DIM A(5)', '20 FOR I = 2 TO 1', '30 LET A(I) = 7',
+                 '40 NEXT I']
+
+        fast = run_engine(lines, True)
+
+        self.assertEqual(list(fast.symbol_table['A()'].data),
+                         [0, 0, 7, 0, 0, 0])
+        self.assertEqual(fast.symbol_table['I'].value, 3)
+
+    def test_bounds_fallback(self):
+        """Test that a loop past the bounds fails as in the engine."""
+
+        with self.assertRaises(arrays.ArrayBoundsError):
+            run_engine(BOUNDS_LINES, True)
+
+    def test_body_errors(self):
+        """Test that an error in a loop body is raised as in the engine."""
+
+        for lines, error_class, index in (
+                (DOMAIN_LINES, parser.ArithmeticOpError, 2),
+                (ZERO_LINES, ZeroDivisionError, 2)):
+            for vectorize_loops in (True, False):
+                engine = program.ExecutionEngine(
+                    helpers.compile_lines(lines), test_mode=True,
+                    vectorize_loops=vectorize_loops)
+                with self.assertRaises(error_class):
+                    engine.run()
+                self.assertEqual(engine.symbol_table['I'].value, index)
+                self.assertEqual(engine.symbol_table['A()'].data[index], 0)
+
+    def test_kernel_source(self):
+        """Test the kernel is one Python loop over the array data."""
+
+        program_obj = helpers.compile_lines(ELEMENT_WISE_LINES)
+        kernel = program_obj.loop_kernels[6]
+        source = kernel.source(vectorize.KernelCompiler('I'))
+
+        self.assertTrue('for _i in range(0, 101):' in source)
+        self.assertEqual(source.count('for '), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()